@@ -1,39 +1,46 @@
 import streamlit as st
+from cliente import es_link_cliente, pagina_cliente
+
+# ==========================================
+# DETECCION DEL LINK EXTERNO (CLIENTE)
+# ==========================================
+# El cliente solo ve su propuesta: se atiende antes de importar pandas, plotly y el resto del CRM
+if es_link_cliente(st.query_params):
+    pagina_cliente(st.query_params)
+    st.stop()
+
 import pandas as pd
-from streamlit_gsheets import GSheetsConnection
-import plotly.express as px
 from datetime import date, datetime, timedelta
-import io
+import hashlib
 import json
-import base64
-import gspread
-from google.oauth2.service_account import Credentials
+from cartera import CargadorCartera, FuenteSheet
+from historial import HOJA_POR_TIPO
+from propuestas import ORDENES_PROPUESTAS, total_propuesta
+from recursos import (HOJA_POLIZAS, NOMBRES, SHEET_ID, URL_APP, get_almacen_links, get_cargador_historial, get_cola_sheets,
+                      get_gspread_client, get_indice_polizas, get_ingesta, get_registro_google, get_subidas_drive)
+from codec import codificar
+from plantillas import (COBERTURAS_RV, SUBLIMITES_RV, txt_acc_flota, txt_aclaraciones_rv, txt_alq_flota, txt_alq_veh, txt_ben_veh,
+                        txt_bic_flota, txt_bic_veh, txt_equipos_rv, txt_hog_veh, txt_obs_flota, txt_ubicaciones_rv)
+from flotas import COBERTURA_DEFECTO, COLUMNAS_FLOTA, importar_flota, leer_planilla, resumen_vehiculos, totales_por_cobertura
+from tarifas_aeronave import APTITUD_ATERRIZAJE, TASAS_AERONAVE, barrido_tasas, cotizar as cotizar_aeronave
+from ingesta import COLUMNAS_REVISION, fila_poliza, separar_repetidas
+from subidas_drive import marcador_subida
+from exportar import FORMATOS, CacheExportaciones, exportar_campana, mensajes_renovacion
 
 URL_HOJA = "https://docs.google.com/spreadsheets/d/1xyzaQncW_4XcjV5hcrc41YGFUst5068tYglGTAQZ2AA/edit#gid=860430337"
-SHEET_ID = "1xyzaQncW_4XcjV5hcrc41YGFUst5068tYglGTAQZ2AA"
 TC_USD = 40.5
+RUTA_SNAPSHOT_CARTERA = ".cache/cartera.parquet"
 
-def f_num(val):
-    try: return f"{int(float(str(val).replace('$','').replace('USD','').replace('.','').replace(',','').strip())):,}".replace(",",".")
-    except: return str(val)
-
-def get_gspread_client():
+def link_propuesta(datos):
+    # Link corto ?p=<id>; si el almacen de links no responde, la propuesta comprimida en ?q=
     try:
-        scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-        service_account_info = json.loads(st.secrets["connections"]["gsheets"]["service_account"])
-        creds = Credentials.from_service_account_info(service_account_info, scopes=scopes)
-        return gspread.authorize(creds)
-    except:
-        return None
+        return f"{URL_APP}?p={get_almacen_links().guardar(datos)}"
+    except Exception:
+        return f"{URL_APP}?q={codificar(datos)}"
 
 def guardar_en_sheet(hoja_nombre, fila):
     try:
-        gc = get_gspread_client()
-        if gc is None:
-            return False
-        sh = gc.open_by_key(SHEET_ID)
-        ws = sh.worksheet(hoja_nombre)
-        ws.append_row(fila, value_input_option="USER_ENTERED")
+        get_cola_sheets().encolar(hoja_nombre, fila)
         return True
     except Exception as e:
         st.error(f"Error al guardar en el Sheet: {repr(e)}")
@@ -47,324 +54,70 @@ CONTACTOS = {
     "EC": "099654708", "PG": "091282011"
 }
 
-NOMBRES = {
-    "RDF": "Roque de Freitas", "JOE": "Joel Mokosce", "ANDRE": "Andrea Cazarian",
-    "AB": "Amelia Bentancor", "GR": "Gonzalo Robaina", "ER": "Eduardo Robaina",
-    "GS": "Grismer Sanchez", "MDF": "Matias de Freitas", "EH": "Erica Hugo",
-    "AP": "Ana Perdomo", "RS": "Romina Sierra", "LT": "Letizia Tomasi",
-    "EC": "Eugenia Cabral", "PG": "Pablo Gagliardi"
-}
-
-TASAS_AERONAVE = {
-    "Privado / Otro": {
-        "principales": [
-            {"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 1.50, "Capital (USD)": 0},
-            {"Cobertura": "RC hacia Terceros (Excepto pasajeros)", "Tasa (%)": 0.50, "Capital (USD)": 0},
-            {"Cobertura": "Responsabilidad Civil Legal de Carga", "Tasa (%)": 0.50, "Capital (USD)": 0},
-        ],
-        "accidentes": [
-            {"Cobertura": "Accidente Personales Tripulantes", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
-            {"Cobertura": "Accidente Personales Pasajeros", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
-        ],
-    },
-    "Agrícola": {
-        "principales": [
-            {"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 3.00, "Capital (USD)": 0},
-            {"Cobertura": "RC hacia Terceros (Excepto pasajeros)", "Tasa (%)": 0.50, "Capital (USD)": 0},
-            {"Cobertura": "Responsabilidad Civil Danos Quimicos", "Tasa (%)": 3.00, "Capital (USD)": 0},
-        ],
-        "accidentes": [
-            {"Cobertura": "Accidente Personales Tripulantes", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
-            {"Cobertura": "Accidente Personales Pasajeros", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
-        ],
-    },
-    "Escuela e Instrucción": {
-        "principales": [
-            {"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 2.50, "Capital (USD)": 0},
-            {"Cobertura": "RC hacia Terceros (Excepto pasajeros)", "Tasa (%)": 0.50, "Capital (USD)": 0},
-        ],
-        "accidentes": [],
-    },
-}
-
-# ==========================================
-# DETECCION DEL LINK EXTERNO (CLIENTE)
-# ==========================================
-query_params = st.query_params
-
-if "q" in query_params:
-    try:
-        datos_b64 = query_params["q"]
-        datos_json = base64.b64decode(datos_b64).decode()
-        propuesta_cliente = json.loads(datos_json)
-
-        st.set_page_config(page_title="EDF SEGUROS - Propuesta", layout="wide", page_icon="🛡️")
-        st.markdown("""
-            <style>
-            .ben-fila { background-color: #f8f9fa; padding: 10px 18px; border-radius: 8px; margin-bottom: 8px; border-left: 5px solid #1E3A8A !important; font-size: 14px; color: #333; }
-            .caja-azul { background-color: #ffffff; padding: 18px; border-radius: 12px; height: 100%; border: 1px solid #e0e0e0; border-top: 5px solid #1E3A8A !important; }
-            </style>
-        """, unsafe_allow_html=True)
-
-        st.image("https://raw.githubusercontent.com/roque-eng/crm-final/main/de-freitas-logo-01.jpg", width=150)
-        
-        if propuesta_cliente.get("tipo") == "RV":
-            st.markdown(f"""
-            <div style="font-family: sans-serif; padding-left: 5px; margin: 20px 0 15px 0;">
-                <h2 style="margin: 0 0 6px 0; font-size: 22px; color: #111;">{propuesta_cliente.get('tipo_seg', 'Riesgos Varios')} — {propuesta_cliente.get('n', 'Cliente')}</h2>
-                <p style="margin: 0; font-size: 16px; color: #555;"><b>Actividad:</b> {propuesta_cliente.get('act', '')} | <b>Aseguradora:</b> {propuesta_cliente.get('cia', '')} | <b>Vigencia:</b> {propuesta_cliente.get('vig', '')}</p>
-            </div>
-            """, unsafe_allow_html=True)
-
-            st.markdown("### 📦 Coberturas Principales")
-            df_cob_cli = pd.DataFrame(propuesta_cliente.get("tab_cob", []))
-            if not df_cob_cli.empty:
-                df_cob_cli["Capital (USD)"] = pd.to_numeric(df_cob_cli["Capital (USD)"], errors='coerce').fillna(0)
-                st.dataframe(df_cob_cli, use_container_width=True, hide_index=True,
-                    column_config={"Capital (USD)": st.column_config.NumberColumn("CAPITAL (USD)", format="$ %,d")})
-            cme1, cme2 = st.columns(2)
-            cme1.metric("Capital Asegurado Total", f"USD {propuesta_cliente.get('cap_total', 0):,.0f}")
-            cme2.metric("Deducible General", f"USD {propuesta_cliente.get('ded', '')}")
-
-            st.markdown("### 📑 Sublímites de Cobertura")
-            df_sub_cli = pd.DataFrame(propuesta_cliente.get("tab_sub", []))
-            if not df_sub_cli.empty:
-                st.dataframe(df_sub_cli, use_container_width=True, hide_index=True)
-
-            if propuesta_cliente.get("ubi", "").strip():
-                st.markdown("### 📍 Ubicaciones de riesgo")
-                for u in propuesta_cliente.get("ubi", "").split('\n'):
-                    if u.strip() and u.strip() not in ("1)", "2)", "3)", "4)"): st.markdown(f'<div class="ben-fila">{u.strip()}</div>', unsafe_allow_html=True)
-
-            if propuesta_cliente.get("equ", "").strip():
-                st.markdown("### 🚜 Equipos a la intemperie")
-                for eq in propuesta_cliente.get("equ", "").split('\n'):
-                    if eq.strip() and eq.strip() not in ("1)", "2)", "3)", "4)"): st.markdown(f'<div class="ben-fila">{eq.strip()}</div>', unsafe_allow_html=True)
-
-            if propuesta_cliente.get("acl", "").strip():
-                st.markdown("### 📌 Aclaraciones en condiciones particulares")
-                for a in propuesta_cliente.get("acl", "").split('\n'):
-                    if a.strip(): st.markdown(f'<div class="ben-fila">{a.strip()}</div>', unsafe_allow_html=True)
-
-            st.markdown("---")
-            cco1, cco2 = st.columns(2)
-            cco1.markdown(f"### 💰 Costo Anual (sin IVA): USD {propuesta_cliente.get('costo', 0):,.2f}")
-            cco2.markdown(f"### 💳 Financiamiento: {propuesta_cliente.get('fin', '')}")
-
-            df_comp_cli = pd.DataFrame(propuesta_cliente.get("tab_comp", []))
-            df_comp_cli = df_comp_cli[df_comp_cli.get("Aseguradora", pd.Series(dtype=str)).astype(str).str.strip() != ""] if not df_comp_cli.empty else df_comp_cli
-            if not df_comp_cli.empty:
-                st.markdown("### ⚖️ Comparativos")
-                df_comp_cli["Premio (USD)"] = pd.to_numeric(df_comp_cli["Premio (USD)"], errors='coerce').fillna(0)
-                st.dataframe(df_comp_cli, use_container_width=True, hide_index=True,
-                    column_config={"Premio (USD)": st.column_config.NumberColumn("PREMIO (USD)", format="USD %,d")})
-
-            st.markdown("---")
-            st.markdown(f"<div style='display:flex; justify-content:space-between; color:gray;'><div><b>Asesor:</b> {propuesta_cliente.get('e','EDF')} | <b>Contacto:</b> {propuesta_cliente.get('cont', '')}</div><div><b>Fecha:</b> {propuesta_cliente.get('fecha','')}</div></div>", unsafe_allow_html=True)
-            st.stop()
-
-        
-        # --- VISTA AERONAVE ---
-        if propuesta_cliente.get("tipo") == "Aeronave":
-            mat = propuesta_cliente.get('matricula', '')
-            geo = propuesta_cliente.get('alcance_geo', '')
-            aseg = propuesta_cliente.get('aseguradora', '')
-            aeronave = propuesta_cliente.get('aeronave', '')
-            destino = propuesta_cliente.get('destino', '')
-
-            filas_info = ""
-            if aseg: filas_info += f'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Aseguradora:</b> {aseg}</p>'
-            if aeronave: filas_info += f'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Aeronave:</b> {aeronave}</p>'
-            if mat: filas_info += f'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Matricula:</b> {mat}</p>'
-            if geo: filas_info += f'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Alcance Geografico:</b> {geo}</p>'
-            if destino: filas_info += f'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Destino:</b> {destino}</p>'
-
-            st.markdown(f"""
-            <div style="font-family: sans-serif; padding-left: 5px; margin-bottom: 20px; margin-top: 20px;">
-                <h2 style="margin: 0 0 12px 0; font-size: 24px; color: #111; font-weight: bold;">Asegurado: {propuesta_cliente.get('n', 'Cliente')}</h2>
-                {filas_info}
-            </div>
-            """, unsafe_allow_html=True)
-
-            tab_data = propuesta_cliente.get("tab", [])
-            if tab_data:
-                html_tabla = '<table style="width:100%;border-collapse:collapse;font-size:13px;margin-top:15px;">'
-                html_tabla += '<tr style="background:#1E3A8A;color:white;">'
-                for col in ["Cobertura", "Asientos", "Capital (USD)"]:
-                    html_tabla += f'<th style="padding:8px 12px;text-align:left;">{col}</th>'
-                html_tabla += '</tr>'
-                for i, row in enumerate(tab_data):
-                    bg = "#f8f9fa" if i % 2 == 0 else "white"
-                    html_tabla += f'<tr style="background:{bg};">'
-                    html_tabla += f'<td style="padding:7px 12px;border-bottom:1px solid #e5e7eb;">{row.get("Cobertura","")}</td>'
-                    asientos = row.get("Asientos", 0)
-                    asientos_fmt = str(int(float(str(asientos)))) if asientos and str(asientos) not in ["0","0.0",""] else "—"
-                    capital = row.get("Capital", 0)
-                    cob_str = str(row.get("Cobertura", "")).lower()
-                    try: capital_fmt = f"USD {int(float(capital)):,}".replace(",",".")
-                    except: capital_fmt = str(capital)
-                    if str(capital) in ["0", "0.0", ""] and "aptitud" in cob_str:
-                        capital_fmt = "Incluido"
-                    html_tabla += f'<td style="padding:7px 12px;border-bottom:1px solid #e5e7eb;">{asientos_fmt}</td>'
-                    html_tabla += f'<td style="padding:7px 12px;border-bottom:1px solid #e5e7eb;">{capital_fmt}</td>'
-                    html_tabla += '</tr>'
-                html_tabla += '</table>'
-                st.markdown(html_tabla, unsafe_allow_html=True)
-
-            obs_av = propuesta_cliente.get("obs_av", "")
-            if obs_av:
-                st.markdown(f"""
-                <div style="margin-top:15px; padding:12px 16px; background:#f8f9fa; border-radius:8px; border-left:4px solid #1E3A8A; font-size:14px; color:#333;">
-                    {obs_av.replace(chr(10), '<br>')}
-                </div>
-                """, unsafe_allow_html=True)
-
-            subtotal = propuesta_cliente.get("subtotal", 0)
-            cargos = propuesta_cliente.get("cargos", 0)
-            total = propuesta_cliente.get("total", 0)
-            st.markdown(f"""
-            <div style="margin-top:20px; padding:15px; background:#EFF6FF; border-radius:10px; border-left:5px solid #1E3A8A;">
-                <p style="margin:4px 0;">Subtotal: <b>USD {subtotal:,.0f}</b></p>
-                <p style="margin:4px 0;">Cargos de Emision (15%): <b>USD {cargos:,.0f}</b></p>
-                <p style="margin:4px 0; font-size:17px; color:#1E3A8A;">Costo Anual Total: <b>USD {total:,.0f}</b></p>
-            </div>
-            """, unsafe_allow_html=True)
-            st.markdown("---")
-            asesor_key_av = propuesta_cliente.get('e', 'EDF')
-            asesor_nombre_av = NOMBRES.get(asesor_key_av, asesor_key_av)
-            st.markdown(f"<div style='display:flex; justify-content:space-between; color:gray;'><div><b>Asesor:</b> {asesor_nombre_av} | <b>Contacto:</b> {propuesta_cliente.get('cont','')}</div><div><b>Fecha:</b> {propuesta_cliente.get('fecha','')}</div></div>", unsafe_allow_html=True)
-            st.stop()
-
-        # --- VISTA FLOTA ---
-        if propuesta_cliente.get("tipo") == "Flota":
-            filas_info_f = ""
-            if propuesta_cliente.get('e'): filas_info_f += f'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Aseguradora:</b> {propuesta_cliente.get("e","")}</p>'
-            st.markdown(f"""
-            <div style="font-family: sans-serif; padding-left: 5px; margin-bottom: 20px; margin-top: 20px;">
-                <h2 style="margin: 0 0 12px 0; font-size: 24px; color: #111; font-weight: bold;">Asegurado: {propuesta_cliente.get('n', 'Cliente')}</h2>
-                {filas_info_f}
-            </div>
-            """, unsafe_allow_html=True)
-        else:
-            # --- VISTA INDIVIDUAL ---
-            st.markdown(f"""
-            <div style="font-family: sans-serif; padding-left: 5px; margin-bottom: 20px; margin-top: 20px;">
-                <h2 style="margin: 0 0 12px 0; font-size: 24px; color: #111; font-weight: bold;">Asegurado: {propuesta_cliente.get('n', 'Cliente')}</h2>
-                {'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Vehiculo:</b> ' + propuesta_cliente.get('v','') + '</p>' if propuesta_cliente.get('v') else ''}
-                {'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Matricula:</b> ' + propuesta_cliente.get('matricula','') + '</p>' if propuesta_cliente.get('matricula') else ''}
-                {'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Cobertura cotizada:</b> ' + propuesta_cliente.get('cobertura_cot','') + '</p>' if propuesta_cliente.get('cobertura_cot') else ''}
-                {'<p style="margin:2px 0; font-size:15px; color:#333;"><b>Zona de Circulacion principal:</b> ' + propuesta_cliente.get('zona','') + '</p>' if propuesta_cliente.get('zona') else ''}
-            </div>
-            """, unsafe_allow_html=True)
-
-        df_cli = pd.DataFrame(propuesta_cliente.get("tab", []))
-        if not df_cli.empty:
-            cols_num = ["Contado", "Deducible"] if propuesta_cliente.get("tipo") == "Flota" else ["Contado", "10 Cuotas", "Deducible"]
-            for col in cols_num:
-                if col in df_cli.columns:
-                    df_cli[col] = pd.to_numeric(df_cli[col], errors='coerce').fillna(0).astype(int)
-            cols_mostrar = [c for c in df_cli.columns if c in ["Aseguradora","Marca","Modelo","Ano","Matricula","Cobertura","Contado","10 Cuotas","Deducible"]]
-            html_tabla = '<table style="width:100%;border-collapse:collapse;font-size:12px;margin-top:10px;">'
-            html_tabla += '<tr style="background:#1E3A8A;color:white;">'
-            for col in cols_mostrar:
-                html_tabla += f'<th style="padding:8px 12px;text-align:left;">{col.upper()}</th>'
-            html_tabla += '</tr>'
-            for i, row in df_cli.iterrows():
-                bg = "#f8f9fa" if i % 2 == 0 else "white"
-                html_tabla += f'<tr style="background:{bg};">'
-                for col in cols_mostrar:
-                    val = row.get(col, "")
-                    if col in ["Contado", "10 Cuotas", "Deducible"]:
-                        try: val = f"$ {int(float(val)):,}".replace(",", ".")
-                        except: pass
-                    html_tabla += f'<td style="padding:7px 12px;border-bottom:1px solid #e5e7eb;">{val}</td>'
-                html_tabla += '</tr>'
-            html_tabla += '</table>'
-            st.markdown(html_tabla, unsafe_allow_html=True)
-
-        if propuesta_cliente.get("ben"):
-            st.write("")
-            st.markdown(f"### {'Beneficios Incluidos' if propuesta_cliente.get('tipo') != 'Flota' else 'Observaciones y Comentarios'}")
-            for b in propuesta_cliente.get("ben", "").split('\n'):
-                if b.strip(): st.markdown(f'<div class="ben-fila">{b.strip()}</div>', unsafe_allow_html=True)
-
-        st.write("")
-        st.markdown("### Coberturas Complementarias")
-        cx1, cx2, cx3 = st.columns(3)
-        def b_html_cli(tit, ico, txt):
-            if not txt: return ""
-            out = f'<div class="caja-azul"><span style="font-weight:bold; color:#1E3A8A;">{ico} {tit}</span><br>'
-            for l in txt.split('\n'):
-                l = l.strip()
-                if not l: continue
-                if l.lower().startswith("costo") or l.lower().startswith("- costo") or l.lower().startswith("* costo"):
-                    partes = l.lstrip("*- ").split(":", 1)
-                    if len(partes) == 2:
-                        out += f'<span style="display:block; margin-top:8px; padding:6px 10px; background:#EFF6FF; border-radius:6px; font-weight:bold; color:#1E3A8A;">💰 {partes[0].strip()}: <span style="color:#111;">{partes[1].strip()}</span></span>'
-                    else:
-                        out += f'<span style="display:block; margin-top:8px; padding:6px 10px; background:#EFF6FF; border-radius:6px; font-weight:bold; color:#1E3A8A;">💰 <span style="color:#111;">{l.lstrip("*- ")}</span></span>'
-                else:
-                    out += f'<span style="display:block; margin-top:3px;">{l}</span>'
-            return out + '</div>'
-
-        es_flota = propuesta_cliente.get("tipo") == "Flota"
-        tit_ch = "Accidentes Personales" if es_flota else "Hogar"
-        ico_ch = "🧑‍⚕️" if es_flota else "🏠"
-        tit_ca = "Auto Sustituto / Alquiler" if es_flota else "Alquiler / Auto Sust."
-        tit_cb = "Bici Electrica o Moto" if es_flota else "Bici"
-        ico_cb = "🛵" if es_flota else "🚲"
-        cx1.markdown(b_html_cli(tit_ch, ico_ch, propuesta_cliente.get("ch", "")), unsafe_allow_html=True)
-        cx2.markdown(b_html_cli(tit_ca, "🚗", propuesta_cliente.get("ca", "")), unsafe_allow_html=True)
-        cx3.markdown(b_html_cli(tit_cb, ico_cb, propuesta_cliente.get("cb", "")), unsafe_allow_html=True)
-        st.markdown("---")
-        asesor_pie = propuesta_cliente.get('e_nombre') if propuesta_cliente.get('tipo') == 'Flota' else propuesta_cliente.get('e', 'EDF')
-        st.markdown(f"<div style='display:flex; justify-content:space-between; color:gray;'><div><b>Asesor:</b> {asesor_pie} | <b>Contacto:</b> {propuesta_cliente.get('cont', '')}</div><div><b>Fecha:</b> {propuesta_cliente.get('fecha','')}</div></div>", unsafe_allow_html=True)
-        st.stop()
-    except Exception as e:
-        st.error(f"Error al cargar la propuesta externa: {e}")
-        st.stop()
-
-
 # ==========================================
 # LOGICA DEL ASESOR (CRM)
 # ==========================================
-if "historico" not in st.session_state: st.session_state.historico = []
 if "edit_data" not in st.session_state: st.session_state.edit_data = {}
 
-if "historico_sheet_cargado" not in st.session_state:
-    try:
-        gc = get_gspread_client()
-        if gc:
-            sh = gc.open_by_key(SHEET_ID)
-            hist = []
-            for hoja, tipo in [("Cotizaciones Individuales", "Individual"), ("Cotizaciones Flotas", "Flota"), ("Cotizaciones Aeronaves", "Aeronave")]:
-                try:
-                    ws = sh.worksheet(hoja)
-                    rows = ws.get_all_values()
-                    for row in rows[1:]:
-                        if row and row[0]:
-                            if tipo == "Individual" and len(row) >= 13:
-                                hist.append({"fecha": row[0], "n": row[1], "doc": row[2], "v": row[3], "matricula": row[4], "cobertura_cot": row[5], "zona": row[6], "e": row[7], "tipo": "Individual", "link": row[12] if len(row) > 12 else ""})
-                            elif tipo == "Flota" and len(row) >= 6:
-                                hist.append({"fecha": row[0], "n": row[1], "e": row[2], "e_nombre": row[3], "tipo": "Flota", "link": row[5] if len(row) > 5 else ""})
-                            elif tipo == "Aeronave" and len(row) >= 12:
-                                # Si existe columna JSON (col 12), reconstruimos el dict completo
-                                if len(row) > 12 and row[12]:
-                                    try:
-                                        datos_completos = json.loads(row[12])
-                                        datos_completos["link"] = row[11] if len(row) > 11 else ""
-                                        hist.append(datos_completos)
-                                    except:
-                                        hist.append({"fecha": row[0], "n": row[1], "aseguradora": row[2], "aeronave": row[3], "matricula": row[4], "alcance_geo": row[5], "destino": row[6], "e": row[7], "total": row[10], "tipo": "Aeronave", "link": row[11] if len(row) > 11 else ""})
-                                else:
-                                    hist.append({"fecha": row[0], "n": row[1], "aseguradora": row[2], "aeronave": row[3], "matricula": row[4], "alcance_geo": row[5], "destino": row[6], "e": row[7], "total": row[10], "tipo": "Aeronave", "link": row[11] if len(row) > 11 else ""})
-                except: pass
-            st.session_state.historico = hist
-    except: pass
-    st.session_state.historico_sheet_cargado = True
+def guardar_propuesta(datos, link, fila=None):
+    # Alta, o reemplazo de la original si se cargo desde el historial para editar (tambien en el Sheet)
+    # En cada rerun: el almacen compartido puede haberse rearmado con una lectura completa
+    propuestas = get_cargador_historial().almacen()
+    registro = {**datos, "link": link}
+    hoja = HOJA_POR_TIPO.get(datos.get("tipo"))
+    if hoja is None:
+        # Sin hoja (Riesgos Varios): solo en memoria y solo a la vista de quien la armo
+        registro["_usuario"] = st.session_state.usuario_actual
+    # Se busca por el link original: el id de la sesion puede no existir tras una relectura completa
+    pid = propuestas.id_por_link(st.session_state.pop("editando_link", None))
+    anterior = propuestas.obtener(pid) if pid else None
+    if anterior is not None and anterior.get("tipo") == datos.get("tipo"):
+        propuestas.editar(pid, registro)
+        if hoja and fila is not None:
+            try: get_cola_sheets().encolar_edicion(hoja, anterior.get("link", ""), fila)
+            except Exception as e: st.error(f"Error al guardar en el Sheet: {repr(e)}")
+        return pid
+    pid = propuestas.agregar(registro)
+    if hoja and fila is not None:
+        guardar_en_sheet(hoja, fila)
+    return pid
+
+def eliminar_propuesta(pid):
+    registro = get_cargador_historial().almacen().eliminar(pid)
+    if registro is None:
+        st.warning("La propuesta ya no estaba en el historial.")
+        return
+    hoja = HOJA_POR_TIPO.get(registro.get("tipo"))
+    if hoja and registro.get("link"):
+        try: get_cola_sheets().encolar_borrado(hoja, registro["link"])
+        except Exception as e: st.error(f"Error al borrar en el Sheet: {repr(e)}")
 
 st.set_page_config(page_title="EDF SEGUROS", layout="wide", page_icon="🛡️")
 
+@st.cache_resource
+def get_cargador_cartera():
+    # Compartido entre sesiones: el snapshot se reusa y solo se bajan los cambios
+    return CargadorCartera(FuenteSheet(get_gspread_client, SHEET_ID), ruta_snapshot=RUTA_SNAPSHOT_CARTERA)
+
+# Arranca la lectura de la cartera (disco + reconciliacion en segundo plano) antes del login
+get_cargador_cartera().precargar()
+
+@st.cache_resource
+def get_cache_exportaciones():
+    return CacheExportaciones()
+
+def panel_exportar(df, clave, nombre, hoja, key, etiqueta="📥 Exportar"):
+    # El archivo se arma solo cuando se pide y queda cacheado por (clave, formato)
+    cache = get_cache_exportaciones()
+    c_fmt, c_btn = st.columns([1, 3])
+    formato = c_fmt.selectbox("Formato", list(FORMATOS), format_func=lambda f: FORMATOS[f][0], key=f"fmt_{key}", label_visibility="collapsed")
+    datos = cache.obtener((clave, formato))
+    if datos is None and c_btn.button(f"{etiqueta} ({FORMATOS[formato][0]})", key=f"prep_{key}", use_container_width=True):
+        with st.spinner("Generando archivo..."):
+            datos = cache.generar(clave, df, formato, hoja)
+    if datos is not None:
+        c_btn.download_button(label=f"💾 Descargar {nombre}.{formato}", data=datos, file_name=f"{nombre}.{formato}", mime=FORMATOS[formato][1], key=f"dl_{key}", use_container_width=True)
+
 st.markdown("""
 <style>
 .ben-fila { background-color: #f8f9fa; padding: 10px 18px; border-radius: 8px; margin-bottom: 8px; border-left: 5px solid #1E3A8A !important; font-size: 14px; color: #333; }
@@ -403,215 +156,187 @@ if 'logueado' not in st.session_state or not st.session_state['logueado']:
             else: st.error("Contrasena incorrecta.")
     st.stop()
 
-conn = st.connection("gsheets", type=GSheetsConnection)
-df_raw = conn.read(spreadsheet=URL_HOJA, ttl=0)
-df_raw.columns = df_raw.columns.str.strip()
+cargador_cartera = get_cargador_cartera()
+modelo_cartera = cargador_cartera.modelo(forzar=st.session_state.pop("refrescar_cartera", False), tc_usd=TC_USD)
+df_raw = modelo_cartera.df
 
-col_map = {c.lower(): c for c in df_raw.columns}
-c_asegurado = col_map.get("asegurado", col_map.get("cliente", "Asegurado"))
-c_documento = col_map.get("documento", col_map.get("ci", col_map.get("rut", "Documento")))
-c_aseguradora = col_map.get("aseguradora", col_map.get("compania", "Aseguradora"))
-c_ramo = col_map.get("ramo", "Ramo")
-c_p_usd = col_map.get("premio usd (iva inc)", "Premio USD (IVA inc)")
-c_p_uyu = col_map.get("premio uyu (iva inc)", "Premio UYU (IVA inc)")
-c_adjunto = col_map.get("adjunto (póliza)", "Adjunto (póliza)")
-
-df_raw['Premio_Total_USD'] = (pd.to_numeric(df_raw.get(c_p_usd, 0), errors='coerce').fillna(0) + (pd.to_numeric(df_raw.get(c_p_uyu, 0), errors='coerce').fillna(0) / TC_USD)).round(0)
-df_raw['Fin de Vigencia'] = pd.to_datetime(df_raw.get('Fin de Vigencia', date.today()), dayfirst=True, errors='coerce').dt.date
+col_map = modelo_cartera.col_map
+c_asegurado = modelo_cartera.c_asegurado
+c_documento = modelo_cartera.c_documento
+c_aseguradora = modelo_cartera.c_aseguradora
+c_ramo = modelo_cartera.c_ramo
+c_p_usd = modelo_cartera.c_p_usd
+c_p_uyu = modelo_cartera.c_p_uyu
+c_adjunto = modelo_cartera.c_adjunto
 
 with st.sidebar:
     st.title(f"👤 {NOMBRES.get(st.session_state.usuario_actual, st.session_state.usuario_actual)}")
-    def get_list(col): return ["Todos"] + sorted(df_raw[col].dropna().unique().tolist()) if col in df_raw.columns else ["Todos"]
+    def get_list(col): return modelo_cartera.filtros.opciones.get(col, ["Todos"])
     f_ej = st.selectbox("Ejecutivo", get_list('Ejecutivo'))
     f_as = st.selectbox("Aseguradora", get_list(c_aseguradora))
     f_ra = st.selectbox("Ramo", get_list(c_ramo))
     f_co = st.selectbox("Corredor", get_list('Corredor'))
     f_ag = st.selectbox("Agente", get_list('Agente'))
     filtro_vigencia = st.selectbox("Estado de pólizas", ["Vigentes", "No vigentes", "Todas"], index=0)
+    if st.button("🔄 Refrescar cartera"):
+        st.session_state["refrescar_cartera"] = True
+        st.rerun()
+    stats_c = cargador_cartera.stats
+    st.caption(f"Cartera v{cargador_cartera.version} · {stats_c['ultima_actualizacion']} · hits: {stats_c['hits']} · incrementales: {stats_c['incrementales']} · completas: {stats_c['completas']}")
+    mem_c = modelo_cartera.reporte_memoria()
+    st.caption(f"Memoria cartera: {mem_c['despues'] / 1e6:,.1f} MB (crudo {mem_c['antes'] / 1e6:,.1f} MB, -{mem_c['reduccion']:.0%})")
+    if stats_c["error"]: st.caption(f"⚠️ Trabajando con el snapshot local: {stats_c['error']}")
+    try:
+        cola = get_cola_sheets()
+        estado_cola = cola.estado()
+        en_cola = sum(estado_cola["pendientes"].values())
+        st.caption(f"📤 Cola al Sheet: {en_cola} pendientes · último envío: {estado_cola['ultimo_envio'] or '-'} · enviadas: {estado_cola['enviadas']}")
+        for hoja_c, (intentos_c, error_c) in estado_cola["con_error"].items():
+            st.caption(f"⚠️ {hoja_c}: {estado_cola['pendientes'].get(hoja_c, 0)} sin enviar tras {intentos_c} intentos ({error_c})")
+        if estado_cola["con_error"] and st.button("🔁 Reintentar envío"):
+            cola.reintentar_ahora()
+            st.rerun()
+        if estado_cola["fallidas"]:
+            with st.expander(f"❌ {sum(estado_cola['fallidas'].values())} sin enviar tras {cola.max_intentos} intentos"):
+                for hoja_c, n_c in estado_cola["retenidas"].items():
+                    st.caption(f"⏸️ {hoja_c}: {n_c} en espera hasta volver a la cola o descartar estas")
+                st.dataframe(pd.DataFrame(cola.fallidas()), use_container_width=True, hide_index=True)
+                c_rf, c_df = st.columns(2)
+                if c_rf.button("🔁 Volver a la cola", key="cola_reintentar_fallidas"):
+                    cola.reintentar_fallidas()
+                    st.rerun()
+                if c_df.button("🗑️ Descartar", key="cola_descartar_fallidas"):
+                    cola.descartar_fallidas()
+                    st.rerun()
+    except Exception as e: st.caption(f"⚠️ Cola al Sheet no disponible: {repr(e)}")
+    stats_h = get_cargador_historial().stats
+    st.caption(f"Historial: {stats_h['ms_ultima'] or '-'} ms última lectura · completas: {stats_h['lecturas']} · incrementales: {stats_h['incrementales']}" + (f" · ⚠️ {stats_h['error']}" if stats_h["error"] else ""))
+    with st.expander("⏱️ Latencia APIs de Google"):
+        try: st.dataframe(pd.DataFrame(get_registro_google().resumen_latencias()), use_container_width=True, hide_index=True)
+        except Exception as e: st.caption(repr(e))
     if st.button("Cerrar Sesion"):
         st.session_state['logueado'] = False
         st.rerun()
 
-df_f = df_raw.copy()
-if f_ej != "Todos" and 'Ejecutivo' in df_f.columns: df_f = df_f[df_f['Ejecutivo'] == f_ej]
-if f_as != "Todos": df_f = df_f[df_f[c_aseguradora] == f_as]
-if f_ra != "Todos": df_f = df_f[df_f[c_ramo] == f_ra]
-if f_co != "Todos" and 'Corredor' in df_f.columns: df_f = df_f[df_f['Corredor'] == f_co]
-if f_ag != "Todos" and 'Agente' in df_f.columns: df_f = df_f[df_f['Agente'] == f_ag]
-
-if filtro_vigencia == "Vigentes":
-    df_f = df_f[df_f['Fin de Vigencia'] >= date.today()]
-elif filtro_vigencia == "No vigentes":
-    df_f = df_f[df_f['Fin de Vigencia'] < date.today()]
+df_f = modelo_cartera.vista({'Ejecutivo': f_ej, c_aseguradora: f_as, c_ramo: f_ra, 'Corredor': f_co, 'Agente': f_ag}, filtro_vigencia)
+estado_filtros = (f_ej, f_as, f_ra, f_co, f_ag, filtro_vigencia, date.today())
 tab_carga, tab_car, tab_ven, tab_cot, tab_flota, tab_aeronave, tab_rv, tab_historial, tab_an = st.tabs(["📤 CARGAR PÓLIZA", "👥 CARTERA", "🔄 VENCIMIENTOS", "📝 VEHICULOS", "🚛 FLOTAS", "✈️ AERONAVES", "🏭 RIESGOS VARIOS", "📜 HISTORIAL", "📊 ANALISIS"])
 
 # ==========================================
 # 📤 PESTAÑA CARGAR PÓLIZA (PDF → CLAUDE → SHEET)
 # ==========================================
 with tab_carga:
-    st.subheader("📤 Cargar Póliza desde PDF")
-    st.markdown("<small style='color:gray;'>💡 Subí el PDF, revisá los datos extraídos, corregí lo que falte y guardá en el Sheet.</small>", unsafe_allow_html=True)
+    st.subheader("📤 Cargar Pólizas desde PDF")
+    st.markdown("<small style='color:gray;'>💡 Subí uno o varios PDF, revisá los datos extraídos en la grilla, corregí lo que falte y guardá las aprobadas en el Sheet.</small>", unsafe_allow_html=True)
 
-    pdf_subido = st.file_uploader("Seleccioná la póliza en PDF", type=["pdf"], key="pdf_uploader_poliza")
+    pdfs_subidos = st.file_uploader("Seleccioná las pólizas en PDF", type=["pdf"], accept_multiple_files=True, key="pdf_uploader_poliza")
 
-    if pdf_subido and st.button("🔍 Extraer datos con IA", key="btn_extraer_pdf", use_container_width=True):
+    ignorar_cache = st.checkbox("Volver a leer con IA aunque el PDF ya se haya extraído antes", key="pdf_ignorar_cache")
+    if pdfs_subidos and st.button(f"🔍 Extraer datos con IA ({len(pdfs_subidos)} PDF)", key="btn_extraer_pdf", use_container_width=True):
         try:
-            import anthropic
-            pdf_b64 = base64.standard_b64encode(pdf_subido.read()).decode("utf-8")
-
-            prompt_extraccion = """Extraé los datos de esta póliza de seguros uruguaya y respondé estrictamente en formato JSON con estos campos exactos:
-- asegurado (nombre o razón social del titular)
-- documento (RUT, cédula u otro número de identificación)
-- mail
-- celular
-- aseguradora (BSE, SURA, SBI, MAPFRE, SANCOR, BERKLEY, PORTO, BARBUSS, etc.)
-- ramo (tipo de seguro: VEHÍCULO, HOGAR, EMPRESA, RC, TRANSPORTE, etc.)
-- nro_poliza
-- detalle (matrícula del vehículo, o referencia del bien asegurado)
-- inicio_vigencia (formato DD/MM/YYYY)
-- fin_vigencia (formato DD/MM/YYYY)
-- moneda (USD o UYU)
-- premio_usd (solo el número, sin símbolos, si el premio está en dólares)
-- premio_uyu (solo el número, sin símbolos, si el premio está en pesos)
-
-Reglas:
-- Si un dato no aparece en la póliza, poné null.
-- Para los premios: poné el valor en el campo de su moneda y null en el otro.
-- Respondé ÚNICAMENTE con el objeto JSON. Sin introducciones, sin comentarios, sin delimitadores markdown. Empezá con { y terminá con }."""
-
-            client = anthropic.Anthropic(api_key=st.secrets["ANTHROPIC_API_KEY"])
-            with st.spinner("Leyendo la póliza con IA..."):
-                respuesta = client.messages.create(
-                    model="claude-sonnet-4-6",
-                    max_tokens=1024,
-                    messages=[{
-                        "role": "user",
-                        "content": [
-                            {"type": "document", "source": {"type": "base64", "media_type": "application/pdf", "data": pdf_b64}},
-                            {"type": "text", "text": prompt_extraccion}
-                        ]
-                    }]
-                )
-            texto = respuesta.content[0].text.strip()
-            texto = texto.replace("```json", "").replace("```", "").strip()
-            datos_extraidos = json.loads(texto)
-            st.session_state["datos_pdf_extraidos"] = datos_extraidos
-            st.success("✅ Datos extraídos. Revisalos abajo antes de guardar.")
+            # Vuelve enseguida: las extracciones corren en el pool compartido y se muestran a medida que terminan
+            st.session_state["lote_pdf"] = get_ingesta().procesar([(p.name, p.getvalue()) for p in pdfs_subidos], usar_cache=not ignorar_cache)
         except Exception as e:
             st.error(f"Error al extraer: {e}")
 
-    # --- Revisión y edición antes de guardar ---
-    if "datos_pdf_extraidos" in st.session_state:
-        d = st.session_state["datos_pdf_extraidos"]
-        st.markdown("---")
-        st.markdown("**📝 Revisá y completá los datos:**")
-        cg1, cg2, cg3 = st.columns(3)
-        with cg1:
-            g_aseg = st.text_input("Asegurado", value=d.get("asegurado") or "", key="g_aseg")
-            g_doc = st.text_input("Documento", value=d.get("documento") or "", key="g_doc")
-            g_mail = st.text_input("Mail", value=d.get("mail") or "", key="g_mail")
-            g_cel = st.text_input("Celular", value=d.get("celular") or "", key="g_cel")
-            g_aseguradora = st.text_input("Aseguradora", value=d.get("aseguradora") or "", key="g_aseguradora")
-        with cg2:
-            g_ramo = st.text_input("Ramo", value=d.get("ramo") or "", key="g_ramo")
-            g_poliza = st.text_input("N° de Póliza", value=d.get("nro_poliza") or "", key="g_poliza")
-            g_detalle = st.text_input("Detalle (Matrícula o Referencia)", value=d.get("detalle") or "", key="g_detalle")
-            g_ini = st.text_input("Inicio de Vigencia", value=d.get("inicio_vigencia") or "", key="g_ini")
-            g_fin = st.text_input("Fin de Vigencia", value=d.get("fin_vigencia") or "", key="g_fin")
-        with cg3:
-            g_pusd = st.text_input("Premio USD", value=str(d.get("premio_usd") or ""), key="g_pusd")
-            g_puyu = st.text_input("Premio UYU", value=str(d.get("premio_uyu") or ""), key="g_puyu")
-            g_corredor = st.text_input("Corredor", value="", key="g_corredor")
-            g_ejecutivo = st.text_input("Ejecutivo", value="", key="g_ejecutivo")
-            g_agente = st.text_input("Agente", value="", key="g_agente")
-        g_notas = st.text_area("Notas", value="", key="g_notas")
-
-        st.info("⚠️ Al guardar, esta fila se agrega al final del Sheet. Verificá los datos primero.")
-
-        if st.button("💾 Guardar en el Sheet (al final)", key="btn_guardar_poliza_sheet", use_container_width=True):
-            try:
-                from googleapiclient.discovery import build
-                from googleapiclient.http import MediaIoBaseUpload
+    lote = st.session_state.get("lote_pdf")
+    if lote is not None:
+        if not lote.completo():
+            progreso, grilla_estado = st.progress(0.0), st.empty()
+            def refrescar_estado():
+                progreso.progress(lote.terminados() / len(lote), text=f"Leyendo pólizas con IA... {lote.terminados()} de {len(lote)}")
+                grilla_estado.dataframe(pd.DataFrame(lote.estado()), use_container_width=True, hide_index=True)
+            refrescar_estado()
+            for _ in lote.a_medida_que_terminan():
+                refrescar_estado()
+            progreso.empty(); grilla_estado.empty()
+
+        errores = lote.con_error()
+        with st.expander(f"📄 Lectura de {len(lote)} PDF: {len(lote.listos())} bien ({lote.desde_cache()} desde caché), {len(errores)} con error", expanded=bool(errores)):
+            st.dataframe(pd.DataFrame(lote.estado()), use_container_width=True, hide_index=True,
+                         column_config={"Cache": st.column_config.CheckboxColumn("Desde caché")})
+            cache = get_ingesta().cache
+            if cache is not None:
+                st.caption("Caché de extracciones: {aciertos} aciertos, {fallos} fallos, {guardadas} guardadas, {descartadas} descartadas por tamaño".format(**cache.stats)
+                           + f" · {len(cache)} PDF en caché")
+            st.caption("Enviado al modelo: {:.1f} MB de {:.1f} MB de PDF · {} por vía rápida sin IA · {} reenviados enteros".format(
+                get_ingesta().stats["bytes_enviados"] / 1e6, get_ingesta().stats["bytes_documento"] / 1e6, get_ingesta().stats["regex"], get_ingesta().stats["respaldos"]))
+            if errores and st.button(f"🔁 Reintentar los {len(errores)} con error", key=f"btn_reintentar_pdf_{lote.id}"):
+                get_ingesta().reintentar(lote, errores)
+                st.rerun()
+
+        revision = lote.revision()
+        if revision:
+            st.markdown("---")
+            st.markdown("**📝 Revisá y completá los datos (destildá las que no quieras guardar):**")
+            df_revision = st.data_editor(
+                pd.DataFrame(revision), use_container_width=True, hide_index=True, key=f"editor_revision_pdf_{lote.id}",
+                column_config={"Guardar": st.column_config.CheckboxColumn("Guardar"), "Item": None, "Archivo": st.column_config.TextColumn("Archivo", disabled=True),
+                               **{c: st.column_config.TextColumn(t) for c, t in COLUMNAS_REVISION.items()}})
+            aprobadas = df_revision[df_revision["Guardar"]]
 
-                info_sa = json.loads(st.secrets["connections"]["gsheets"]["service_account"])
-                scopes = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
-                creds = Credentials.from_service_account_info(info_sa, scopes=scopes)
+            st.info("⚠️ Al guardar, las filas aprobadas se agregan al final del Sheet. Verificá los datos primero.")
 
-                # --- Subir el PDF a "Pólizas" (o reusar si ya existe) ---
-                link_pdf = ""
+            if st.button(f"💾 Guardar {len(aprobadas)} pólizas en el Sheet (al final)", key="btn_guardar_poliza_sheet", use_container_width=True, disabled=aprobadas.empty):
+                registro = get_registro_google()
                 try:
-                    ID_CARPETA_POLIZAS = "0ALMblQ4PWOIPUk9PVA"
-                    drive_service = build("drive", "v3", credentials=creds)
-
-                    # Buscar si ya existe un archivo con ese nombre en la carpeta
-                    nombre_archivo = pdf_subido.name.replace("'", "\\'")
-                    query = f"name = '{nombre_archivo}' and '{ID_CARPETA_POLIZAS}' in parents and trashed = false"
-                    existentes = drive_service.files().list(
-                        q=query, fields="files(id, webViewLink)",
-                        supportsAllDrives=True, includeItemsFromAllDrives=True,
-                        corpora="allDrives"
-                    ).execute().get("files", [])
-
-                    if existentes:
-                        # Ya existe: reusamos su link, no duplicamos
-                        link_pdf = existentes[0].get("webViewLink", "")
-                        st.info(f"📎 El PDF ya estaba en Drive. Se reutilizó el archivo existente.")
-                    else:
-                        # No existe: lo subimos
-                        pdf_subido.seek(0)
-                        media = MediaIoBaseUpload(pdf_subido, mimetype="application/pdf", resumable=True)
-                        archivo_meta = {"name": pdf_subido.name, "parents": [ID_CARPETA_POLIZAS]}
-                        archivo = drive_service.files().create(
-                            body=archivo_meta, media_body=media,
-                            fields="id, webViewLink", supportsAllDrives=True
-                        ).execute()
-                        link_pdf = archivo.get("webViewLink", "")
-                except Exception as e_drive:
-                    st.warning(f"⚠️ La fila se guardará pero hubo un problema con el PDF en Drive: {repr(e_drive)}")
-
-                # --- Guardar la fila en el Sheet ---
-                gc = gspread.authorize(creds)
-                sh = gc.open_by_key(SHEET_ID)
-                ws = sh.worksheet("Respuestas de formulario 2")
-
-                polizas_existentes = [str(p).strip() for p in ws.col_values(8)]
-                if g_poliza and str(g_poliza).strip() in polizas_existentes:
-                    st.warning(f"⚠️ Esta póliza (N° {g_poliza}) ya fue cargada. No se guardó para evitar duplicados.")
-                else:
-                    fila_nueva = [
-                        datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
-                        st.session_state.get("g_mail", ""),
-                        st.session_state.get("g_aseg", ""),
-                        st.session_state.get("g_doc", ""),
-                        st.session_state.get("g_cel", ""),
-                        st.session_state.get("g_aseguradora", ""),
-                        st.session_state.get("g_ramo", ""),
-                        st.session_state.get("g_poliza", ""),
-                        st.session_state.get("g_detalle", ""),
-                        st.session_state.get("g_ini", ""),
-                        st.session_state.get("g_fin", ""),
-                        st.session_state.get("g_corredor", ""),
-                        st.session_state.get("g_ejecutivo", ""),
-                        st.session_state.get("g_agente", ""),
-                        st.session_state.get("g_pusd", ""),
-                        st.session_state.get("g_puyu", ""),
-                        link_pdf,
-                        st.session_state.get("g_notas", ""),
-                        "",
-                    ]
-                    ws.append_row(fila_nueva, value_input_option="USER_ENTERED")
-                    st.success(f"✅ ¡Póliza de {g_aseg} guardada al final del Sheet!")
-                    if link_pdf:
-                        st.success(f"📎 PDF subido a Drive: [Ver póliza]({link_pdf})")
-                    st.balloons()
-                    del st.session_state["datos_pdf_extraidos"]
-            except Exception as e:
-                st.error(f"Error al guardar en el Sheet: {repr(e)}")
+                    ws = registro.hoja(SHEET_ID, HOJA_POLIZAS)
+                    indice_polizas = get_indice_polizas()
+                    nuevas, repetidas = separar_repetidas(aprobadas.to_dict("records"), indice_polizas)
+                    for d in repetidas:
+                        st.warning(f"⚠️ La póliza N° {d['nro_poliza']} ({d['Archivo']}) ya fue cargada. No se guardó para evitar duplicados.")
+
+                    # --- Link de cada PDF: el del archivo que ya esta en "Pólizas", o un marcador hasta que suba ---
+                    subidas = get_subidas_drive()
+                    filas, a_subir = [], []
+                    for d in nuevas:
+                        pdf = lote.items[int(d["Item"])]["pdf"]
+                        link_pdf = subidas.link_existente(pdf)
+                        if link_pdf is not None:
+                            st.info(f"📎 {d['Archivo']}: el PDF ya estaba en Drive (mismo contenido). Se reutilizó el archivo existente.")
+                        else:
+                            link_pdf = marcador_subida(pdf)
+                            a_subir.append((d["Archivo"], pdf, link_pdf))
+                        filas.append(fila_poliza(d, link_pdf))
+
+                    # --- Todas las filas en una sola escritura; los PDF suben despues, en segundo plano ---
+                    if filas:
+                        with registro.medir("append_rows"):
+                            ws.append_rows(filas, value_input_option="USER_ENTERED")
+                        indice_polizas.agregar(d["nro_poliza"] for d in nuevas)
+                        for nombre_pdf, pdf, marcador in a_subir:
+                            subidas.encolar(nombre_pdf, pdf, marcador)
+                        st.success(f"✅ ¡{len(filas)} pólizas guardadas al final del Sheet!"
+                                   + (f" {len(a_subir)} PDF subiendo a Drive: el link se completa solo al terminar." if a_subir else ""))
+                        st.balloons()
+                        del st.session_state["lote_pdf"]
+                except Exception as e:
+                    registro.invalidar(SHEET_ID, HOJA_POLIZAS)
+                    st.error(f"Error al guardar en el Sheet: {repr(e)}")
+
+    try:
+        subidas = get_subidas_drive()
+        estado_subidas = subidas.estado()
+    except Exception as e:
+        estado_subidas = []
+        st.caption(f"⚠️ Subidas a Drive no disponibles: {repr(e)}")
+    if estado_subidas:
+        fallidas = sum(s["Estado"] == "fallida" for s in estado_subidas)
+        with st.expander(f"☁️ Subidas a Drive (últimas 24 h): {subidas.pendientes()} en curso, {fallidas} fallidas", expanded=bool(fallidas)):
+            st.dataframe(pd.DataFrame(estado_subidas), use_container_width=True, hide_index=True, column_config={
+                "Progreso": st.column_config.ProgressColumn("Progreso", min_value=0, max_value=100, format="%d%%"),
+                "Link": st.column_config.LinkColumn("Link")})
+            if subidas.stats["ultimo_error"]: st.caption(f"Último error: {subidas.stats['ultimo_error']}")
+            cs1, cs2 = st.columns(2)
+            if cs1.button("🔄 Actualizar progreso", key="btn_refrescar_subidas"): st.rerun()
+            if (fallidas or subidas.pendientes()) and cs2.button("🔁 Reintentar ahora", key="btn_reintentar_subidas"):
+                subidas.reintentar()
+                st.rerun()
 
 # --- CARTERA ---
 with tab_car:
-    busq = st.text_input("🔍 Buscar cliente o matricula en cartera...")
-    df_c = df_f[df_f.astype(str).apply(lambda x: x.str.contains(busq, case=False)).any(axis=1)] if busq else df_f
+    busq = st.text_input("🔍 Buscar cliente, documento, matricula, poliza o mail en cartera...")
+    df_c = modelo_cartera.buscar(busq, dentro=df_f) if busq else df_f
     if not df_c.empty:
         df_resumen = df_c.copy()
         col_cliente_real = next((col for col in df_resumen.columns if "asegurado" in str(col).lower() or "client" in str(col).lower()), None)
@@ -624,6 +349,7 @@ with tab_car:
         st.markdown("<small style='color:gray;'>💡 Hace un clic en el extremo izquierdo de cualquier fila para ver el detalle abajo</small>", unsafe_allow_html=True)
         st.dataframe(df_resumen, use_container_width=True, hide_index=False, on_select="rerun", selection_mode="single-row", key="grid_cartera_unica",
             column_config={"Poliza": st.column_config.LinkColumn("Poliza", display_text="📎 Ver PDF"), "Vencimiento": st.column_config.DateColumn("Vencimiento", format="DD/MM/YYYY"), "Premio USD": st.column_config.NumberColumn("Premio USD", format="USD %,d"), "Premio UYU": st.column_config.NumberColumn("Premio UYU", format="$ %,d"), "Premio Total (USD)": st.column_config.NumberColumn("Premio Total (USD)", format="USD %,d")})
+        panel_exportar(df_resumen, ("cartera", modelo_cartera.version, estado_filtros, busq), "Cartera", "Cartera", "cartera")
         selection = st.session_state.get("grid_cartera_unica", {}).get("selection", {})
         filas_seleccionadas = selection.get("rows", [])
         if filas_seleccionadas and filas_seleccionadas[0] < len(df_c):
@@ -644,26 +370,24 @@ with tab_car:
                     st.write(f"• **Notas:** {fila_completa.get('Notas', 'N/D')}")
                 with cx3:
                     st.markdown("**Gestion e Intermediacion:**")
-                    st.write(f"• **Fin de Vigencia:** {fila_completa.get('Fin de Vigencia', 'N/D')}")
+                    fin_vig = fila_completa.get('Fin de Vigencia')
+                    st.write(f"• **Fin de Vigencia:** {fin_vig.strftime('%d/%m/%Y') if pd.notna(fin_vig) else 'N/D'}")
                     st.write(f"• **Ejecutivo:** {fila_completa.get('Ejecutivo', 'N/D')}")
                     st.write(f"• **Corredor/Agente:** {fila_completa.get('Corredor', 'N/D')} / {fila_completa.get('Agente', 'N/D')}")
             col_aseg_raw = 'Asegurado (Nombre/Razón Social)'
             col_mat_raw = 'Detalle (Matricula o Referencia)'
             col_ramo_raw = 'Ramo'
             nombre_cliente = fila_completa.get(col_aseg_raw, '')
-            ramo_cliente = fila_completa.get(col_ramo_raw, '')
-            matricula_cliente = fila_completa.get(col_mat_raw, '')
             if nombre_cliente and col_aseg_raw in df_raw.columns:
-                mask = (df_raw[col_aseg_raw] == nombre_cliente)
-                if ramo_cliente and col_ramo_raw in df_raw.columns:
-                    mask = mask & (df_raw[col_ramo_raw] == ramo_cliente)
-                if matricula_cliente and col_mat_raw in df_raw.columns:
-                    mask = mask & (df_raw[col_mat_raw] == matricula_cliente)
-                df_historial_cliente = df_raw[mask].sort_values('Fin de Vigencia', ascending=False)
+                df_historial_cliente = modelo_cartera.historial.poliza(fila_completa)
+                cols_hist = [c for c in [c_aseguradora, col_ramo_raw, col_mat_raw, 'Fin de Vigencia', c_p_usd, c_p_uyu] if c in df_raw.columns]
                 if not df_historial_cliente.empty:
                     st.markdown(f"#### 📋 Historial ({len(df_historial_cliente)} registros)")
-                    cols_hist = [c for c in [c_aseguradora, col_ramo_raw, col_mat_raw, 'Fin de Vigencia', c_p_usd, c_p_uyu] if c in df_historial_cliente.columns]
                     st.dataframe(df_historial_cliente[cols_hist], use_container_width=True, hide_index=True)
+                df_polizas_cliente = modelo_cartera.historial.cliente(fila_completa.get('Documento de Identidad (Rut/Cédula/Otros)'), nombre_cliente)
+                if len(df_polizas_cliente) > len(df_historial_cliente):
+                    with st.expander(f"📂 Todas las pólizas del cliente ({len(df_polizas_cliente)})"):
+                        st.dataframe(df_polizas_cliente[cols_hist], use_container_width=True, hide_index=True)
     else:
         st.info("No se encontraron registros en la cartera.")
 
@@ -671,12 +395,24 @@ with tab_car:
 with tab_ven:
     st.subheader("🔄 Control de Vencimientos")
     if not df_f.empty:
-        df_v = df_f.dropna(subset=['Fin de Vigencia'])
+        indice_venc = modelo_cartera.vencimientos
+        permitidas_venc = modelo_cartera.permitidas(df_f)
+        kp = st.columns(3)
+        for col_kp, dias in zip(kp, [30, 60, 90]):
+            cant_kp, premio_kp = indice_venc.proximos(dias, permitidas=permitidas_venc)
+            col_kp.metric(f"Próximos {dias} días", f"{cant_kp} pólizas", f"USD {premio_kp:,.0f}", delta_color="off")
         c1, c2 = st.columns(2)
         f_ini = c1.date_input("Desde:", date.today().replace(day=1))
         f_fin = c2.date_input("Hasta:", date.today() + timedelta(days=90))
-        df_venc_f = df_v[(df_v['Fin de Vigencia'] >= f_ini) & (df_v['Fin de Vigencia'] <= f_fin)].sort_values('Fin de Vigencia')
+        pos_venc = indice_venc.rango(f_ini, f_fin, permitidas_venc)
+        df_venc_f = modelo_cartera.df.take(pos_venc)
         if not df_venc_f.empty:
+            with st.expander("📅 Calendario de renovaciones"):
+                import plotly.express as px
+                df_cal = indice_venc.calendario(pos_venc)
+                st.plotly_chart(px.density_heatmap(df_cal, x="Semana", y="Día", z="Pólizas", histfunc="sum", category_orders={"Semana": df_cal["Semana"].unique().tolist(), "Día": ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]}, color_continuous_scale="Blues"), use_container_width=True)
+                st.dataframe(indice_venc.por_periodo(pos_venc, "M"), use_container_width=True, hide_index=True,
+                    column_config={"Periodo": st.column_config.DateColumn("Mes", format="MM/YYYY"), "Premio USD": st.column_config.NumberColumn("Premio USD", format="USD %,d")})
             df_venc_resumen = df_venc_f.copy()
             col_cliente_real_v = next((col for col in df_venc_resumen.columns if "asegurado" in str(col).lower() or "client" in str(col).lower()), None)
             if col_cliente_real_v: df_venc_resumen = df_venc_resumen.rename(columns={col_cliente_real_v: "Asegurado"})
@@ -687,60 +423,33 @@ with tab_ven:
             st.markdown("<small style='color:gray;'>💡 Hace un clic en el extremo izquierdo de cualquier fila para ver el detalle abajo</small>", unsafe_allow_html=True)
             st.dataframe(df_venc_resumen, use_container_width=True, hide_index=False, on_select="rerun", selection_mode="single-row", key="grid_venc_unico",
                 column_config={"Poliza": st.column_config.LinkColumn("Poliza", display_text="📎 Ver PDF"), "Vencimiento": st.column_config.DateColumn("Vencimiento", format="DD/MM/YYYY"), "Premio USD": st.column_config.NumberColumn("Premio USD", format="USD %,d"), "Premio UYU": st.column_config.NumberColumn("Premio UYU", format="$ %,d"), "Premio Total (USD)": st.column_config.NumberColumn("Premio Total (USD)", format="USD %,d")})
-            output = io.BytesIO()
-            with pd.ExcelWriter(output, engine='xlsxwriter') as writer: df_venc_f.to_excel(writer, index=False, sheet_name='Vencimientos')
-            st.download_button(label="📥 Exportar Vencimientos Completos a Excel", data=output.getvalue(), file_name="Vencimientos.xlsx")
+            panel_exportar(df_venc_f, ("venc", modelo_cartera.version, estado_filtros, f_ini, f_fin), "Vencimientos", "Vencimientos", "venc", "📥 Exportar Vencimientos Completos")
+            columnas_renov = {"asegurado": c_asegurado, "aseguradora": c_aseguradora, "ramo": c_ramo, "detalle": col_map.get("detalle", ""), "premio_usd": c_p_usd, "premio_uyu": c_p_uyu, "celular": "Celular", "mail": modelo_cartera.campos_busqueda.get("mail"), "ejecutivo": "Ejecutivo"}
+            with st.expander("📣 Campaña de renovaciones (mensajes para todo el rango)"):
+                ejecutivos_rango = sorted(df_venc_f["Ejecutivo"].dropna().unique().tolist()) if "Ejecutivo" in df_venc_f.columns else []
+                cc1, cc2, cc3 = st.columns([3, 2, 1])
+                sel_ejecutivos = cc1.multiselect("Ejecutivos", ejecutivos_rango, default=ejecutivos_rango, key="camp_ejecutivos")
+                firmar_ejecutivo = cc2.checkbox("Firmar con el ejecutivo de cada póliza", value=True, key="camp_firma")
+                formato_camp = cc3.selectbox("Formato", ["zip", "xlsx", "csv"], key="camp_formato", format_func=lambda f: {"zip": "ZIP por asesor", "xlsx": "Excel", "csv": "CSV"}[f])
+                df_camp = df_venc_f[df_venc_f["Ejecutivo"].isin(sel_ejecutivos)] if ejecutivos_rango else df_venc_f
+                clave_camp = ("campana", modelo_cartera.version, estado_filtros, f_ini, f_fin, tuple(sel_ejecutivos), firmar_ejecutivo, formato_camp)
+                cache_exp = get_cache_exportaciones()
+                datos_camp = cache_exp.obtener(clave_camp)
+                if datos_camp is None and st.button(f"✉️ Generar {len(df_camp)} mensajes", key="btn_campana", use_container_width=True):
+                    with st.spinner("Generando mensajes..."):
+                        asesor_camp = NOMBRES.get(st.session_state.usuario_actual, st.session_state.usuario_actual)
+                        msjs = mensajes_renovacion(df_camp, columnas_renov, asesor_camp, NOMBRES if firmar_ejecutivo else None)
+                        datos_camp = cache_exp.guardar(clave_camp, exportar_campana(msjs, formato_camp))
+                if datos_camp is not None:
+                    mime_camp = "application/zip" if formato_camp == "zip" else FORMATOS[formato_camp][1]
+                    st.download_button(f"💾 Descargar campaña ({formato_camp})", data=datos_camp, file_name=f"Renovaciones.{formato_camp}", mime=mime_camp, key="dl_campana", use_container_width=True)
             selection_v = st.session_state.get("grid_venc_unico", {}).get("selection", {})
             filas_seleccionadas_v = selection_v.get("rows", [])
             if filas_seleccionadas_v:
                 fila_completa_v = df_venc_f.iloc[filas_seleccionadas_v[0]]
-                def limpiar(val):
-                    v = str(val).strip()
-                    return '' if v in ['nan', 'None', 'N/D', 'none'] else v
-                nombre_completo = limpiar(fila_completa_v.get(c_asegurado, ''))
-                if not nombre_completo:
-                    for col in fila_completa_v.index:
-                        if 'asegurado' in str(col).lower() or 'nombre' in str(col).lower():
-                            val = limpiar(str(fila_completa_v.get(col, '')))
-                            if val:
-                                nombre_completo = val
-                                break
-                nombre_corto = nombre_completo.split()[0].capitalize() if nombre_completo else 'Cliente'
                 c_mail_v = col_map.get("direccion de correo electronico", col_map.get("mail", col_map.get("email", "")))
-                premio_uyu_v = limpiar(str(fila_completa_v.get(c_p_uyu, '')))
-                premio_usd_v = limpiar(str(fila_completa_v.get(c_p_usd, '')))
-                aseguradora_actual = limpiar(fila_completa_v.get(c_aseguradora, '')) or 'su aseguradora'
-                ramo_v = limpiar(fila_completa_v.get(c_ramo, '')) or 'bien asegurado'
-                c_detalle_v = col_map.get("detalle", "")
-                detalle_ren = limpiar(fila_completa_v.get(c_detalle_v, '')) if c_detalle_v else ''
-                ramo_completo = f"{ramo_v} ({detalle_ren})" if detalle_ren else ramo_v
-                vencimiento_v = fila_completa_v.get('Fin de Vigencia', '')
-                fecha_fmt = vencimiento_v.strftime('%d/%m/%Y') if hasattr(vencimiento_v, 'strftime') else str(vencimiento_v)
                 nombre_asesor_v = NOMBRES.get(st.session_state.usuario_actual, st.session_state.usuario_actual)
-                if premio_uyu_v and str(premio_uyu_v) not in ['0']:
-                    premio_txt = f"UYU {f_num(premio_uyu_v)}"
-                elif premio_usd_v and str(premio_usd_v) not in ['0']:
-                    premio_txt = f"USD {f_num(premio_usd_v)}"
-                else:
-                    premio_txt = "a coordinar"
-                texto_wp = f"""Hola {nombre_corto}!
-Te escribo porque esta venciendo la poliza de tu {ramo_completo} el proximo *{fecha_fmt}*.
-Este anio estabas pagando en *{aseguradora_actual}: {premio_txt}*.
-Para la renovacion tenemos los siguientes comparativos:
-
-- BSE:
-- SBI:
-- MAPFRE:
-- SANCOR:
-- SURA:
-- PORTO:
-- BERKLEY:
-
-Auto Sustituto (por 15 dias) en caso de chocar y que tu vehiculo vaya al taller y necesites uno, debemos agregar $3.300 a cualquier aseguradora.
-
-Quedo a las ordenes,
-Saludos!
-{nombre_asesor_v}"""
+                texto_wp = mensajes_renovacion(df_venc_f.iloc[[filas_seleccionadas_v[0]]], columnas_renov, nombre_asesor_v)["Mensaje"].iloc[0]
                 st.write("")
                 with st.container(border=True):
                     st.markdown(f"### Detalle de la Poliza (Vencimiento): {fila_completa_v.get(c_asegurado, 'Cliente')}")
@@ -763,16 +472,6 @@ Saludos!
         else:
             st.info("No hay vencimientos en el rango seleccionado.")
 
-# PLANTILLAS
-txt_ben_veh = "• Auxilio mecanico e ilimitado\n• Cobertura Mercosur\n• Cristales: USD 300 SANCOR, USD 200 BSE O SBI, USD 100 SURA, demas cobran deducible\n• Granizo: SANCOR incluido sin deducible, demas aplican deducible."
-txt_hog_veh = "• Incendio Edificio USD 100.000\n• Incendio Contenido 50.000\n• Hurto Contenido 5.000\n• Costo anual Casas: USD 180\n• Costo anual Aptos: USD 120"
-txt_alq_veh = "• Auto de alquiler por hasta 15 días en caso de que sufras un siniestro con tu vehículo asegurado.\n• Costo anual: UYU 3.300 por vehiculo."
-txt_bic_veh = "• Cobertura Hurto bicicleta hasta USD 1.000.\n• Costo anual: USD 120"
-txt_obs_flota = "Vigencia:\nForma de Pago: redes de cobranza o tarjeta de credito en 10 cuotas sin recargo.\nBeneficios\n  - Auxilio mecanico ilimitado.\n  - Cristales: SANCOR USD 300, BSE y SBI USD 200, SURA USD 100.\n  - Granizo: SANCOR lo cubre, demas cobran deducible."
-txt_acc_flota = "• Seguro de Vida Accidentes choferes: USD 25.000.\n• Costo anual: UYU 1.900 por chofer."
-txt_alq_flota = "• Auto de alquiler por hasta 15 días en caso de que sufras un siniestro con tu vehículo asegurado.\n• Costo anual: UYU 3.300 por vehiculo."
-txt_bic_flota = "• Bici electrica o moto hasta USD 1.000.\n• Costo anual: UYU 5.000"
-
 # --- VEHICULOS INDIVIDUAL ---
 with tab_cot:
     st.subheader("📝 Cotizador Seguros Individuales")
@@ -815,12 +514,10 @@ with tab_cot:
         c_b = st.text_area("Bici Electrica:", value=edit_ind.get("cb", txt_bic_veh), height=50, key="ind_bic_v_final")
     if st.button("💾 Guardar propuesta y Generar Link", type="primary", use_container_width=True, key="save_ind_btn"):
         datos_i = {"fecha": datetime.now().strftime("%d/%m/%Y %H:%M"), "n": n_cot, "v": v_cot, "matricula": mat_cot, "cobertura_cot": cob_cot, "zona": zona_cot, "e": e_cot, "cont": cont_cot, "doc": doc_in, "tab": t_edit.to_dict(orient='records'), "ben": b_cot, "ch": c_h, "ca": c_a, "cb": c_b, "tipo": "Individual"}
-        st.session_state.historico.append(datos_i)
         st.session_state.edit_data = datos_i
-        datos_b64 = base64.b64encode(json.dumps(datos_i).encode()).decode()
-        link_cliente = f"https://dfseguros.streamlit.app/?q={datos_b64}"
+        link_cliente = link_propuesta(datos_i)
         primera_aseg = t_edit.iloc[0] if not t_edit.empty else {}
-        guardar_en_sheet("Cotizaciones Individuales", [datos_i["fecha"], n_cot, doc_in, v_cot, mat_cot, cob_cot, zona_cot, e_cot, str(primera_aseg.get("Aseguradora", "")), str(primera_aseg.get("Contado", "")), str(primera_aseg.get("10 Cuotas", "")), str(primera_aseg.get("Deducible", "")), link_cliente])
+        guardar_propuesta(datos_i, link_cliente, [datos_i["fecha"], n_cot, doc_in, v_cot, mat_cot, cob_cot, zona_cot, e_cot, str(primera_aseg.get("Aseguradora", "")), str(primera_aseg.get("Contado", "")), str(primera_aseg.get("10 Cuotas", "")), str(primera_aseg.get("Deducible", "")), link_cliente])
         st.success("Propuesta guardada!")
         st.text_input("🔗 Enlace para mandar al cliente:", value=link_cliente)
         st.components.v1.html(f'<button class="btn-copiar-edf" onclick="navigator.clipboard.writeText(\'{link_cliente}\').then(() => {{ this.innerText = \'📋 Link Copiado!\'; }}).catch(err => {{ alert(\'Error\'); }})">📋 Copiar Link de Vehiculo</button>', height=60)
@@ -842,13 +539,40 @@ with tab_flota:
         if not edit_f:
             st.session_state["f_co_fl"] = CONTACTOS.get(f_asesor_nombre, "")
         f_contacto = f_c4.text_input("Contacto", key="f_co_fl")
-    cols_f = ["Marca", "Modelo", "Ano", "Matricula", "Cobertura", "Contado", "Deducible"]
-    if edit_f and "tab" in edit_f:
+    cols_f = COLUMNAS_FLOTA
+    with st.expander("📥 Importar flota desde CSV / Excel"):
+        st.caption("Columnas: Marca, Modelo, Año, Matrícula y opcionales Cobertura, Contado, Deducible. Reemplaza lo que haya en la tabla.")
+        archivo_fl = st.file_uploader("Planilla de la flota", type=["csv", "xlsx"], key="f_import_archivo", label_visibility="collapsed")
+        if archivo_fl is not None and st.session_state.get("_f_import_archivo") != archivo_fl.file_id:
+            try:
+                with st.spinner("Leyendo la flota..."):
+                    df_imp, avisos_imp = importar_flota(leer_planilla(archivo_fl), modelo_cartera.matriculas)
+                # El editor se reinicia con la planilla (nueva key); queda atado a la propuesta que se estaba armando
+                st.session_state["f_importada"] = (id(st.session_state.edit_data), df_imp, avisos_imp)
+                st.session_state["f_import_n"] = st.session_state.get("f_import_n", 0) + 1
+            except Exception as e:
+                st.error(f"No se pudo leer la planilla: {e}")
+            st.session_state["_f_import_archivo"] = archivo_fl.file_id
+        importada = st.session_state.get("f_importada")
+        if importada and importada[0] == id(st.session_state.edit_data):
+            st.success(f"{len(importada[1])} vehículos importados.")
+            if not importada[2].empty:
+                st.warning(f"⚠️ {importada[2]['Fila'].nunique()} filas para revisar (quedan en la tabla para corregir):")
+                st.dataframe(importada[2], use_container_width=True, hide_index=True)
+    importada = st.session_state.get("f_importada")
+    if importada and importada[0] == id(st.session_state.edit_data):
+        df_f_init = importada[1]
+    elif edit_f and "tab" in edit_f:
         df_f_init = pd.DataFrame(edit_f["tab"])
     else:
-        df_f_init = pd.DataFrame([{"Marca": "", "Modelo": "", "Ano": "", "Matricula": "", "Cobertura": "Todo Riesgo", "Contado": 0, "Deducible": 0}])
-    t_flota = st.data_editor(df_f_init, num_rows="dynamic", use_container_width=True, column_order=cols_f, key="editor_flotas",
+        df_f_init = pd.DataFrame([{"Marca": "", "Modelo": "", "Ano": "", "Matricula": "", "Cobertura": COBERTURA_DEFECTO, "Contado": 0, "Deducible": 0}])
+    n_import = st.session_state.get("f_import_n", 0)
+    t_flota = st.data_editor(df_f_init, num_rows="dynamic", use_container_width=True, column_order=cols_f, key=f"editor_flotas_{n_import}" if n_import else "editor_flotas",
         column_config={"Contado": st.column_config.NumberColumn("Contado", format="$ %,d"), "Deducible": st.column_config.NumberColumn("Deducible", format="$ %,d")})
+    if len(t_flota) > 1:
+        with st.expander(f"🧮 Totales por cobertura ({len(t_flota)} vehículos)"):
+            st.dataframe(totales_por_cobertura(t_flota), use_container_width=True, hide_index=True,
+                column_config={"Contado": st.column_config.NumberColumn("Contado", format="$ %,d")})
     col_f_a, col_f_b = st.columns(2)
     with col_f_a:
         f_obs = st.text_area("Observaciones / Comentarios:", value=edit_f.get('ben', txt_obs_flota), height=320, key="f_obs_fl")
@@ -859,59 +583,14 @@ with tab_flota:
         f_cb = st.text_area("Bici Electrica o Moto:", value=edit_f.get("cb", txt_bic_flota), height=50, key="flota_bic_v_final")
     if st.button("💾 Guardar propuesta de Flota y Generar Link", key="btn_save_fl", use_container_width=True):
         nueva_f = {"fecha": datetime.now().strftime("%d/%m/%Y %H:%M"), "n": f_asegurado, "e": f_cia_elegida, "e_nombre": f_asesor_nombre, "cont": f_contacto, "tab": t_flota.to_dict(orient='records'), "ben": f_obs, "ch": f_ch, "ca": f_ca, "cb": f_cb, "tipo": "Flota"}
-        st.session_state.historico.append(nueva_f)
         st.session_state.edit_data = nueva_f
-        datos_b64 = base64.b64encode(json.dumps(nueva_f).encode()).decode()
-        link_flota = f"https://dfseguros.streamlit.app/?q={datos_b64}"
-        vehiculos_txt = " | ".join([f"{r.get('Marca','')} {r.get('Modelo','')} {r.get('Matricula','')}" for _, r in t_flota.iterrows() if r.get('Marca','')])
-        guardar_en_sheet("Cotizaciones Flotas", [nueva_f["fecha"], f_asegurado, f_cia_elegida, f_asesor_nombre, vehiculos_txt, link_flota])
+        link_flota = link_propuesta(nueva_f)
+        vehiculos_txt = resumen_vehiculos(t_flota)
+        guardar_propuesta(nueva_f, link_flota, [nueva_f["fecha"], f_asegurado, f_cia_elegida, f_asesor_nombre, vehiculos_txt, link_flota])
         st.success("Propuesta de Flota guardada!")
         st.text_input("🔗 Enlace para mandar al cliente:", value=link_flota)
         st.components.v1.html(f'<button class="btn-copiar-edf" onclick="navigator.clipboard.writeText(\'{link_flota}\').then(() => {{ this.innerText = \'📋 Link Copiado!\'; }}).catch(err => {{ alert(\'Error\'); }})">📋 Copiar Link de Flota</button>', height=60)
 
-# --- PLANTILLAS RIESGOS VARIOS (TODO RIESGO OPERATIVO) ---
-COBERTURAS_RV = [
-    {"Cobertura": "Edificios", "Capital (USD)": 0},
-    {"Cobertura": "Contenido General", "Capital (USD)": 0},
-    {"Cobertura": "Mercaderías", "Capital (USD)": 0},
-    {"Cobertura": "Perdida de Beneficio (12 meses de cobertura)", "Capital (USD)": 0},
-]
-
-SUBLIMITES_RV = [
-    {"Cobertura": "Huracán, vendaval y tornado", "Capital (USD)": "Incluido", "Deducible": "General"},
-    {"Cobertura": "Terremoto o Temblor", "Capital (USD)": "Incluido", "Deducible": "General"},
-    {"Cobertura": "Granizo", "Capital (USD)": "Incluido", "Deducible": "General"},
-    {"Cobertura": "Daños Materiales e Incendio por Tumultos Populares", "Capital (USD)": "Incluido", "Deducible": "General"},
-    {"Cobertura": "Cláusula de 72 horas por Ocurrencia", "Capital (USD)": "Incluido", "Deducible": "1 deducible"},
-    {"Cobertura": "Cristales", "Capital (USD)": "5000", "Deducible": "150"},
-    {"Cobertura": "Gastos de Limpieza y Remoción De Escombros", "Capital (USD)": "900000", "Deducible": "No aplica"},
-    {"Cobertura": "Hurto y/o Rapiña: Contenido General, Mercaderías, existencias.", "Capital (USD)": "200000", "Deducible": "1000"},
-    {"Cobertura": "Daños por agua e inundación", "Capital (USD)": "150000", "Deducible": "10% stro, mín USD 2.000"},
-    {"Cobertura": "Inclusión Automática De Bienes (60 días)", "Capital (USD)": "200000", "Deducible": "No aplica"},
-    {"Cobertura": "Honorarios Profesionales", "Capital (USD)": "50000", "Deducible": "No aplica"},
-    {"Cobertura": "Gastos Extraordinarios", "Capital (USD)": "100000", "Deducible": "10% stro, max USD 35.000"},
-    {"Cobertura": "Gastos De Extinción De Incendio", "Capital (USD)": "100000", "Deducible": "No aplica"},
-    {"Cobertura": "Costo De Reconstrucción De Documentos", "Capital (USD)": "40000", "Deducible": "No aplica"},
-    {"Cobertura": "Daños Eléctricos Equipos Electrónicos", "Capital (USD)": "50000", "Deducible": "10% stro, mín USD 2.000"},
-    {"Cobertura": "Objetos Personales", "Capital (USD)": "50000", "Deducible": "1000"},
-    {"Cobertura": "Bienes bajo cuidado, custodia y control", "Capital (USD)": "100000", "Deducible": "1000"},
-    {"Cobertura": "Daños por granizo - Vehículos y Maquinaria a la Intemperie", "Capital (USD)": "0", "Deducible": "5% Stro, mínimo USD 5.000"},
-    {"Cobertura": "Infidelidad de Dependientes", "Capital (USD)": "20000", "Deducible": "1000"},
-    {"Cobertura": "Valores en Caja y/o Tránsito", "Capital (USD)": "20000", "Deducible": "1000"},
-    {"Cobertura": "Bienes en proceso de Construcción y Montaje", "Capital (USD)": "100000", "Deducible": "5% Stro, mínimo USD 1.000"},
-    {"Cobertura": "Gastos de Alquiler - Periodo máximo: 6 meses", "Capital (USD)": "100000", "Deducible": "No aplica"},
-    {"Cobertura": "Gastos Extras (fletes, horas extras, trabajos nocturnos)", "Capital (USD)": "100000", "Deducible": "No aplica"},
-    {"Cobertura": "Gastos de Flete", "Capital (USD)": "100000", "Deducible": "No aplica"},
-    {"Cobertura": "Rotura de Maquinaria", "Capital (USD)": "100000", "Deducible": "10% del Stro, mín USD 2.000"},
-    {"Cobertura": "Mercaderías propias en Depósitos", "Capital (USD)": "100000", "Deducible": "2000"},
-    {"Cobertura": "Falta de Frío", "Capital (USD)": "50000", "Deducible": "5% Stro, mínimo USD 5.000"},
-    {"Cobertura": "No Aplica Infraseguros, Siniestros menores a:", "Capital (USD)": "200000", "Deducible": "General"},
-]
-
-txt_aclaraciones_rv = "1) Se incluye cobertura de Granizo"
-txt_ubicaciones_rv = "1)\n2)\n3)"
-txt_equipos_rv = "1)\n2)\n3)"
-
 # --- AERONAVES ---
 with tab_aeronave:
     st.subheader("✈️ Cotizador Seguros de Aeronaves")
@@ -973,46 +652,31 @@ with tab_aeronave:
     aptitud_default = edit_av.get("aptitud_aterrizaje", True) if edit_av else True
     aptitud_incluida = st.checkbox("Aptitud de aterrizaje en pistas no autorizadas: Incluido", value=aptitud_default, key="av_aptitud")
 
-    filas_calc = []
-    subtotal = 0.0
-    for _, row in t_princ.iterrows():
-        cob = str(row.get("Cobertura", ""))
-        tasa = float(row.get("Tasa (%)", 0) or 0)
-        capital = float(row.get("Capital (USD)", 0) or 0)
-        costo = round(capital * tasa / 100, 2)
-        subtotal += costo
-        filas_calc.append({"Cobertura": cob, "Tasa (%)": tasa, "Asientos": 0, "Capital": capital, "Costo": costo})
-    if not t_acc.empty:
-        for _, row in t_acc.iterrows():
-            cob = str(row.get("Cobertura", ""))
-            tasa = float(row.get("Tasa (%)", 0) or 0)
-            capital = float(row.get("Capital (USD)", 0) or 0)
-            asientos = int(row.get("Asientos", 0) or 0)
-            costo = round(capital * tasa / 100, 2)
-            subtotal += costo
-            filas_calc.append({"Cobertura": cob, "Tasa (%)": tasa, "Asientos": asientos, "Capital": capital, "Costo": costo})
-    if aptitud_incluida:
-        filas_calc.append({"Cobertura": "Aptitud de aterrizaje en pistas no autorizadas", "Tasa (%)": 0, "Asientos": 0, "Capital": 0, "Costo": 0})
+    cotizacion_av = cotizar_aeronave(t_princ, t_acc, aptitud_incluida)
+    filas_calc, subtotal = cotizacion_av["filas"], cotizacion_av["subtotal"]
 
     obs_av_default = edit_av.get("obs_av", "") if edit_av else ""
     obs_av = st.text_area("Observaciones (aparece entre la tabla y el precio en la vista del cliente):", value=obs_av_default, height=80, key="av_obs")
 
-    cargos_emision = round(subtotal * 0.15, 2)
-    total_anual = round(subtotal + cargos_emision, 2)
+    cargos_emision, total_anual = cotizacion_av["cargos"], cotizacion_av["total"]
     st.markdown("")
     col_res1, col_res2, col_res3 = st.columns(3)
     col_res1.metric("Subtotal", f"USD {subtotal:,.0f}")
     col_res2.metric("Cargos de Emision (15%)", f"USD {cargos_emision:,.0f}")
     col_res3.metric("Costo Anual Total", f"USD {total_anual:,.0f}")
+    with st.expander("📈 ¿Y si cambian las tasas?"):
+        coberturas_av = list(dict.fromkeys(f["Cobertura"] for f in filas_calc if f["Cobertura"] != APTITUD_ATERRIZAJE))
+        cob_barrido = st.multiselect("Solo estas coberturas (vacío = todas):", coberturas_av, key="av_barrido_cob")
+        st.dataframe(barrido_tasas(t_princ, t_acc, coberturas=cob_barrido), use_container_width=True, hide_index=True,
+            column_config={"Factor": st.column_config.NumberColumn("Tasas x", format="%.2f"), "Subtotal": st.column_config.NumberColumn(format="USD %,.0f"),
+                           "Cargos": st.column_config.NumberColumn(format="USD %,.0f"), "Total": st.column_config.NumberColumn(format="USD %,.0f")})
 
     if st.button("💾 Guardar cotizacion y Generar Link", type="primary", use_container_width=True, key="save_av_btn"):
         datos_av = {"fecha": datetime.now().strftime("%d/%m/%Y %H:%M"), "n": av_asegurado, "aseguradora": av_aseguradora, "aeronave": av_aeronave, "matricula": av_matricula, "alcance_geo": av_alcance_geo, "destino": av_destino, "e": av_asesor, "cont": av_contacto, "tab": filas_calc, "tab_principales": t_princ.to_dict(orient='records'), "tab_accidentes": t_acc.to_dict(orient='records') if not t_acc.empty else [], "aptitud_aterrizaje": aptitud_incluida, "obs_av": obs_av, "subtotal": subtotal, "cargos": cargos_emision, "total": total_anual, "tipo": "Aeronave"}
-        st.session_state.historico.append(datos_av)
         st.session_state.edit_data = datos_av
         st.session_state["_av_edit_loaded_id"] = None  # reset flag para proxima edicion
-        datos_b64 = base64.b64encode(json.dumps(datos_av).encode()).decode()
-        link_av = f"https://dfseguros.streamlit.app/?q={datos_b64}"
-        guardar_en_sheet("Cotizaciones Aeronaves", [datos_av["fecha"], av_asegurado, av_aseguradora, av_aeronave, av_matricula, av_alcance_geo, av_destino, av_asesor, subtotal, cargos_emision, total_anual, link_av, json.dumps(datos_av), obs_av])
+        link_av = link_propuesta(datos_av)
+        guardar_propuesta(datos_av, link_av, [datos_av["fecha"], av_asegurado, av_aseguradora, av_aeronave, av_matricula, av_alcance_geo, av_destino, av_asesor, subtotal, cargos_emision, total_anual, link_av, json.dumps(datos_av), obs_av])
         st.success("Cotizacion de Aeronave guardada!")
         st.text_input("🔗 Enlace para mandar al cliente:", value=link_av)
         st.components.v1.html(f'<button class="btn-copiar-edf" onclick="navigator.clipboard.writeText(\'{link_av}\').then(() => {{ this.innerText = \'📋 Link Copiado!\'; }}).catch(err => {{ alert(\'Error\'); }})">📋 Copiar Link Aeronave</button>', height=60)
@@ -1085,11 +749,10 @@ with tab_rv:
                     "ubi": rv_ubicaciones, "equ": rv_equipos, "acl": rv_aclaraciones,
                     "tasa": float(rv_tasa), "costo": float(costo_rv), "fin": rv_financiamiento,
                     "tab_comp": t_comp.to_dict(orient='records'), "tipo": "RV"}
-        st.session_state.historico.append(nueva_rv)
         st.session_state.edit_data = nueva_rv
 
-        datos_b64 = base64.b64encode(json.dumps(nueva_rv).encode()).decode()
-        link_rv = f"https://dfseguros.streamlit.app/?q={datos_b64}"
+        link_rv = link_propuesta(nueva_rv)
+        guardar_propuesta(nueva_rv, link_rv)
         st.success("✅ ¡Propuesta de Riesgos Varios guardada con éxito!")
         st.text_input("🔗 Enlace para mandar al cliente:", value=link_rv)
 
@@ -1102,61 +765,49 @@ with tab_rv:
 with tab_historial:
     st.subheader("📜 Historial de Propuestas Guardadas")
 
-    # CSS para íconos compactos en el historial
-    st.markdown("""
-    <style>
-    div[data-testid="stHorizontalBlock"] div[data-testid="column"]:nth-child(2) div.stButton > button,
-    div[data-testid="stHorizontalBlock"] div[data-testid="column"]:nth-child(3) div.stButton > button {
-        padding: 2px 10px !important;
-        min-height: 0px !important;
-        height: 30px !important;
-        font-size: 16px !important;
-        line-height: 1 !important;
-        background: transparent !important;
-        border: 1px solid #ddd !important;
-        color: #333 !important;
-        border-radius: 6px !important;
-        transform: none !important;
-    }
-    div[data-testid="stHorizontalBlock"] div[data-testid="column"]:nth-child(2) div.stButton > button:hover,
-    div[data-testid="stHorizontalBlock"] div[data-testid="column"]:nth-child(3) div.stButton > button:hover {
-        background: #f5f5f5 !important;
-        border-color: #999 !important;
-        transform: none !important;
-    }
-    </style>
-    """, unsafe_allow_html=True)
-
-    if st.session_state.historico:
-        hf1, hf2, hf3 = st.columns([2, 1, 1])
+    propuestas = get_cargador_historial().almacen()
+    if len(propuestas):
+        hf1, hf2, hf3, hf4 = st.columns([2, 1, 1, 1])
         busq_hist_nom = hf1.text_input("🔍 Buscar por asegurado:", key="busq_hist_nom")
         busq_hist_mat = hf2.text_input("🔍 Buscar por matricula:", key="busq_hist_mat")
-        tipos_disponibles = ["Todos"] + sorted(list(set(r.get("tipo", "") for r in st.session_state.historico)))
-        filtro_tipo = hf3.selectbox("Filtrar por tipo:", tipos_disponibles, key="filtro_tipo_hist")
-        historico_filtrado = st.session_state.historico
-        if busq_hist_nom:
-            historico_filtrado = [r for r in historico_filtrado if busq_hist_nom.lower() in r.get("n", "").lower()]
-        if busq_hist_mat:
-            historico_filtrado = [r for r in historico_filtrado if busq_hist_mat.lower() in r.get("matricula", "").lower()]
-        if filtro_tipo != "Todos":
-            historico_filtrado = [r for r in historico_filtrado if r.get("tipo") == filtro_tipo]
-        for i, reg in enumerate(reversed(historico_filtrado)):
-            idx_real = st.session_state.historico.index(reg)
-            col_info, col_edit, col_del = st.columns([0.78, 0.11, 0.11])
-            with col_info:
-                if reg.get("tipo") == "Flota": icon = "🚚"
-                elif reg.get("tipo") == "Aeronave": icon = "✈️"
-                else: icon = "🚗"
-                mat_hist = f" | {reg.get('matricula')}" if reg.get('matricula') else ""
-                st.write(f"📅 **{reg.get('fecha', '')[:10]}** | {icon} {reg.get('tipo')} | **{reg.get('n', 'Cliente')}**{mat_hist}")
-            with col_edit:
-                if st.button("✏️", key=f"edit_f_{i}_{idx_real}", help="Cargar / Editar"):
-                    st.session_state.edit_data = reg
-                    st.rerun()
-            with col_del:
-                if st.button("🗑️", key=f"del_f_{i}_{idx_real}", help="Eliminar"):
-                    st.session_state.historico.pop(idx_real)
-                    st.rerun()
+        filtro_tipo = hf3.selectbox("Filtrar por tipo:", ["Todos"] + propuestas.valores("tipo"), key="filtro_tipo_hist")
+        filtro_asesor = hf4.selectbox("Asesor:", ["Todos"] + propuestas.valores("asesor"), key="filtro_asesor_hist")
+        ho1, ho2, ho3, ho4 = st.columns([1, 1, 1, 1])
+        orden_hist = ho1.selectbox("Ordenar por:", ORDENES_PROPUESTAS, format_func=lambda o: o.capitalize(), key="orden_hist")
+        desc_hist = ho2.selectbox("Sentido:", ["Descendente", "Ascendente"], key="sentido_hist") == "Descendente"
+        por_pagina = ho3.selectbox("Por página:", [25, 50, 100], key="por_pagina_hist")
+        # Solo se arman las filas de la pagina visible; filtros y orden salen de los indices
+        pids_hist = propuestas.ordenar(propuestas.buscar(asegurado=busq_hist_nom, matricula=busq_hist_mat, tipo=filtro_tipo, asesor=filtro_asesor, usuario=st.session_state.usuario_actual), orden_hist, desc_hist)
+        n_paginas = max(1, -(-len(pids_hist) // por_pagina))
+        if st.session_state.get("pagina_hist", 1) > n_paginas: st.session_state.pagina_hist = n_paginas
+        pagina = ho4.number_input(f"Página (de {n_paginas}):", min_value=1, max_value=n_paginas, step=1, key="pagina_hist")
+        pids_pagina = pids_hist[(pagina - 1) * por_pagina: pagina * por_pagina]
+        iconos = {"Flota": "🚚", "Aeronave": "✈️", "RV": "🏭"}
+        filas_pagina = []
+        for pid in pids_pagina:
+            reg = propuestas.obtener(pid)
+            filas_pagina.append({"Fecha": str(reg.get("fecha", ""))[:10], "Tipo": f"{iconos.get(reg.get('tipo'), '🚗')} {reg.get('tipo', '')}", "Asegurado": reg.get("n", "Cliente"),
+                                 "Matricula": reg.get("matricula", ""), "Asesor": reg.get("e", ""), "Total": total_propuesta(reg), "Link": reg.get("link", "")})
+        st.caption(f"{len(pids_hist):,} propuestas · mostrando {len(pids_pagina)}")
+        # La seleccion es una posicion en la pagina: si cambian filtros, orden o las filas visibles, se descarta
+        estado_grid = (busq_hist_nom, busq_hist_mat, filtro_tipo, filtro_asesor, orden_hist, desc_hist, pagina, por_pagina, *pids_pagina)
+        clave_grid = "grid_hist_" + hashlib.sha1("\x1f".join(map(str, estado_grid)).encode()).hexdigest()[:12]
+        st.dataframe(pd.DataFrame(filas_pagina, columns=["Fecha", "Tipo", "Asegurado", "Matricula", "Asesor", "Total", "Link"]), use_container_width=True, hide_index=True,
+            on_select="rerun", selection_mode="single-row", key=clave_grid,
+            column_config={"Total": st.column_config.NumberColumn("Total", format="USD %,.2f"), "Link": st.column_config.LinkColumn("Link", display_text="🔗 Abrir")})
+        sel_hist = st.session_state.get(clave_grid, {}).get("selection", {}).get("rows", [])
+        if sel_hist and sel_hist[0] < len(pids_pagina):
+            pid_sel = pids_pagina[sel_hist[0]]
+            reg_sel = propuestas.obtener(pid_sel)
+            st.markdown(f"**Seleccionada:** {reg_sel.get('tipo')} · {reg_sel.get('n', 'Cliente')} · {reg_sel.get('fecha', '')}")
+            ha1, ha2 = st.columns(2)
+            if ha1.button("✏️ Cargar / Editar", key="edit_hist_sel", use_container_width=True):
+                st.session_state.edit_data = reg_sel
+                st.session_state.editando_link = reg_sel.get("link", "")
+                st.rerun()
+            if ha2.button("🗑️ Eliminar", key="del_hist_sel", use_container_width=True):
+                eliminar_propuesta(pid_sel)
+                st.rerun()
     else:
         st.info("No hay propuestas en el historial todavia.")
 
@@ -1168,8 +819,13 @@ with tab_an:
         k1, k2 = st.columns(2)
         k1.metric("Cartera Total (USD)", f"USD {t_usd:,.0f}")
         k2.metric("Total de Polizas", f"{len(df_f)}")
+        import plotly.express as px
         c1, c2 = st.columns(2)
         with c1:
             st.plotly_chart(px.pie(df_f, names=c_aseguradora, values='Premio_Total_USD', title="Compania", hole=0.4), use_container_width=True)
         with c2:
             st.plotly_chart(px.pie(df_f, names=c_ramo, values='Premio_Total_USD', title="Ramo", hole=0.4), use_container_width=True)
+        cols_an = [c for c in [c_aseguradora, c_ramo] if c in df_f.columns]
+        if cols_an:
+            df_an = df_f.groupby(cols_an, observed=True).agg(Polizas=('Premio_Total_USD', 'size'), Premio_Total_USD=('Premio_Total_USD', 'sum')).reset_index()
+            panel_exportar(df_an, ("analisis", modelo_cartera.version, estado_filtros), "Analisis_Cartera", "Analisis", "analisis", "📥 Exportar resumen por Compania y Ramo")
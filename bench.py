@@ -0,0 +1,443 @@
+"""Benchmarks locales de la cartera y las propuestas (sin Google ni Streamlit).
+
+Uso: python bench.py [cantidad_de_polizas]
+"""
+import base64
+import hashlib
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from cartera import ModeloCartera
+from cola_sheets import ColaEscritura
+from historial import CargadorHistorial
+from codec import VERSION, codificar, decodificar
+from links import LinksSQLite
+from indices import IndiceDrive, IndicePolizas
+from subidas_drive import SubidasDrive, marcador_subida
+from ingesta import CacheExtracciones, ExtractorFalso, IngestaPolizas, bytes_envio, fila_poliza, separar_repetidas
+from preproceso_pdf import preparar
+from exportar import exportar, exportar_campana, mensajes_renovacion
+from flotas import importar_flota, leer_planilla, resumen_vehiculos, totales_por_cobertura
+from tarifas_aeronave import barrido_tasas, cotizar, cotizar_lote
+from vista_cliente import CacheVistas, renderizar
+from simulacion.datos import (POLIZAS_EJEMPLO, aeronaves_sinteticas, cartera_sintetica, hojas_cotizaciones, pdf_sintetico, planilla_flota,
+                         propuestas_ejemplo)
+from simulacion.dobles import ColumnaFalsa, DriveFalso, HojaFalsa, LibroFalso, LinksPolizasFalsos, MediaFalsa
+from simulacion.referencia import buscar_antes, cotizar_aeronave_antes, filtrar_antes, historial_antes, opciones_antes, tabla_antes
+
+# Las comprobaciones de resultados estan en tests/ (python -m pytest); aca solo se mide
+
+
+def _medir(fn, repeticiones=5):
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        t = time.perf_counter()
+        fn()
+        mejor = min(mejor, time.perf_counter() - t)
+    return mejor * 1000
+
+
+def bench_modelo(df_raw):
+    # Lo que hacia cada rerun antes: copia, resolver columnas, premios y fechas sobre object
+    def por_rerun():
+        df = df_raw.copy()
+        col_map = {c.lower(): c for c in df.columns}
+        c_p_usd = col_map.get("premio usd (iva inc)", "Premio USD (IVA inc)")
+        c_p_uyu = col_map.get("premio uyu (iva inc)", "Premio UYU (IVA inc)")
+        df["Premio_Total_USD"] = (pd.to_numeric(df.get(c_p_usd, 0), errors="coerce").fillna(0) + (pd.to_numeric(df.get(c_p_uyu, 0), errors="coerce").fillna(0) / 40.5)).round(0)
+        df["Fin de Vigencia"] = pd.to_datetime(df.get("Fin de Vigencia"), dayfirst=True, errors="coerce").dt.date
+        return df
+
+    antes = por_rerun()
+    modelo = ModeloCartera(df_raw)
+    mem_antes = antes.memory_usage(deep=True).sum()
+    mem_despues = modelo.df.memory_usage(deep=True).sum()
+    print(f"  rerun antes: {_medir(por_rerun):8.1f} ms  |  modelo (una vez por snapshot): {_medir(lambda: ModeloCartera(df_raw), 2):8.1f} ms")
+    print(f"  memoria por rerun antes: {mem_antes / 1e6:6.1f} MB  |  modelo compartido: {mem_despues / 1e6:6.1f} MB  ({1 - mem_despues / mem_antes:.0%} menos)")
+    return modelo
+
+
+def bench_filtros(modelo):
+    df = modelo.df
+    seleccion = {"Ejecutivo": "RDF", modelo.c_aseguradora: "BSE", modelo.c_ramo: "Todos", "Corredor": "Todos", "Agente": "Todos"}
+
+    def antes():
+        return filtrar_antes(df, seleccion, "Vigentes"), [opciones_antes(df, c) for c in modelo.dimensiones]
+
+    modelo.filtros
+    ahora = lambda: (modelo.vista(seleccion, "Vigentes"), [modelo.filtros.opciones[c] for c in modelo.dimensiones])
+    print(f"  filtros + opciones antes: {_medir(antes):8.1f} ms  |  con indices: {_medir(ahora):8.1f} ms")
+
+
+def bench_busqueda(modelo):
+    df = modelo.df
+    t = time.perf_counter()
+    modelo.busqueda
+    print(f"  armado del indice (una vez por snapshot): {(time.perf_counter() - t) * 1000:8.1f} ms")
+    for busq in ["gonzalez", "gonzales", "maria rodri", "sba", "cliente55@"]:
+        antes = _medir(lambda: buscar_antes(df, busq), 1)
+        print(f"  {busq!r:14} antes: {antes:8.1f} ms  |  indice: {_medir(lambda: modelo.buscar(busq)):6.1f} ms")
+
+
+def bench_cola(n=20):
+    hoja = HojaFalsa(latencia=0.3)
+    t = time.perf_counter()
+    for i in range(n):
+        hoja.append_row([i, f"cotizacion {i}"])
+    print(f"  {n} guardados con append_row: {(time.perf_counter() - t) * 1000:8.1f} ms bloqueando la UI ({hoja.llamadas} llamadas)")
+
+    hojas = {"Individuales": HojaFalsa(latencia=0.3, fallos=2), "Flotas": HojaFalsa(latencia=0.3)}
+    with tempfile.TemporaryDirectory() as tmp:
+        cola = ColaEscritura(lambda h, filas: hojas[h].append_rows(filas), ruta=os.path.join(tmp, "cola.db"), backoff_base=0.1)
+        t = time.perf_counter()
+        for i in range(n):
+            cola.encolar("Individuales" if i % 2 else "Flotas", [i, f"cotizacion {i}"])
+        encolado = (time.perf_counter() - t) * 1000
+        cola.iniciar()
+        while sum(cola.pendientes().values()):
+            time.sleep(0.05)
+        cola.detener()
+        llamadas = sum(h.llamadas for h in hojas.values())
+        print(f"  {n} guardados encolados:       {encolado:8.1f} ms bloqueando la UI ({llamadas} llamadas, 2 fallos reintentados)")
+
+
+def bench_historial(n=5000):
+    hojas = hojas_cotizaciones(n, latencia=0.3)
+    t = time.perf_counter()
+    antes = historial_antes(hojas)
+    t_antes = (time.perf_counter() - t) * 1000
+    libro = LibroFalso(hojas, latencia=0.3)
+    cargador = CargadorHistorial(lambda: libro, intervalo_chequeo=0)
+    t = time.perf_counter()
+    almacen = cargador.almacen()
+    t_ahora = (time.perf_counter() - t) * 1000
+    print(f"  {len(antes):,} cotizaciones por sesion antes: {t_antes:8.1f} ms (3 requests)  |  batch: {t_ahora:8.1f} ms ({libro.llamadas} request)")
+    hojas["Cotizaciones Individuales"].filas.append(["02/01/2025", "Nuevo", "1", "", "", "", "", "RDF", "", "", "", "", "https://x/?q=n"])
+    t = time.perf_counter()
+    almacen = cargador.almacen()
+    print(f"  proxima sesion con 1 fila nueva: {(time.perf_counter() - t) * 1000:8.1f} ms (solo filas nuevas, {len(almacen) - len(antes)} agregada)")
+    return antes, almacen
+
+
+def bench_propuestas(historico, almacen):
+    def antes(nom, mat, tipo):
+        filtrado = historico
+        if nom: filtrado = [r for r in filtrado if nom.lower() in r.get("n", "").lower()]
+        if mat: filtrado = [r for r in filtrado if mat.lower() in r.get("matricula", "").lower()]
+        if tipo != "Todos": filtrado = [r for r in filtrado if r.get("tipo") == tipo]
+        return [historico.index(r) for r in reversed(filtrado)]
+
+    for nom, mat, tipo in [("", "", "Todos"), ("gonz", "", "Todos"), ("", "sba 12", "Individual")]:
+        print(f"  filtro {(nom, mat, tipo)!s:28} antes: {_medir(lambda: antes(nom, mat, tipo), 1):8.1f} ms  |  almacen: {_medir(lambda: almacen.buscar(nom, mat, tipo)):6.1f} ms")
+    for por in ["fecha", "asegurado", "total"]:
+        pagina = lambda: [almacen.obtener(p) for p in almacen.ordenar(almacen.buscar(), por)[:50]]
+        print(f"  pagina de 50 ordenada por {por:10} {_medir(pagina):6.1f} ms (antes: {2 * len(historico):,} botones por rerun)")
+    pid = almacen.buscar()[len(almacen) // 2]
+    t = time.perf_counter()
+    almacen.editar(pid, {**almacen.obtener(pid), "n": "Editado"})
+    almacen.eliminar(pid)
+    print(f"  editar + eliminar por id: {(time.perf_counter() - t) * 1000:6.2f} ms")
+
+
+def bench_codec(n=200):
+    for tipo, propuesta in propuestas_ejemplo().items():
+        viejo = base64.b64encode(json.dumps(propuesta).encode()).decode()
+        nuevo = codificar(propuesta)
+        t_viejo = _medir(lambda: json.loads(base64.b64decode(viejo).decode()), n)
+        t_nuevo = _medir(lambda: decodificar(nuevo), n)
+        print(f"  {tipo:10} ?q= antes: {len(viejo):6,} car, {t_viejo:6.3f} ms  |  v{VERSION}: {len(nuevo):5,} car, {t_nuevo:6.3f} ms  ({1 - len(nuevo) / len(viejo):.0%} menos)")
+
+
+def bench_links(n=200):
+    propuesta = propuestas_ejemplo()["Individual"]
+    largo = f"https://dfseguros.streamlit.app/?q={base64.b64encode(json.dumps(propuesta).encode()).decode()}"
+    with tempfile.TemporaryDirectory() as tmp:
+        links = LinksSQLite(os.path.join(tmp, "links.db"))
+        pid = links.guardar(propuesta)
+        corto = f"https://dfseguros.streamlit.app/?p={pid}"
+        antes = _medir(lambda: json.loads(base64.b64decode(largo.split("?q=")[1]).decode()), n)
+        frio = LinksSQLite(os.path.join(tmp, "links.db"))
+        t = time.perf_counter()
+        frio.obtener(pid)
+        lectura = (time.perf_counter() - t) * 1000
+        cache = _medir(lambda: frio.obtener(pid), n)
+        print(f"  link ?q=: {len(largo):6,} caracteres  |  ?p=: {len(corto)} caracteres")
+        print(f"  decodificar ?q=: {antes:6.3f} ms por visita  |  ?p= primera lectura: {lectura:6.3f} ms, desde LRU: {cache:6.4f} ms")
+
+
+def bench_vistas(n=200):
+    cache = CacheVistas()
+    for tipo, propuesta in propuestas_ejemplo().items():
+        cache.vista(propuesta)
+        t_render = _medir(lambda: renderizar(propuesta), n)
+        t_cache = _medir(lambda: cache.vista(propuesta), n)
+        linea = f"  {tipo:10} render: {t_render:6.3f} ms  |  mismo link desde LRU: {t_cache:6.3f} ms"
+        if tipo in ("Individual", "Flota"):
+            linea += f"  |  tabla antes: {_medir(lambda: tabla_antes(propuesta), n):6.3f} ms"
+        print(linea)
+
+
+def bench_aeronave(n=2000):
+    aeronaves = aeronaves_sinteticas(n)
+    _, princ, acc = aeronaves[0]
+    t_antes = _medir(lambda: cotizar_aeronave_antes(princ, acc), 50)
+    t_nuevo = _medir(lambda: cotizar(princ, acc, aptitud=False), 50)
+    print(f"  una cotizacion: iterrows {t_antes:6.3f} ms  |  motor {t_nuevo:6.3f} ms")
+    lineas = pd.concat([pd.concat([p, a]).assign(Aeronave=m) for m, p, a in aeronaves], ignore_index=True)
+    # Escala: mismas lineas repetidas, el costo por linea se mantiene
+    for veces in (1, 10, 100):
+        grande = pd.concat([lineas.assign(Aeronave=lineas["Aeronave"] + f"-{k}") for k in range(veces)], ignore_index=True)
+        t = _medir(lambda: cotizar_lote(grande), 3)
+        print(f"  lote de {len(grande):>9,} lineas ({n * veces:>7,} aeronaves): {t:8.1f} ms  ({t * 1000 / len(grande):.2f} us por linea)")
+    t = _medir(lambda: barrido_tasas(princ, acc, factores=[f / 100 for f in range(50, 151)]), 20)
+    print(f"  barrido de 101 factores de tasa: {t:.3f} ms")
+
+
+def bench_flotas(modelo, n=5000):
+    class Subida(io.BytesIO):
+        name = "flota.csv"
+    t = time.perf_counter()
+    cartera = modelo.matriculas
+    t_cartera = (time.perf_counter() - t) * 1000
+    datos = planilla_flota(n, cartera.index[:500].tolist())
+    t_imp = _medir(lambda: importar_flota(leer_planilla(Subida(datos)), cartera), 3)
+    df, avisos = importar_flota(leer_planilla(Subida(datos)), cartera)
+    print(f"  indice de matriculas de la cartera: {len(cartera):,} en {t_cartera:.0f} ms (una vez por snapshot)")
+    print(f"  importar {n:,} vehiculos (leer + normalizar + duplicados): {t_imp:.0f} ms, {len(avisos):,} avisos "
+          f"({(avisos['Aviso'] == 'Ya está en cartera').sum()} ya en cartera)")
+    t_antes = _medir(lambda: " | ".join([f"{r.get('Marca','')} {r.get('Modelo','')} {r.get('Matricula','')}" for _, r in df.iterrows() if r.get('Marca','')]), 3)
+    t_nuevo = _medir(lambda: resumen_vehiculos(df), 3)
+    t_tot = _medir(lambda: totales_por_cobertura(df), 3)
+    print(f"  vehiculos_txt: iterrows {t_antes:.0f} ms  |  vectorizado {t_nuevo:.1f} ms  |  totales por cobertura {t_tot:.1f} ms")
+
+
+def bench_exportar(modelo, n=5000):
+    rango = modelo.df.head(n)
+    for formato in ("csv", "xlsx", "parquet"):
+        try:
+            t = _medir(lambda: exportar(modelo.df, formato), 1)
+        except ImportError as e:
+            print(f"  {formato:>7}: sin {e.name}")
+            continue
+        print(f"  exportar {len(modelo.df):,} polizas a {formato:>7}: {t:8.0f} ms (una vez por filtros, despues desde la cache)")
+    columnas = {"asegurado": modelo.c_asegurado, "aseguradora": modelo.c_aseguradora, "ramo": modelo.c_ramo, "premio_usd": modelo.c_p_usd,
+                "premio_uyu": modelo.c_p_uyu, "celular": "Celular", "ejecutivo": "Ejecutivo"}
+    t = _medir(lambda: mensajes_renovacion(rango, columnas, "Asesor"), 3)
+    mensajes = mensajes_renovacion(rango, columnas, "Asesor")
+    print(f"  campaña de {len(rango):,} mensajes: {t:6.0f} ms  |  zip por ejecutivo: {_medir(lambda: exportar_campana(mensajes), 3):6.0f} ms")
+
+
+# Lo que importa cada camino, sin streamlit (es el mismo para los dos)
+IMPORTS_CLIENTE = ["codec", "vista_cliente", "links", "cola_sheets", "servicios_google"]
+IMPORTS_APP = IMPORTS_CLIENTE + ["pandas", "plotly.express", "cartera", "historial", "propuestas", "exportar", "plantillas"]
+
+
+def bench_ingesta(n=24, demora=0.25):
+    pdfs = [(f"poliza_{i:03d}.pdf", random.Random(i).randbytes(2000)) for i in range(n)]
+    extractor = ExtractorFalso(demora=demora, fallan={"poliza_005.pdf"})
+    t = time.perf_counter()
+    for nombre, pdf in pdfs:
+        try: extractor.extraer(pdf, nombre)
+        except RuntimeError: pass
+    print(f"  {n} PDF uno por uno (como el boton original): {time.perf_counter() - t:6.2f} s")
+    for hilos, por_minuto in ((4, 0), (8, 0), (8, 600)):
+        ingesta = IngestaPolizas(ExtractorFalso(demora=demora, fallan={"poliza_005.pdf"}), max_hilos=hilos, por_minuto=por_minuto, reintentos=1, backoff=0.05)
+        t = time.perf_counter()
+        lote = ingesta.procesar(pdfs)
+        primero = None
+        for _ in lote.a_medida_que_terminan():
+            primero = primero or time.perf_counter() - t
+        limite = f"{por_minuto}/min" if por_minuto else "sin limite"
+        print(f"  {n} PDF con {hilos} hilos ({limite:>10}): {time.perf_counter() - t:6.2f} s, primer resultado a los {primero:4.2f} s "
+              f"({len(lote.listos())} bien, {len(lote.con_error())} con error, {ingesta.stats['reintentos']} reintentos)")
+    hoja = HojaFalsa(latencia=0.3)
+    nuevas, repetidas = separar_repetidas(lote.revision() + lote.revision()[:3], [lote.revision()[0]["nro_poliza"]])
+    hoja.append_rows([fila_poliza(d) for d in nuevas])
+    print(f"  guardado de las aprobadas: {len(hoja.filas)} filas en {hoja.llamadas} llamada ({len(repetidas)} repetidas descartadas)")
+
+
+def bench_cache_extracciones(n=24, demora=0.25):
+    pdfs = [(f"poliza_{i:03d}.pdf", random.Random(i).randbytes(200_000)) for i in range(n)]
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "extracciones.db")
+        for vez in ("primera vez", "de nuevo", "tras reiniciar"):
+            # "tras reiniciar": otra instancia sobre el mismo archivo, como despues de un deploy
+            if vez != "de nuevo":
+                extractor, cache = ExtractorFalso(demora=demora), CacheExtracciones(ruta)
+                ingesta = IngestaPolizas(extractor, max_hilos=8, por_minuto=0, cache=cache)
+            t = time.perf_counter()
+            lote = ingesta.procesar(pdfs)
+            for _ in lote.a_medida_que_terminan():
+                pass
+            print(f"  {n} PDF de 200 KB, {vez:>14}: {(time.perf_counter() - t) * 1000:7.1f} ms  "
+                  f"({lote.desde_cache()} desde cache, {extractor.llamadas} llamadas al modelo)")
+
+
+def bench_preproceso(demora=1.0, demora_por_mb=0.8):
+    print(f"  latencia del modelo simulada: {demora} s + {demora_por_mb} s por MB enviado")
+    for nombre, paginas in POLIZAS_EJEMPLO.items():
+        pdf = pdf_sintetico(paginas, imagen_kb=150 if not paginas[0] else 30)
+        t = time.perf_counter()
+        envio = preparar(pdf)
+        t_prep = (time.perf_counter() - t) * 1000
+        antes, despues = bytes_envio({"pdf": pdf}), bytes_envio(envio)
+        t_antes = demora + demora_por_mb * antes / 1e6
+        t_despues = t_prep / 1000 + (0 if envio["via"] == "regex" else demora + demora_por_mb * despues / 1e6)
+        print(f"  {nombre:<24} {envio['via']:>9}: {antes / 1024:8.0f} KB -> {despues / 1024:6.1f} KB  |  "
+              f"{t_antes:5.2f} s -> {t_despues:5.2f} s  (preproceso {t_prep:5.1f} ms)")
+
+
+def bench_indices(n=100_000, guardados=20):
+    columna = ColumnaFalsa(n, latencia=0.05)
+    t = time.perf_counter()
+    for i in range(guardados):
+        existentes = [str(p).strip() for p in columna.col_values(8)]
+        repetida = str(1_000_000 + i * 7) in existentes
+    antes, llamadas_antes = (time.perf_counter() - t) * 1000, columna.llamadas
+    columna = ColumnaFalsa(n, latencia=0.05)
+    indice = IndicePolizas(lambda: columna)
+    t = time.perf_counter()
+    for i in range(guardados):
+        repetida = str(1_000_000 + i * 7) in indice
+        indice.agregar([str(9_000_000 + i)])
+    print(f"  {guardados} guardados contra {n:,} polizas: col_values cada vez {antes:7.0f} ms ({llamadas_antes} lecturas)  |  "
+          f"indice {(time.perf_counter() - t) * 1000:6.0f} ms ({columna.llamadas} lectura)")
+    t = time.perf_counter()
+    for _ in range(10_000):
+        "1050000" in indice
+    print(f"  consulta al indice caliente: {(time.perf_counter() - t) * 100:.2f} us")
+
+    pdfs = [random.Random(i).randbytes(5000) for i in range(3000)]
+    drive = DriveFalso([{"id": f"id{i}", "name": f"poliza_{i}.pdf", "md5Checksum": hashlib.md5(p).hexdigest(),
+                         "webViewLink": f"https://drive/{i}", "createdTime": "2025-01-01T00:00:00.000Z"} for i, p in enumerate(pdfs)], latencia=0.05)
+    indice = IndiceDrive(lambda: drive, "carpeta")
+    t = time.perf_counter()
+    for p in pdfs[:guardados]:
+        indice.buscar(hashlib.md5(p).hexdigest())
+    print(f"  Drive con {len(pdfs):,} PDF: calentar + {guardados} busquedas {(time.perf_counter() - t) * 1000:5.0f} ms ({drive.llamadas} paginas)")
+    drive.create({"name": "otro.pdf"}, MediaFalsa(b"nuevo por fuera de la app")).execute()
+    indice._chequeo = 0
+    t = time.perf_counter()
+    indice.buscar(hashlib.md5(b"nuevo por fuera de la app").hexdigest())
+    print(f"  chequeo incremental (solo lo nuevo en la carpeta): {(time.perf_counter() - t) * 1000:5.0f} ms")
+
+
+def _esperar_subidas(subidas, tope=30):
+    t = time.perf_counter()
+    while subidas.pendientes() and time.perf_counter() - t < tope:
+        time.sleep(0.01)
+    return time.perf_counter() - t
+
+
+def bench_subidas(n=10, tamano=1_000_000, chunk=256 * 1024, latencia=0.03):
+    pdfs = [(f"poliza_{i}.pdf", random.Random(i).randbytes(tamano)) for i in range(n)]
+    drive = DriveFalso(latencia=latencia)
+    t = time.perf_counter()
+    for nombre, pdf in pdfs:
+        pedido = drive.create({"name": nombre}, MediaFalsa(pdf, chunk))
+        respuesta = None
+        while respuesta is None:
+            _, respuesta = pedido.next_chunk()
+    print(f"  guardar {n} polizas con PDF de {tamano / 1e6:.0f} MB subiendo en linea: {time.perf_counter() - t:6.2f} s bloqueando la UI")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for titulo, fallar_cada in (("sin errores", 0), ("con un corte cada 4 partes", 4)):
+            drive, hoja = DriveFalso(latencia=latencia, fallar_cada=fallar_cada), LinksPolizasFalsos()
+            subidas = SubidasDrive(lambda: drive, "carpeta", hoja.rellenar, ruta=os.path.join(tmp, f"subidas{fallar_cada}.db"), chunk=chunk,
+                                   media=MediaFalsa, backoff_base=0.01, espera=0.05).iniciar()
+            t = time.perf_counter()
+            for nombre, pdf in pdfs:
+                hoja.celdas.append(marcador_subida(pdf))
+                subidas.encolar(nombre, pdf)
+            bloqueo = (time.perf_counter() - t) * 1000
+            fondo = _esperar_subidas(subidas)
+            subidas.detener()
+            print(f"  en segundo plano, {titulo:>27}: {bloqueo:6.1f} ms bloqueando la UI, subidas listas en {fondo:5.2f} s, "
+                  f"{subidas.stats['fallos']} reintentos, {drive.bytes_recibidos / (n * tamano):.2f}x bytes enviados")
+
+        # Reinicio a mitad de una subida: la sesion guardada se retoma desde la ultima parte confirmada
+        drive, hoja, ruta = DriveFalso(latencia=latencia), LinksPolizasFalsos(), os.path.join(tmp, "reinicio.db")
+        nombre, pdf = pdfs[0]
+        hoja.celdas.append(marcador_subida(pdf))
+        drive.fallar_cada = 3
+        subidas = SubidasDrive(lambda: drive, "carpeta", hoja.rellenar, ruta=ruta, chunk=chunk, media=MediaFalsa, backoff_base=60)
+        subidas.encolar(nombre, pdf)
+        subidas.vaciar()
+        antes = drive.bytes_recibidos
+        drive.fallar_cada = 0
+        otra = SubidasDrive(lambda: drive, "carpeta", hoja.rellenar, ruta=ruta, chunk=chunk, media=MediaFalsa)
+        otra.reintentar()
+        otra.vaciar()
+        print(f"  reinicio a mitad de subida: {antes / 1e6:.2f} MB antes del corte, {(drive.bytes_recibidos - antes) / 1e6:.2f} MB despues "
+              f"(de {tamano / 1e6:.2f} MB)")
+
+
+def _importar_en_frio(modulos, repeticiones=3):
+    # Proceso nuevo por medicion: nada queda en sys.modules de la corrida anterior
+    codigo = ("import importlib, time\nt = time.perf_counter()\nfaltan = []\n"
+              f"for m in {modulos!r}:\n    try: importlib.import_module(m)\n    except ImportError: faltan.append(m)\n"
+              "print((time.perf_counter() - t) * 1000, ','.join(faltan))")
+    tiempos, faltan = [], ""
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", codigo], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split(" ", 1)
+        tiempos.append(float(salida[0]))
+        faltan = salida[1].strip()
+    return min(tiempos), faltan
+
+
+def bench_arranque():
+    t_app, faltan_app = _importar_en_frio(IMPORTS_APP)
+    t_cli, faltan_cli = _importar_en_frio(IMPORTS_CLIENTE)
+    print(f"  imports al abrir un link: antes (toda la app) {t_app:6.0f} ms  |  entrada del cliente {t_cli:5.0f} ms")
+    if faltan_app or faltan_cli:
+        print(f"  (no instalados aca, no suman: {faltan_app or faltan_cli})")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print(f"Cartera sintetica de {n:,} polizas")
+    df_raw = cartera_sintetica(n)
+    print("Modelo tipado:")
+    modelo = bench_modelo(df_raw)
+    print("Filtros del sidebar:")
+    bench_filtros(modelo)
+    print("Busqueda en Cartera:")
+    bench_busqueda(modelo)
+    print("Importacion de flotas:")
+    bench_flotas(modelo)
+    print("Exportaciones y campaña de renovaciones:")
+    bench_exportar(modelo)
+    print("Guardado de propuestas al Sheet:")
+    bench_cola()
+    print("Historial de cotizaciones al entrar:")
+    historico, almacen = bench_historial()
+    print("Historial de propuestas (filtros + ubicar cada fila):")
+    bench_propuestas(historico, almacen)
+    print("Links de propuestas:")
+    bench_links()
+    print("Codec de ?q=:")
+    bench_codec()
+    print("Vista del cliente:")
+    bench_vistas()
+    print("Arranque de un link de cliente:")
+    bench_arranque()
+    print("Cotizador de aeronaves:")
+    bench_aeronave()
+    print("Carga de polizas en PDF:")
+    bench_ingesta()
+    print("Cache de extracciones:")
+    bench_cache_extracciones()
+    print("Preproceso de PDF antes del modelo:")
+    bench_preproceso()
+    print("Indices de polizas y de Drive:")
+    bench_indices()
+    print("Subidas de PDF a Drive:")
+    bench_subidas()
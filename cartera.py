@@ -0,0 +1,811 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from datetime import date, datetime
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+GID_CARTERA = 860430337  # "Respuestas de formulario 2"
+FILAS_VERIFICADAS = 20  # ultimas filas ya cargadas que se releen con las nuevas para confirmar que no cambiaron
+COL_ASEGURADO = "Asegurado (Nombre/Razón Social)"
+COL_RAMO = "Ramo"
+COL_DETALLE = "Detalle (Matricula o Referencia)"
+
+
+def _letra_columna(n):
+    letras = ""
+    while n > 0:
+        n, resto = divmod(n - 1, 26)
+        letras = chr(65 + resto) + letras
+    return letras
+
+
+def _valor_csv(v):
+    try: return int(v)
+    except ValueError: pass
+    try: return float(v)
+    except ValueError: return v
+
+
+# ==========================================
+# FUENTES DE LA CARTERA
+# ==========================================
+class FuenteSheet:
+    """Hoja de cartera en Google Sheets (via gspread)."""
+
+    def __init__(self, get_cliente, sheet_id, gid=GID_CARTERA):
+        # La conexion se abre recien en el primer uso: sin red se puede arrancar del snapshot local
+        self.get_cliente = get_cliente
+        self.sheet_id = sheet_id
+        self.gid = gid
+        self._sh = None
+        self._ws = None
+
+    def _abrir(self):
+        if self._ws is None:
+            gc = self.get_cliente()
+            if gc is None:
+                raise RuntimeError("No hay credenciales para leer la cartera")
+            self._sh = gc.open_by_key(self.sheet_id)
+            self._ws = self._sh.get_worksheet_by_id(self.gid)
+        return self._sh, self._ws
+
+    def revision(self):
+        # modifiedTime de Drive: cambia con cualquier edicion de la planilla
+        sh, _ = self._abrir()
+        if hasattr(sh, "get_lastUpdateTime"):
+            return sh.get_lastUpdateTime()
+        return sh.lastUpdateTime
+
+    def cantidad_filas(self):
+        # La columna A (Marca temporal) siempre viene completa en las respuestas del formulario
+        _, ws = self._abrir()
+        return len(ws.col_values(1))
+
+    def leer(self, desde=1):
+        _, ws = self._abrir()
+        rango = f"A{desde}:{_letra_columna(ws.col_count)}"
+        return ws.get_values(rango, value_render_option="UNFORMATTED_VALUE", date_time_render_option="FORMATTED_STRING")
+
+
+class FuenteLocal:
+    """Copia local de la hoja (CSV o XLSX), para pruebas y desarrollo sin Google."""
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+
+    def revision(self):
+        return os.path.getmtime(self.ruta)
+
+    def cantidad_filas(self):
+        return len(self.leer(1))
+
+    def leer(self, desde=1):
+        if self.ruta.lower().endswith(".xlsx"):
+            from openpyxl import load_workbook
+            ws = load_workbook(self.ruta, read_only=True, data_only=True).active
+            filas = [["" if v is None else v for v in fila] for fila in ws.iter_rows(values_only=True)]
+        else:
+            with open(self.ruta, newline="", encoding="utf-8") as fh:
+                filas = [[_valor_csv(v) for v in fila] for fila in csv.reader(fh)]
+        return filas[desde - 1:]
+
+
+# ==========================================
+# CARGADOR INCREMENTAL CON SNAPSHOT EN MEMORIA Y EN DISCO
+# ==========================================
+def _a_texto(v):
+    if v is None or isinstance(v, str) or pd.isna(v): return v
+    return str(int(v)) if isinstance(v, float) and v.is_integer() else str(v)
+
+
+def _normalizar(encabezado, filas):
+    columnas = [str(c).strip() for c in encabezado]
+    ancho = len(columnas)
+    filas = [(list(f) + [""] * ancho)[:ancho] for f in filas]
+    df = pd.DataFrame(filas, columns=columnas, dtype=object)
+    df = df.mask(df.map(lambda v: isinstance(v, str) and not v.strip()))
+    df = df.dropna(how="all").reset_index(drop=True)
+    for col in df.columns:
+        valores = df[col].dropna()
+        if valores.empty:
+            df[col] = df[col].astype(object)
+        elif valores.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)).all():
+            df[col] = pd.to_numeric(df[col], errors="coerce")
+        else:
+            df[col] = df[col].map(_a_texto).astype(object)
+    return df
+
+
+def _huella(filas, ancho):
+    # Celdas vacias al final de la fila pueden venir o no segun la API: se completan antes de comparar
+    filas = [(list(f) + [""] * ancho)[:ancho] for f in filas]
+    return hashlib.sha1(json.dumps(filas, default=str).encode("utf-8")).hexdigest()
+
+
+def _concatenar(df, nuevo):
+    # Columnas numericas en un lado y texto en el otro pasan a texto en ambos
+    nuevo = nuevo.reindex(columns=df.columns)
+    for col in df.columns:
+        num_a, num_b = pd.api.types.is_numeric_dtype(df[col]), pd.api.types.is_numeric_dtype(nuevo[col])
+        if num_a != num_b and nuevo[col].notna().any() and df[col].notna().any():
+            df = df.assign(**{col: df[col].map(_a_texto).astype(object)})
+            nuevo[col] = nuevo[col].map(_a_texto).astype(object)
+    return pd.concat([df, nuevo], ignore_index=True)
+
+
+class CargadorCartera:
+    """Mantiene el snapshot de la cartera y solo vuelve a la hoja cuando cambia.
+
+    - Dentro de `intervalo_chequeo` segundos se devuelve el snapshot sin tocar la API.
+    - Si la revision no cambio: hit de cache.
+    - Si hay mas filas: se bajan las nuevas junto con las ultimas `FILAS_VERIFICADAS` ya
+      cargadas; si esas siguen iguales se agregan solo las nuevas.
+    - Cualquier otro cambio (edicion, borrado, o las ultimas filas distintas) o `max_edad`
+      vencido: recarga completa. Una edicion mas arriba junto con filas nuevas no se ve en las
+      ultimas filas: esa recien entra con la recarga de `max_edad`.
+
+    Con `ruta_snapshot` cada recarga completa se guarda en Parquet, fuera del lock: al
+    arrancar se lee del disco en milisegundos y la reconciliacion con la hoja corre en
+    segundo plano (las filas agregadas despues de esa recarga se vuelven a bajar ahi).
+    """
+
+    def __init__(self, fuente, intervalo_chequeo=30, max_edad=900, ruta_snapshot=None):
+        self.fuente = fuente
+        self.intervalo_chequeo = intervalo_chequeo
+        self.max_edad = max_edad
+        self.ruta_snapshot = ruta_snapshot
+        self.df = None
+        self.version = 0
+        self._encabezado = []
+        self._filas_hoja = 0
+        self._ultimas = None  # huella de las ultimas filas cargadas (encabezado incluido si hay pocas)
+        self._revision = None
+        self._ultimo_chequeo = 0.0
+        self._ultima_completa = 0.0
+        self._lock = threading.Lock()
+        self._lock_stats = threading.Lock()
+        self._lock_disco = threading.Lock()
+        self._snapshot_pendiente = None
+        self._generacion_en_disco = 0
+        self._hilo = None
+        self._modelo = None
+        self._generacion = 0
+        self._publicado = (None, 0)
+        self.stats = {"hits": 0, "incrementales": 0, "completas": 0, "filas_nuevas": 0, "verificaciones_fallidas": 0, "desde_disco": 0, "ultima_actualizacion": None, "error": None}
+
+    def precargar(self):
+        """Levanta el snapshot del disco (si hay) y reconcilia con la hoja sin bloquear."""
+        if self._hilo is not None:
+            # Ya arrancado: no esperar el lock que tiene tomado la reconciliacion
+            return
+        with self._lock:
+            if self.df is None and self._hilo is None:
+                self._leer_snapshot()
+                self._reconciliar_en_segundo_plano()
+
+    def obtener(self, forzar=False):
+        self.precargar()
+        if self.df is None and self._hilo.is_alive():
+            # Primer arranque sin snapshot: esperamos la carga que ya esta en curso
+            self._hilo.join()
+        if not forzar and self._hilo.is_alive():
+            # Reconciliando en segundo plano: se sirve el snapshot actual
+            self._contar_hit()
+            return self.df
+        with self._lock:
+            ahora = time.monotonic()
+            try:
+                if self.df is None or forzar:
+                    self._carga_completa()
+                elif ahora - self._ultimo_chequeo < self.intervalo_chequeo:
+                    self._contar_hit()
+                elif ahora - self._ultima_completa > self.max_edad:
+                    self._carga_completa()
+                else:
+                    self._sincronizar()
+                self.stats["error"] = None
+            except Exception as e:
+                # Sin conexion con la hoja: seguimos con el ultimo snapshot
+                if self.df is None:
+                    raise
+                self.stats["error"] = repr(e)
+            self._ultimo_chequeo = time.monotonic()
+            df, pendiente, self._snapshot_pendiente = self.df, self._snapshot_pendiente, None
+        self._guardar_snapshot(pendiente)
+        return df
+
+    def _contar_hit(self):
+        # Se cuenta tambien mientras el hilo de fondo tiene tomado `_lock`
+        with self._lock_stats:
+            self.stats["hits"] += 1
+
+    def _reconciliar_en_segundo_plano(self):
+        def tarea():
+            with self._lock:
+                try:
+                    if self.df is None:
+                        self._carga_completa()
+                    else:
+                        self._sincronizar()
+                    self.stats["error"] = None
+                except Exception as e:
+                    self.stats["error"] = repr(e)
+                self._ultimo_chequeo = time.monotonic()
+                pendiente, self._snapshot_pendiente = self._snapshot_pendiente, None
+            self._guardar_snapshot(pendiente)
+        self._hilo = threading.Thread(target=tarea, daemon=True)
+        self._hilo.start()
+
+    def _sincronizar(self):
+        revision = self.fuente.revision()
+        if revision == self._revision:
+            self._contar_hit()
+            return
+        total = self.fuente.cantidad_filas()
+        if total > self._filas_hoja > 0 and self._ultimas is not None:
+            k = min(FILAS_VERIFICADAS, self._filas_hoja)
+            valores = self.fuente.leer(self._filas_hoja + 1 - k)[: total - self._filas_hoja + k]
+            if _huella(valores[:k], len(self._encabezado)) == self._ultimas:
+                nuevas = valores[k:]
+                self._revision = revision
+                self._filas_hoja += len(nuevas)
+                self._ultimas = _huella(valores[-min(FILAS_VERIFICADAS, self._filas_hoja):], len(self._encabezado))
+                self.stats["incrementales"] += 1
+                self.stats["filas_nuevas"] += len(nuevas)
+                self._publicar(_concatenar(self.df, _normalizar(self._encabezado, nuevas)))
+                return
+            # Se agregaron filas pero tambien cambio lo ya cargado (edicion o borrado)
+            self.stats["verificaciones_fallidas"] += 1
+        self._carga_completa(revision)
+
+    def _carga_completa(self, revision=None):
+        self._revision = revision if revision is not None else self.fuente.revision()
+        valores = self.fuente.leer(1)
+        self._encabezado = valores[0] if valores else []
+        self._filas_hoja = len(valores)
+        self._ultimas = _huella(valores[-FILAS_VERIFICADAS:], len(self._encabezado))
+        self._ultima_completa = time.monotonic()
+        self._generacion += 1
+        self.stats["completas"] += 1
+        self._publicar(_normalizar(self._encabezado, valores[1:]))
+        if self.ruta_snapshot:
+            meta = {"revision": self._revision, "encabezado": [str(c) for c in self._encabezado], "filas_hoja": self._filas_hoja,
+                    "ultimas": self._ultimas, "completa": time.time()}
+            self._snapshot_pendiente = (self._generacion, self.df, meta)
+
+    def _publicar(self, df):
+        self.df = df
+        self._publicado = (df, self._generacion)
+        self.version += 1
+        self.stats["ultima_actualizacion"] = datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+
+    # --- Snapshot en disco (Parquet + metadatos en JSON) ---
+    def _guardar_snapshot(self, pendiente):
+        if pendiente is None:
+            return
+        generacion, df, meta = pendiente
+        with self._lock_disco:
+            # Dos recargas seguidas (primer plano y fondo): no pisar la nueva con la vieja
+            if generacion <= self._generacion_en_disco:
+                return
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.ruta_snapshot)), exist_ok=True)
+                tmp = self.ruta_snapshot + ".tmp"
+                df.to_parquet(tmp, index=False)
+                os.replace(tmp, self.ruta_snapshot)
+                with open(self.ruta_snapshot + ".json", "w", encoding="utf-8") as fh:
+                    json.dump(meta, fh)
+                self._generacion_en_disco = generacion
+            except Exception as e:
+                self.stats["error"] = f"No se pudo guardar el snapshot: {e!r}"
+
+    def _leer_snapshot(self):
+        if not self.ruta_snapshot or not os.path.exists(self.ruta_snapshot + ".json"):
+            return False
+        try:
+            with open(self.ruta_snapshot + ".json", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            df = pd.read_parquet(self.ruta_snapshot)
+        except Exception:
+            return False
+        # Mismos tipos que _normalizar: texto como object y vacios como NaN (Parquet devuelve str/None)
+        for col in df.columns:
+            if not pd.api.types.is_numeric_dtype(df[col]):
+                df[col] = df[col].astype(object).where(df[col].notna(), np.nan)
+        self.df = df
+        self._generacion += 1
+        self._publicado = (df, self._generacion)
+        self._revision = meta.get("revision")
+        self._encabezado = meta.get("encabezado", [])
+        self._filas_hoja = meta.get("filas_hoja", 0)
+        # Snapshot sin huella (version anterior): la primera sincronizacion recarga todo
+        self._ultimas = meta.get("ultimas")
+        # La edad de la ultima recarga completa sigue corriendo desde antes del reinicio
+        if meta.get("completa"):
+            self._ultima_completa = time.monotonic() - max(0.0, time.time() - meta["completa"])
+        self.version += 1
+        self.stats["desde_disco"] += 1
+        self.stats["ultima_actualizacion"] = "snapshot local"
+        return True
+
+    # --- Modelo tipado, uno por snapshot ---
+    def modelo(self, forzar=False, tc_usd=40.5):
+        self.obtener(forzar)
+        df, generacion = self._publicado
+        modelo = self._modelo
+        if modelo is None or modelo.origen is not df:
+            # Entre cargas completas solo se agregan filas al final: los indices se extienden
+            anterior = modelo if modelo is not None and modelo.generacion == generacion and len(modelo.origen) <= len(df) else None
+            modelo = ModeloCartera(df, self.version, tc_usd, generacion, anterior)
+            self._modelo = modelo
+        return modelo
+
+
+# ==========================================
+# MODELO TIPADO DE LA CARTERA
+# ==========================================
+class ModeloCartera:
+    """Cartera con columnas resueltas, premios/fechas parseados y dimensiones categoricas.
+
+    Se arma una vez por snapshot y se comparte entre sesiones: no modificar `df`.
+    """
+
+    def __init__(self, df_raw, version=0, tc_usd=40.5, generacion=0, anterior=None):
+        self.origen = df_raw
+        self.version = version
+        self.generacion = generacion
+        # Solo se guarda el indice de busqueda ya armado del modelo anterior (no el modelo)
+        self._busqueda_anterior = anterior.__dict__.get("busqueda") if anterior is not None else None
+        col_map = {c.lower(): c for c in df_raw.columns}
+        self.col_map = col_map
+        self.c_asegurado = col_map.get("asegurado", col_map.get("cliente", "Asegurado"))
+        self.c_documento = col_map.get("documento", col_map.get("ci", col_map.get("rut", "Documento")))
+        self.c_aseguradora = col_map.get("aseguradora", col_map.get("compania", "Aseguradora"))
+        self.c_ramo = col_map.get("ramo", "Ramo")
+        self.c_p_usd = col_map.get("premio usd (iva inc)", "Premio USD (IVA inc)")
+        self.c_p_uyu = col_map.get("premio uyu (iva inc)", "Premio UYU (IVA inc)")
+        self.c_adjunto = col_map.get("adjunto (póliza)", "Adjunto (póliza)")
+        self.dimensiones = [c for c in ["Ejecutivo", self.c_aseguradora, self.c_ramo, "Corredor", "Agente"] if c in df_raw.columns]
+
+        df = df_raw.copy()
+        for c in [self.c_p_usd, self.c_p_uyu]:
+            if c in df.columns:
+                df[c] = pd.to_numeric(df[c], errors="coerce")
+        p_usd = df[self.c_p_usd].fillna(0) if self.c_p_usd in df.columns else 0
+        p_uyu = df[self.c_p_uyu].fillna(0) if self.c_p_uyu in df.columns else 0
+        df["Premio_Total_USD"] = pd.Series(p_usd + p_uyu / tc_usd, index=df.index, dtype="float64").round(0)
+        if "Inicio de Vigencia" in df.columns:
+            df["Inicio de Vigencia"] = pd.to_datetime(df["Inicio de Vigencia"], dayfirst=True, errors="coerce")
+        if "Fin de Vigencia" in df.columns:
+            df["Fin de Vigencia"] = pd.to_datetime(df["Fin de Vigencia"], dayfirst=True, errors="coerce")
+        else:
+            df["Fin de Vigencia"] = pd.Series(pd.NaT, index=df.index, dtype="datetime64[ns]")
+        for c in self.dimensiones:
+            df[c] = df[c].astype("category")
+        self.df = df
+
+    @cached_property
+    def vencimientos(self):
+        return IndiceVencimientos(self.df["Fin de Vigencia"], self.df["Premio_Total_USD"])
+
+    @cached_property
+    def filtros(self):
+        return IndiceFiltros(self.df, self.dimensiones, self.vencimientos)
+
+    def permitidas(self, dentro):
+        """Mascara de las filas de la cartera presentes en `dentro`, o None si es la cartera entera."""
+        if dentro is None or len(dentro) >= len(self.df):
+            return None
+        mascara = np.zeros(len(self.df), dtype=bool)
+        mascara[dentro.index.to_numpy()] = True
+        return mascara
+
+    @cached_property
+    def busqueda(self):
+        anterior, self._busqueda_anterior = self._busqueda_anterior, None
+        if anterior is not None:
+            return anterior.extender(self.df, self.campos_busqueda)
+        return IndiceBusqueda(self.df, self.campos_busqueda)
+
+    @cached_property
+    def campos_busqueda(self):
+        def primera(*claves, excluir=()):
+            return next((c for c in self.df.columns if any(k in c.lower() for k in claves) and not any(x in c.lower() for x in excluir)), None)
+        campos = {
+            "asegurado": primera("asegurado", "client"),
+            "documento": primera("documento", "rut", "cédula", "cedula"),
+            "detalle": primera("detalle", "matr"),
+            "poliza": primera("póliza", "poliza", excluir=("adjunto",)),
+            "mail": primera("correo", "mail"),
+        }
+        return {k: c for k, c in campos.items() if c}
+
+    @cached_property
+    def matriculas(self):
+        """Matricula (clave de `claves_matricula`) -> asegurado, sacada del detalle de cada poliza."""
+        c_detalle = self.campos_busqueda.get("detalle")
+        if c_detalle is None:
+            return pd.Series(dtype=object)
+        detalle = self.df[c_detalle].astype(object).where(self.df[c_detalle].notna(), "").astype(str).str.upper()
+        encontradas = detalle.str.findall(PATRON_MATRICULA).explode().dropna()
+        c_asegurado = self.campos_busqueda.get("asegurado")
+        asegurados = self.df[c_asegurado] if c_asegurado else pd.Series("", index=self.df.index)
+        por_clave = pd.Series(asegurados.reindex(encontradas.index).astype(object).fillna("").to_numpy(), index=claves_matricula(encontradas).to_numpy())
+        return por_clave[~por_clave.index.duplicated()]
+
+    @cached_property
+    def historial(self):
+        return IndiceHistorial(self.df, COL_ASEGURADO, COL_RAMO, COL_DETALLE, self.campos_busqueda.get("documento"))
+
+    def buscar(self, texto, dentro=None):
+        """Filas que matchean `texto`, ordenadas por relevancia (opcionalmente solo dentro de otra vista)."""
+        posiciones = self.busqueda.buscar(texto)
+        permitidas = self.permitidas(dentro)
+        if permitidas is not None:
+            posiciones = posiciones[permitidas[posiciones]]
+        return self.df.take(posiciones)
+
+    def vista(self, seleccion, estado="Todas", hoy=None):
+        """Filas que cumplen los filtros del sidebar, sin copiar la cartera cuando no hay filtros."""
+        posiciones = self.filtros.filtrar(seleccion, estado, hoy)
+        return self.df if posiciones is None else self.df.take(posiciones)
+
+    def reporte_memoria(self):
+        """Bytes del frame crudo vs el tipado."""
+        antes = self.origen.memory_usage(deep=True).sum()
+        despues = self.df.memory_usage(deep=True).sum()
+        return {"antes": int(antes), "despues": int(despues), "reduccion": 1 - despues / antes if antes else 0.0}
+
+
+# ==========================================
+# INDICES DE FILTRO DEL SIDEBAR
+# ==========================================
+class IndiceFiltros:
+    """Indice invertido por dimension (valor -> posiciones) y vigencias ordenadas."""
+
+    def __init__(self, df, dimensiones, vencimientos):
+        self.vencimientos = vencimientos
+        self.categorias = {}
+        self.codigos = {}
+        self.posiciones = {}
+        self.opciones = {}
+        for col in dimensiones:
+            categorias = df[col].cat.categories
+            codigos = df[col].cat.codes.to_numpy()
+            orden = np.argsort(codigos, kind="stable")
+            cortes = np.searchsorted(codigos[orden], np.arange(len(categorias) + 1))
+            self.categorias[col] = categorias
+            self.codigos[col] = codigos
+            self.posiciones[col] = {cat: orden[cortes[i]:cortes[i + 1]] for i, cat in enumerate(categorias)}
+            self.opciones[col] = ["Todos"] + sorted(categorias.tolist())
+
+    def filtrar(self, seleccion, estado="Todas", hoy=None):
+        """Posiciones (ordenadas) que cumplen todos los filtros, o None si no hay ninguno activo."""
+        activos = [(col, val) for col, val in seleccion.items() if val != "Todos" and col in self.posiciones]
+        hoy = np.datetime64(hoy or date.today(), "ns")
+        listas = [(len(self.posiciones[col].get(val, ())), col, val) for col, val in activos]
+        if not listas:
+            venc = self.vencimientos
+            if estado == "Vigentes":
+                return np.sort(venc.orden[np.searchsorted(venc.fechas, hoy):])
+            if estado == "No vigentes":
+                return np.sort(venc.orden[:np.searchsorted(venc.fechas, hoy)])
+            return None
+        # Se parte de la lista mas chica y el resto de los filtros se chequean sobre los candidatos
+        listas.sort(key=lambda x: x[0])
+        _, col0, val0 = listas[0]
+        candidatos = self.posiciones[col0].get(val0, np.empty(0, dtype=np.intp))
+        for _, col, val in listas[1:]:
+            codigo = self.categorias[col].get_indexer([val])[0]
+            candidatos = candidatos[self.codigos[col][candidatos] == (codigo if codigo >= 0 else -2)]
+        if estado == "Vigentes":
+            candidatos = candidatos[self.vencimientos.fin[candidatos] >= hoy]
+        elif estado == "No vigentes":
+            candidatos = candidatos[self.vencimientos.fin[candidatos] < hoy]
+        return candidatos
+
+
+# ==========================================
+# INDICE DE VENCIMIENTOS
+# ==========================================
+class IndiceVencimientos:
+    """Posiciones ordenadas por Fin de Vigencia, con premios acumulados para sumar rangos."""
+
+    def __init__(self, fin, premio):
+        self.fin = fin.to_numpy(dtype="datetime64[ns]")
+        validas = np.flatnonzero(~np.isnat(self.fin))
+        self.orden = validas[np.argsort(self.fin[validas], kind="stable")]
+        self.fechas = self.fin[self.orden]
+        self.premio = premio.to_numpy(dtype="float64")
+        self.premio_acumulado = np.concatenate([[0.0], np.cumsum(self.premio[self.orden])])
+
+    def _cortes(self, desde, hasta):
+        # Por dia: una fecha de fin con hora (dd/mm/aaaa hh:mm) entra el mismo dia de `hasta`
+        hasta = pd.Timestamp(hasta).normalize() + pd.Timedelta(days=1)
+        return (np.searchsorted(self.fechas, np.datetime64(pd.Timestamp(desde).normalize(), "ns"), side="left"),
+                np.searchsorted(self.fechas, np.datetime64(hasta, "ns"), side="left"))
+
+    def rango(self, desde, hasta, permitidas=None):
+        """Posiciones con vencimiento entre `desde` y `hasta` (inclusive), en orden de fecha."""
+        i, j = self._cortes(desde, hasta)
+        posiciones = self.orden[i:j]
+        return posiciones if permitidas is None else posiciones[permitidas[posiciones]]
+
+    def proximos(self, dias, hoy=None, permitidas=None):
+        """(cantidad, premio USD) de las polizas que vencen en los proximos `dias` dias."""
+        hoy = pd.Timestamp(hoy or date.today())
+        i, j = self._cortes(hoy, hoy + pd.Timedelta(days=dias))
+        if permitidas is None:
+            return int(j - i), float(self.premio_acumulado[j] - self.premio_acumulado[i])
+        posiciones = self.orden[i:j][permitidas[self.orden[i:j]]]
+        return len(posiciones), float(self.premio[posiciones].sum())
+
+    def por_periodo(self, posiciones, periodo="M"):
+        """Cantidad y premio por semana ("W") o mes ("M") de las posiciones dadas."""
+        fechas = pd.Series(self.fin[posiciones])
+        if periodo == "W":
+            clave = (fechas - pd.to_timedelta(fechas.dt.weekday, unit="D")).dt.normalize()
+        else:
+            clave = fechas.dt.to_period("M").dt.to_timestamp()
+        tabla = pd.DataFrame({"Periodo": clave.to_numpy(), "Pólizas": 1, "Premio USD": self.premio[posiciones]})
+        return tabla.groupby("Periodo", as_index=False).sum()
+
+    def calendario(self, posiciones):
+        """Cantidad de vencimientos por dia, para el mapa de calor (semana x dia de la semana).
+
+        Se agrupa por la fecha del lunes ("Inicio") y "Semana" es solo su rotulo, con el anio para
+        que la misma semana de dos anios no se junte en el grafico.
+        """
+        fechas = pd.Series(self.fin[posiciones])
+        tabla = pd.DataFrame({
+            "Inicio": (fechas - pd.to_timedelta(fechas.dt.weekday, unit="D")).dt.normalize(),
+            "Día": fechas.dt.weekday.map(dict(enumerate(["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]))),
+            "Pólizas": 1,
+            "Premio USD": self.premio[posiciones],
+        })
+        tabla = tabla.groupby(["Inicio", "Día"], as_index=False).sum()
+        tabla.insert(0, "Semana", tabla["Inicio"].dt.strftime("%d/%m/%y"))
+        return tabla
+
+
+# ==========================================
+# INDICE DE BUSQUEDA DE LA CARTERA
+# ==========================================
+def normalizar_texto(v):
+    """Minusculas y sin tildes, para comparar sin importar acentos ni mayusculas."""
+    if v is None or (isinstance(v, float) and np.isnan(v)):
+        return ""
+    return unicodedata.normalize("NFKD", str(v)).encode("ascii", "ignore").decode("ascii").lower()
+
+
+# Matriculas uruguayas en texto libre ("SBA 1234", "sba-1234"); la clave es sin espacios ni guiones
+PATRON_MATRICULA = r"\b[A-Z]{3}[ -]?\d{4}\b"
+
+
+def claves_matricula(serie):
+    """Matricula comparable (mayusculas, solo letras y numeros) para cada valor de la serie."""
+    texto = serie.astype(object).where(serie.notna(), "").astype(str)
+    return texto.str.upper().str.replace(r"[^0-9A-Z]", "", regex=True)
+
+
+def _tokens_serie(serie):
+    # Misma normalizacion que normalizar_texto, vectorizada por columna
+    texto = serie.astype(object).where(serie.notna(), "").astype(str)
+    texto = texto.str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii").str.lower()
+    return texto.str.findall(r"[0-9a-z]+").tolist()
+
+
+def _trigramas(token):
+    t = f"  {token} "
+    return {t[i:i + 3] for i in range(len(t) - 2)}
+
+
+def _levenshtein(a, b, maximo):
+    if abs(len(a) - len(b)) > maximo:
+        return maximo + 1
+    previa = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        actual = [i]
+        for j, cb in enumerate(b, 1):
+            actual.append(min(previa[j] + 1, actual[j - 1] + 1, previa[j - 1] + (ca != cb)))
+        if min(actual) > maximo:
+            return maximo + 1
+        previa = actual
+    return previa[-1]
+
+
+class _BloqueIndice:
+    """Indice invertido en formato CSR: vocabulario ordenado, offsets y posiciones."""
+
+    def __init__(self, tokens, posiciones):
+        if len(tokens):
+            tokens = np.asarray(tokens, dtype=str)
+            orden = np.lexsort((posiciones, tokens))
+            tokens, posiciones = tokens[orden], np.asarray(posiciones, dtype=np.int64)[orden]
+            self.vocab, inicios = np.unique(tokens, return_index=True)
+            self.offsets = np.append(inicios, len(tokens))
+        else:
+            self.vocab, self.offsets = np.array([], dtype=str), np.zeros(1, dtype=np.int64)
+        self.posiciones = np.asarray(posiciones, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.posiciones)
+
+    def pares(self):
+        return np.repeat(self.vocab, np.diff(self.offsets)), self.posiciones
+
+    def exacto(self, token):
+        i = np.searchsorted(self.vocab, token)
+        if i < len(self.vocab) and self.vocab[i] == token:
+            return self.posiciones[self.offsets[i]:self.offsets[i + 1]]
+        return self.posiciones[:0]
+
+    def prefijo(self, prefijo):
+        i = np.searchsorted(self.vocab, prefijo)
+        j = np.searchsorted(self.vocab, prefijo + "\uffff")
+        return self.posiciones[self.offsets[i]:self.offsets[j]]
+
+
+class IndiceBusqueda:
+    """Busqueda por tokens sobre asegurado, documento, detalle, poliza y mail.
+
+    Cada termino de la busqueda puntua por fila: exacto 3, prefijo 2, parecido (nombres,
+    hasta 1-2 letras de diferencia) 1. Una fila tiene que matchear todos los terminos.
+    """
+
+    MAX_DELTAS = 8
+
+    def __init__(self, df=None, campos=None, desde=0):
+        self.n = 0
+        self.bloques = []
+        self.nombres = set()
+        self.trigramas = {}
+        if df is not None:
+            self.bloques.append(self._armar_bloque(df, campos, desde))
+            self.n = len(df)
+
+    def _armar_bloque(self, df, campos, desde):
+        tokens, posiciones = [], []
+        columnas = {k: _tokens_serie(df[c].iloc[desde:]) for k, c in campos.items()}
+        for i, listas in enumerate(zip(*columnas.values())):
+            fila = set()
+            for lista in listas:
+                fila.update(lista)
+                # "1.234.567-8" o "SBA 1234" tambien se indexan juntos: 12345678, sba1234
+                if len(lista) > 1:
+                    fila.add("".join(lista))
+            tokens.extend(fila)
+            posiciones.extend([desde + i] * len(fila))
+        nombres = {t for lista in columnas.get("asegurado", []) for t in lista if not t.isdigit()} - self.nombres
+        for t in nombres:
+            for tri in _trigramas(t):
+                self.trigramas.setdefault(tri, set()).add(t)
+        self.nombres |= nombres
+        return _BloqueIndice(tokens, posiciones)
+
+    def extender(self, df, campos):
+        """Nuevo indice con las filas agregadas al final de la cartera; este queda intacto."""
+        nuevo = IndiceBusqueda()
+        nuevo.bloques = list(self.bloques)
+        nuevo.nombres = set(self.nombres)
+        nuevo.trigramas = {tri: set(ts) for tri, ts in self.trigramas.items()}
+        if len(df) > self.n:
+            nuevo.bloques.append(nuevo._armar_bloque(df, campos, self.n))
+        nuevo.n = len(df)
+        if len(nuevo.bloques) > self.MAX_DELTAS:
+            pares = [b.pares() for b in nuevo.bloques]
+            nuevo.bloques = [_BloqueIndice(np.concatenate([p[0] for p in pares]), np.concatenate([p[1] for p in pares]))]
+        return nuevo
+
+    def parecidos(self, termino):
+        if len(termino) < 4 or termino.isdigit():
+            return []
+        maximo = 1 if len(termino) <= 5 else 2
+        tris = _trigramas(termino)
+        conteo = {}
+        for tri in tris:
+            for t in self.trigramas.get(tri, ()):
+                conteo[t] = conteo.get(t, 0) + 1
+        minimo = max(1, len(tris) - 3 * maximo)
+        return [t for t, c in conteo.items() if c >= minimo and t != termino and _levenshtein(termino, t, maximo) <= maximo]
+
+    def buscar(self, texto):
+        """Posiciones que matchean todos los terminos, de mayor a menor puntaje."""
+        terminos = re.findall(r"[0-9a-z]+", normalizar_texto(texto))
+        if not terminos:
+            return np.arange(self.n)
+        total = np.zeros(self.n, dtype=np.int16)
+        vivas = np.ones(self.n, dtype=bool)
+        for termino in dict.fromkeys(terminos):
+            puntaje = np.zeros(self.n, dtype=np.int8)
+            for t in self.parecidos(termino):
+                for b in self.bloques:
+                    puntaje[b.exacto(t)] = 1
+            for b in self.bloques:
+                puntaje[b.prefijo(termino)] = 2
+                puntaje[b.exacto(termino)] = 3
+            vivas &= puntaje > 0
+            total += puntaje
+        posiciones = np.flatnonzero(vivas)
+        return posiciones[np.argsort(-total[posiciones], kind="stable")]
+
+
+# ==========================================
+# HISTORIAL POR CLIENTE
+# ==========================================
+def _clave(v):
+    return "" if v is None or (not isinstance(v, str) and pd.isna(v)) else v
+
+
+def _documento(v):
+    return "".join(re.findall(r"[0-9a-z]+", normalizar_texto(v)))
+
+
+def _documentos(serie):
+    # "1.234.567-8" y "12345678" son el mismo documento
+    return np.array(["".join(t) for t in _tokens_serie(serie)], dtype=object)
+
+
+class _Grupos:
+    """Clave -> posiciones, en formato CSR y respetando el orden de entrada dentro de cada grupo."""
+
+    def __init__(self, claves, orden):
+        codigos, unicos = pd.factorize(claves)
+        por_grupo = np.argsort(codigos, kind="stable")
+        self.posiciones = orden[por_grupo]
+        self.offsets = np.searchsorted(codigos[por_grupo], np.arange(len(unicos) + 1))
+        self.codigo = {k: i for i, k in enumerate(unicos)}
+
+    def get(self, clave):
+        i = self.codigo.get(clave)
+        return None if i is None else self.posiciones[self.offsets[i]:self.offsets[i + 1]]
+
+
+class IndiceHistorial:
+    """Grupos (asegurado, ramo, detalle) y por documento, ya ordenados por vigencia descendente."""
+
+    def __init__(self, df, c_asegurado, c_ramo, c_detalle, c_documento=None):
+        self.df = df
+        self.columnas = [c for c in (c_asegurado, c_ramo, c_detalle) if c in df.columns]
+        orden = df["Fin de Vigencia"].sort_values(ascending=False, na_position="last", kind="stable").index.to_numpy()
+        self.grupos = self.por_asegurado = self.por_documento = None
+        if c_asegurado in df.columns:
+            valores = [df[c].take(orden).astype(object).fillna("").to_numpy() for c in self.columnas]
+            self.grupos = _Grupos(pd.MultiIndex.from_arrays(valores), orden)
+            self.por_asegurado = _Grupos(valores[0], orden)
+        if c_documento and c_documento in df.columns:
+            docs = _documentos(df[c_documento].take(orden))
+            self.por_documento = _Grupos(docs, orden)
+
+    def poliza(self, fila):
+        """Renovaciones de la misma poliza (mismo asegurado, ramo y detalle que `fila`).
+
+        Un ramo o detalle vacio en `fila` no filtra: entran todas las del asegurado.
+        """
+        clave = tuple(_clave(fila.get(c)) for c in self.columnas)
+        posiciones = None
+        if self.grupos and clave[0]:
+            if all(clave):
+                posiciones = self.grupos.get(clave)
+            else:
+                posiciones = self.por_asegurado.get(clave[0])
+                for c, valor in zip(self.columnas[1:], clave[1:]):
+                    if valor and posiciones is not None:
+                        posiciones = posiciones[self.df[c].to_numpy(dtype=object)[posiciones] == valor]
+        return self.df.take(posiciones if posiciones is not None else np.empty(0, dtype=np.intp))
+
+    def cliente(self, documento=None, asegurado=None):
+        """Todas las polizas del cliente en todos los ramos (por documento; si no hay, por nombre)."""
+        doc = _documento(documento)
+        posiciones = self.por_documento.get(doc) if self.por_documento and doc else None
+        if posiciones is None and self.por_asegurado and _clave(asegurado):
+            posiciones = self.por_asegurado.get(_clave(asegurado))
+        return self.df.take(posiciones if posiciones is not None else np.empty(0, dtype=np.intp))
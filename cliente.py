@@ -0,0 +1,52 @@
+import streamlit as st
+
+from codec import decodificar
+from recursos import NOMBRES, get_almacen_links
+from vista_cliente import CacheVistas
+
+# Entrada de los links de propuestas (?p= / ?q=). app.py deriva aca antes de importar pandas,
+# plotly y el resto del CRM, que el cliente no usa.
+
+@st.cache_resource
+def get_cache_vistas():
+    return CacheVistas(nombres=NOMBRES)
+
+def mostrar_vista(bloques):
+    for bloque in bloques:
+        if bloque[0] == "md":
+            st.markdown(bloque[1], unsafe_allow_html=True)
+        elif bloque[0] == "columnas":
+            for col, html in zip(st.columns(len(bloque[1])), bloque[1]):
+                col.markdown(html, unsafe_allow_html=True)
+        elif bloque[0] == "metricas":
+            for col, (titulo, valor) in zip(st.columns(len(bloque[1])), bloque[1]):
+                col.metric(titulo, valor)
+        elif bloque[0] == "tabla":
+            st.dataframe(bloque[1], use_container_width=True, hide_index=True,
+                column_config={c: st.column_config.NumberColumn(t, format=f) for c, (t, f) in bloque[2].items()} or None)
+        else:
+            st.write("")
+
+def es_link_cliente(query_params):
+    return "p" in query_params or "q" in query_params
+
+def pagina_cliente(query_params):
+    try:
+        if "p" in query_params:
+            propuesta_cliente = get_almacen_links().obtener(query_params["p"])
+            if propuesta_cliente is None: raise KeyError(f"la propuesta {query_params['p']} no existe")
+        else:
+            propuesta_cliente = decodificar(query_params["q"])
+
+        st.set_page_config(page_title="EDF SEGUROS - Propuesta", layout="wide", page_icon="🛡️")
+        st.markdown("""
+            <style>
+            .ben-fila { background-color: #f8f9fa; padding: 10px 18px; border-radius: 8px; margin-bottom: 8px; border-left: 5px solid #1E3A8A !important; font-size: 14px; color: #333; }
+            .caja-azul { background-color: #ffffff; padding: 18px; border-radius: 12px; height: 100%; border: 1px solid #e0e0e0; border-top: 5px solid #1E3A8A !important; }
+            </style>
+        """, unsafe_allow_html=True)
+
+        st.image("https://raw.githubusercontent.com/roque-eng/crm-final/main/de-freitas-logo-01.jpg", width=150)
+        mostrar_vista(get_cache_vistas().vista(propuesta_cliente))
+    except Exception as e:
+        st.error(f"Error al cargar la propuesta externa: {e}")
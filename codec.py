@@ -0,0 +1,113 @@
+import base64
+import hashlib
+import json
+import zlib
+
+import plantillas
+
+VERSION = 1
+PREFIJO = f"v{VERSION}."
+
+# Campos de la propuesta -> clave corta. Los que no esten aca viajan como "~campo".
+CLAVES = {
+    "fecha": "f", "n": "n", "tipo": "k", "e": "e", "cont": "c", "tab": "t", "ben": "b", "ch": "h", "ca": "a", "cb": "bi",
+    "v": "v", "matricula": "m", "cobertura_cot": "cc", "zona": "z", "doc": "d", "e_nombre": "en",
+    "aseguradora": "as", "aeronave": "ae", "alcance_geo": "ag", "destino": "de", "tab_principales": "tp", "tab_accidentes": "ta",
+    "aptitud_aterrizaje": "ap", "obs_av": "o", "subtotal": "s", "cargos": "cg", "total": "to",
+    "tipo_seg": "ts", "act": "ac", "cia": "ci", "vig": "vg", "tab_cob": "tc", "cap_total": "ct", "ded": "dd", "tab_sub": "tb",
+    "ubi": "u", "equ": "eq", "acl": "cl", "tasa": "tz", "costo": "co", "fin": "fi", "tab_comp": "tm",
+}
+# Columnas de las tablas (cotizaciones, vehiculos, coberturas) -> clave corta
+COLUMNAS = {
+    "Aseguradora": "A", "Contado": "C", "10 Cuotas": "Q", "Deducible": "D", "Marca": "Ma", "Modelo": "Mo", "Ano": "An",
+    "Matricula": "Mt", "Cobertura": "Cb", "Capital (USD)": "K", "Capital": "Kp", "Tasa (%)": "T", "Asientos": "S",
+    "Costo": "Co", "Premio (USD)": "P",
+}
+TIPOS = {"Individual": "I", "Flota": "F", "Aeronave": "A", "RV": "R"}
+
+# Valores por defecto por tipo: si la propuesta trae exactamente eso, el campo no viaja
+DEFECTOS = {
+    "Individual": {"v": "", "matricula": "", "cobertura_cot": "", "zona": "", "cont": "", "doc": "", "ben": "", "ch": "", "ca": "", "cb": ""},
+    "Flota": {"cont": "", "ben": "", "ch": "", "ca": "", "cb": ""},
+    "Aeronave": {"aseguradora": "", "aeronave": "", "matricula": "", "alcance_geo": "", "destino": "", "cont": "",
+                 "tab_accidentes": [], "aptitud_aterrizaje": False, "obs_av": ""},
+    "RV": {"tipo_seg": "", "act": "", "cia": "", "vig": "", "cont": "", "ded": "", "ubi": "", "equ": "", "acl": "", "fin": "", "tab_comp": []},
+}
+
+# Textos y tablas de plantillas.py que viajan como referencia ({"@": hash}). Si una plantilla
+# cambia, su version anterior se agrega a ANTERIORES para que los links viejos sigan abriendo.
+ANTERIORES = []
+
+
+def _canonico(valor):
+    return json.dumps(valor, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+
+
+def _ref(valor):
+    return hashlib.sha1(_canonico(valor).encode()).hexdigest()[:6]
+
+
+REFERENCIAS = {_ref(v): v for v in ANTERIORES + [v for k, v in vars(plantillas).items() if k.startswith(("txt_", "COBERTURAS_", "SUBLIMITES_"))]}
+_INV_CLAVES = {v: k for k, v in CLAVES.items()}
+_INV_COLUMNAS = {v: k for k, v in COLUMNAS.items()}
+_INV_TIPOS = {v: k for k, v in TIPOS.items()}
+
+
+def _corta(clave, tabla):
+    return tabla.get(clave, "~" + clave)
+
+
+def _larga(clave, inversa):
+    return clave[1:] if clave.startswith("~") else inversa[clave]
+
+
+def _mismo(a, b):
+    # 0 == False == 0.0 en Python: la comparacion es por JSON para no perder el tipo
+    return type(a) is type(b) and _canonico(a) == _canonico(b)
+
+
+def codificar(propuesta):
+    """Texto compacto para `?q=`: claves cortas, sin defectos, plantillas por referencia, zlib."""
+    tipo = propuesta.get("tipo")
+    defectos = DEFECTOS.get(tipo, {})
+    compacta = {}
+    for campo, valor in propuesta.items():
+        if campo in defectos and _mismo(valor, defectos[campo]):
+            continue
+        if campo == "tipo":
+            valor = TIPOS.get(valor, valor)
+        elif isinstance(valor, (str, list)) and valor and _ref(valor) in REFERENCIAS and _mismo(REFERENCIAS[_ref(valor)], valor):
+            valor = {"@": _ref(valor)}
+        elif isinstance(valor, list):
+            valor = [{_corta(c, COLUMNAS): x for c, x in fila.items()} if isinstance(fila, dict) else fila for fila in valor]
+        elif isinstance(valor, dict):
+            # Un dict suelto va envuelto para no confundirse con una referencia
+            valor = {"=": valor}
+        compacta[_corta(campo, CLAVES)] = valor
+    crudo = zlib.compress(json.dumps(compacta, separators=(",", ":"), ensure_ascii=False).encode(), 9)
+    return PREFIJO + base64.urlsafe_b64encode(crudo).decode().rstrip("=")
+
+
+def decodificar(texto):
+    """Propuesta original a partir de un `?q=` nuevo (v1.) o de los links viejos (base64 de JSON)."""
+    if not texto.startswith(PREFIJO):
+        return json.loads(base64.b64decode(texto).decode())
+    cuerpo = texto[len(PREFIJO):]
+    compacta = json.loads(zlib.decompress(base64.urlsafe_b64decode(cuerpo + "=" * (-len(cuerpo) % 4))))
+    propuesta = {}
+    for clave, valor in compacta.items():
+        campo = _larga(clave, _INV_CLAVES)
+        if campo == "tipo":
+            valor = _INV_TIPOS.get(valor, valor)
+        elif isinstance(valor, dict) and set(valor) == {"="}:
+            valor = valor["="]
+        elif isinstance(valor, dict):
+            if valor["@"] not in REFERENCIAS:
+                raise KeyError(f"plantilla {valor['@']} desconocida")
+            valor = json.loads(_canonico(REFERENCIAS[valor["@"]]))
+        elif isinstance(valor, list):
+            valor = [{_larga(c, _INV_COLUMNAS): x for c, x in fila.items()} if isinstance(fila, dict) else fila for fila in valor]
+        propuesta[campo] = valor
+    for campo, defecto in DEFECTOS.get(propuesta.get("tipo"), {}).items():
+        propuesta.setdefault(campo, json.loads(_canonico(defecto)))
+    return propuesta
@@ -0,0 +1,196 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+
+def _a_json(v):
+    # Escalares de numpy/pandas (np.int64, Timestamp...) a tipos nativos
+    return v.item() if hasattr(v, "item") else str(v)
+
+
+# ==========================================
+# COLA DE ESCRITURA AL SHEET (WRITE-BEHIND)
+# ==========================================
+class ColaEscritura:
+    """Filas pendientes de agregar a hojas del Sheet, persistidas en SQLite y enviadas en lotes.
+
+    `enviar(hoja, filas)` hace el append de varias filas de una vez y levanta excepcion si falla
+    (en produccion `ws.append_rows`, en pruebas cualquier hoja falsa). `actualizar(hoja, clave,
+    fila)` y `borrar(hoja, clave)` hacen lo propio con la fila identificada por `clave`. El orden
+    se respeta por hoja: un lote solo sale cuando el anterior de esa hoja se confirmo (appends
+    seguidos viajan juntos; ediciones y borrados de a uno); si falla se reintenta con backoff
+    exponencial sin frenar a las demas hojas. Un lote que falla `max_intentos` veces queda
+    "fallida" (a la vista en `fallidas()`, sin mas reintentos) y su hoja queda en pausa hasta
+    `reintentar_fallidas` o `descartar_fallidas`: lo que venia detras (otra fila, o la edicion
+    de la fila que no se pudo agregar) no sale antes que ella.
+    """
+
+    def __init__(self, enviar, ruta=".cache/cola_sheets.db", max_lote=50, espera=2.0, backoff_base=5.0, backoff_max=300.0, actualizar=None, borrar=None,
+                 max_intentos=20):
+        self.enviar = enviar
+        self.actualizar = actualizar
+        self.borrar = borrar
+        self.ops = {"append"} | ({"update"} if actualizar is not None else set()) | ({"delete"} if borrar is not None else set())
+        self.ruta = ruta
+        self.max_lote = max_lote
+        self.espera = espera
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_intentos = max_intentos
+        self.stats = {"encoladas": 0, "enviadas": 0, "lotes": 0, "fallos": 0, "agotadas": 0, "ultimo_envio": None, "ultimo_error": None}
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS pendientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, hoja TEXT NOT NULL, fila TEXT NOT NULL,
+            creado REAL NOT NULL, intentos INTEGER NOT NULL DEFAULT 0, proximo REAL NOT NULL DEFAULT 0, error TEXT,
+            op TEXT NOT NULL DEFAULT 'append', clave TEXT, estado TEXT NOT NULL DEFAULT 'pendiente')""")
+        columnas = {c[1] for c in self._db.execute("PRAGMA table_info(pendientes)")}
+        if "op" not in columnas:
+            self._db.execute("ALTER TABLE pendientes ADD COLUMN op TEXT NOT NULL DEFAULT 'append'")
+            self._db.execute("ALTER TABLE pendientes ADD COLUMN clave TEXT")
+        if "estado" not in columnas:
+            self._db.execute("ALTER TABLE pendientes ADD COLUMN estado TEXT NOT NULL DEFAULT 'pendiente'")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pendientes_hoja ON pendientes (hoja, id)")
+        # Ediciones o borrados que dejo una corrida anterior no pueden salir sin su backend
+        sin_backend = [op for (op,) in self._db.execute("SELECT DISTINCT op FROM pendientes WHERE estado = 'pendiente'") if op not in self.ops]
+        if sin_backend:
+            raise ValueError(f"hay operaciones {sin_backend} en {ruta} y la cola no tiene backend para ellas")
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._bucle, daemon=True, name="cola-sheets")
+                self._hilo.start()
+        # Lo que quedo de una corrida anterior sale apenas arranca
+        self._hay_trabajo.set()
+        return self
+
+    def detener(self, timeout=5.0):
+        self._detener.set()
+        self._hay_trabajo.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def encolar(self, hoja, fila, op="append", clave=None):
+        """Guarda la operacion en disco y vuelve enseguida; el envio lo hace el hilo de fondo."""
+        if op not in self.ops:
+            raise ValueError(f"la cola no tiene backend para {op!r}")
+        with self._lock:
+            cur = self._db.execute("INSERT INTO pendientes (hoja, fila, creado, op, clave) VALUES (?, ?, ?, ?, ?)",
+                                   (hoja, json.dumps(list(fila), default=_a_json), time.time(), op, clave))
+            self.stats["encoladas"] += 1
+        self._hay_trabajo.set()
+        return cur.lastrowid
+
+    def encolar_edicion(self, hoja, clave, fila):
+        return self.encolar(hoja, fila, op="update", clave=clave)
+
+    def encolar_borrado(self, hoja, clave):
+        return self.encolar(hoja, [], op="delete", clave=clave)
+
+    def reintentar_ahora(self):
+        with self._lock:
+            self._db.execute("UPDATE pendientes SET proximo = 0 WHERE estado = 'pendiente'")
+        self._hay_trabajo.set()
+
+    def reintentar_fallidas(self):
+        """Devuelve las fallidas a la cola, en su lugar original (el orden es por id)."""
+        with self._lock:
+            self._db.execute("UPDATE pendientes SET estado = 'pendiente', intentos = 0, proximo = 0 WHERE estado = 'fallida'")
+        self._hay_trabajo.set()
+
+    def descartar_fallidas(self):
+        with self._lock:
+            return self._db.execute("DELETE FROM pendientes WHERE estado = 'fallida'").rowcount
+
+    def pendientes(self):
+        """Cantidad de filas en cola por hoja."""
+        with self._lock:
+            return dict(self._db.execute("SELECT hoja, COUNT(*) FROM pendientes WHERE estado = 'pendiente' GROUP BY hoja ORDER BY hoja").fetchall())
+
+    def fallidas(self):
+        """Una fila por operacion que agoto sus intentos, para mostrarla en la UI."""
+        with self._lock:
+            filas = self._db.execute("SELECT hoja, op, clave, intentos, error, creado, fila FROM pendientes WHERE estado = 'fallida' ORDER BY id").fetchall()
+        return [{"Hoja": h, "Operación": op, "Clave": clave or "", "Intentos": i, "Error": err or "",
+                 "Encolado": datetime.fromtimestamp(c).strftime("%d/%m %H:%M"), "Fila": fila} for h, op, clave, i, err, c, fila in filas]
+
+    def estado(self):
+        with self._lock:
+            errores = self._db.execute("SELECT hoja, MAX(intentos), error FROM pendientes WHERE intentos > 0 AND estado = 'pendiente' GROUP BY hoja").fetchall()
+            fallidas = self._db.execute("SELECT hoja, COUNT(*) FROM pendientes WHERE estado = 'fallida' GROUP BY hoja").fetchall()
+        pendientes = self.pendientes()
+        return {**self.stats, "pendientes": pendientes, "con_error": {h: (n, e) for h, n, e in errores}, "fallidas": dict(fallidas),
+                "retenidas": {h: pendientes[h] for h, _ in fallidas if h in pendientes}}
+
+    def vaciar(self, ahora=None):
+        """Envia un lote por cada hoja lista. Devuelve la cantidad de filas confirmadas."""
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            hojas = [h for (h,) in self._db.execute(
+                "SELECT hoja FROM pendientes WHERE estado = 'pendiente' AND hoja NOT IN (SELECT hoja FROM pendientes WHERE estado = 'fallida') "
+                "GROUP BY hoja HAVING MIN(proximo) <= ? ORDER BY MIN(id)", (ahora,))]
+        enviadas = 0
+        for hoja in hojas:
+            with self._lock:
+                lote = self._db.execute("SELECT id, fila, intentos, op, clave FROM pendientes WHERE hoja = ? AND estado = 'pendiente' ORDER BY id LIMIT ?",
+                                        (hoja, self.max_lote)).fetchall()
+            if not lote:
+                continue
+            op, clave = lote[0][3], lote[0][4]
+            if op == "append":
+                lote = lote[:next((n for n, r in enumerate(lote) if r[3] != "append"), len(lote))]
+            else:
+                lote = lote[:1]
+            try:
+                if op == "append":
+                    self.enviar(hoja, [json.loads(r[1]) for r in lote])
+                elif op == "update":
+                    self.actualizar(hoja, clave, json.loads(lote[0][1]))
+                else:
+                    self.borrar(hoja, clave)
+            except Exception as e:
+                intentos = max(r[2] for r in lote) + 1
+                demora = min(self.backoff_base * 2 ** (intentos - 1), self.backoff_max)
+                ids = [r[0] for r in lote]
+                with self._lock:
+                    if intentos >= self.max_intentos:
+                        # Sin mas reintentos automaticos; la hoja queda en pausa hasta que alguien decida
+                        self._db.execute(f"UPDATE pendientes SET intentos = ?, error = ?, estado = 'fallida' WHERE id IN ({','.join('?' * len(ids))})",
+                                         (intentos, repr(e), *ids))
+                        self.stats["agotadas"] += len(ids)
+                    else:
+                        self._db.execute(f"UPDATE pendientes SET intentos = ?, error = ? WHERE id IN ({','.join('?' * len(ids))})", (intentos, repr(e), *ids))
+                        self._db.execute("UPDATE pendientes SET proximo = ? WHERE hoja = ? AND estado = 'pendiente'", (ahora + demora, hoja))
+                    self.stats["fallos"] += 1
+                    self.stats["ultimo_error"] = f"{datetime.now():%H:%M:%S} {hoja}: {e!r}"
+                continue
+            with self._lock:
+                self._db.execute(f"DELETE FROM pendientes WHERE id IN ({','.join('?' * len(lote))})", [r[0] for r in lote])
+                self.stats["enviadas"] += len(lote)
+                self.stats["lotes"] += 1
+                self.stats["ultimo_envio"] = datetime.now().strftime("%H:%M:%S")
+            enviadas += len(lote)
+        return enviadas
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._hay_trabajo.wait(self.espera)
+            self._hay_trabajo.clear()
+            # Pequena pausa para juntar en un solo lote los guardados que llegan seguidos
+            time.sleep(0.2)
+            try:
+                while self.vaciar():
+                    pass
+            except Exception as e:
+                self.stats["ultimo_error"] = f"{datetime.now():%H:%M:%S} {e!r}"
@@ -0,0 +1,191 @@
+import io
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from string import Formatter
+from urllib.parse import quote
+
+import pandas as pd
+
+FORMATOS = {
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV", "text/csv"),
+    "parquet": ("Parquet", "application/octet-stream"),
+}
+
+
+# ==========================================
+# MOTOR DE EXPORTACION
+# ==========================================
+def _xlsx_streaming(df, hoja):
+    # constant_memory: xlsxwriter baja cada fila a disco apenas se completa
+    import xlsxwriter
+    salida = io.BytesIO()
+    wb = xlsxwriter.Workbook(salida, {"constant_memory": True, "default_date_format": "dd/mm/yyyy", "strings_to_urls": False})
+    ws = wb.add_worksheet(hoja[:31])
+    negrita = wb.add_format({"bold": True})
+    ws.write_row(0, 0, [str(c) for c in df.columns], negrita)
+    columnas = [df[c].astype(object).where(df[c].notna(), None).tolist() for c in df.columns]
+    for r, fila in enumerate(zip(*columnas), start=1):
+        ws.write_row(r, 0, fila)
+    wb.close()
+    return salida.getvalue()
+
+
+def exportar(df, formato="xlsx", hoja="Datos"):
+    """Bytes del DataFrame en el formato pedido (xlsx, csv o parquet)."""
+    if formato == "csv":
+        return df.to_csv(index=False).encode("utf-8-sig")
+    if formato == "parquet":
+        salida = io.BytesIO()
+        df.to_parquet(salida, index=False)
+        return salida.getvalue()
+    return _xlsx_streaming(df, hoja)
+
+
+class CacheExportaciones:
+    """LRU de archivos ya generados, por (estado de filtros, version del snapshot, formato)."""
+
+    def __init__(self, max_items=16, max_bytes=200_000_000):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "generados": 0}
+
+    def obtener(self, clave):
+        with self._lock:
+            datos = self._datos.get(clave)
+            if datos is not None:
+                self._datos.move_to_end(clave)
+                self.stats["hits"] += 1
+            return datos
+
+    def generar(self, clave, df, formato="xlsx", hoja="Datos"):
+        datos = self.obtener((clave, formato))
+        if datos is not None:
+            return datos
+        return self.guardar((clave, formato), exportar(df, formato, hoja))
+
+    def guardar(self, clave, datos):
+        with self._lock:
+            self._datos[clave] = datos
+            self.stats["generados"] += 1
+            while len(self._datos) > self.max_items or sum(len(d) for d in self._datos.values()) > self.max_bytes:
+                if len(self._datos) == 1:
+                    break
+                self._datos.popitem(last=False)
+        return datos
+
+
+# ==========================================
+# CAMPAÑA DE RENOVACIONES
+# ==========================================
+PLANTILLA_RENOVACION = """Hola {nombre}!
+Te escribo porque esta venciendo la poliza de tu {ramo} el proximo *{fecha}*.
+Este anio estabas pagando en *{aseguradora}: {premio}*.
+Para la renovacion tenemos los siguientes comparativos:
+
+- BSE:
+- SBI:
+- MAPFRE:
+- SANCOR:
+- SURA:
+- PORTO:
+- BERKLEY:
+
+Auto Sustituto (por 15 dias) en caso de chocar y que tu vehiculo vaya al taller y necesites uno, debemos agregar $3.300 a cualquier aseguradora.
+
+Quedo a las ordenes,
+Saludos!
+{asesor}"""
+
+
+def _texto(df, col):
+    if not col or col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    serie = df[col].astype(object)
+    serie = serie.where(serie.notna(), "").astype(str).str.strip()
+    return serie.mask(serie.isin(["nan", "None", "N/D", "none"]), "")
+
+
+def _monto(df, col):
+    # Como f_num(): entero con punto de miles, y 0 o vacio cuentan como sin premio. Diferencias a
+    # proposito: un float (1500.0, como viene de ModeloCartera) se lee por su valor y no como el
+    # texto "1500.0" sin el punto (f_num daba "15.000"); los decimales se redondean; "0.0" es sin
+    # premio y un texto que no es numero tambien (f_num lo repetia tal cual)
+    if not col or col not in df.columns:
+        return pd.Series(float("nan"), index=df.index)
+    serie = df[col]
+    if not pd.api.types.is_numeric_dtype(serie):
+        es_numero = serie.map(lambda v: isinstance(v, (int, float)) and not isinstance(v, bool))
+        texto = pd.to_numeric(_texto(df, col).str.replace(r"[$.,]|USD", "", regex=True).str.strip(), errors="coerce")
+        serie = texto.mask(es_numero, pd.to_numeric(serie.where(es_numero), errors="coerce"))
+    return serie.where(serie != 0)
+
+
+def _miles(serie):
+    return serie.round(0).astype("Int64").astype(str).str.replace(r"\B(?=(\d{3})+(?!\d))", ".", regex=True)
+
+
+def _rellenar(plantilla, campos, index):
+    texto = pd.Series("", index=index, dtype=object)
+    for literal, campo, _, _ in Formatter().parse(plantilla):
+        texto = texto + literal
+        if campo:
+            texto = texto + campos[campo]
+    return texto
+
+
+def mensajes_renovacion(df, columnas, asesor_defecto="", asesores=None, plantilla=PLANTILLA_RENOVACION):
+    """Mensaje de renovacion personalizado para cada poliza de `df`, en una sola pasada.
+
+    `columnas` indica que columna usar para asegurado, aseguradora, ramo, detalle, premio_usd,
+    premio_uyu, celular, mail y ejecutivo. Con `asesores` (ejecutivo -> nombre) cada mensaje se
+    firma con el ejecutivo de la poliza; si no, todos con `asesor_defecto`.
+    """
+    idx = df.index
+    nombre = _texto(df, columnas.get("asegurado"))
+    for col in df.columns:
+        if "asegurado" in str(col).lower() or "nombre" in str(col).lower():
+            nombre = nombre.mask(nombre == "", _texto(df, col))
+    nombre_corto = nombre.str.split().str[0].fillna("").str.capitalize().replace("", "Cliente")
+    ramo = _texto(df, columnas.get("ramo")).replace("", "bien asegurado")
+    detalle = _texto(df, columnas.get("detalle"))
+    ramo = ramo.mask(detalle != "", ramo + " (" + detalle + ")")
+    uyu, usd = _monto(df, columnas.get("premio_uyu")), _monto(df, columnas.get("premio_usd"))
+    premio = pd.Series("a coordinar", index=idx, dtype=object)
+    premio = premio.mask(usd.notna(), "USD " + _miles(usd).astype(object))
+    premio = premio.mask(uyu.notna(), "UYU " + _miles(uyu).astype(object))
+    fechas = pd.to_datetime(df["Fin de Vigencia"], errors="coerce")
+    ejecutivo = _texto(df, columnas.get("ejecutivo"))
+    asesor = pd.Series(asesor_defecto, index=idx, dtype=object)
+    if asesores is not None:
+        asesor = ejecutivo.map(lambda e: asesores.get(e, e)).mask(ejecutivo == "", asesor_defecto)
+    campos = {
+        "nombre": nombre_corto, "ramo": ramo, "fecha": fechas.dt.strftime("%d/%m/%Y").fillna(""),
+        "aseguradora": _texto(df, columnas.get("aseguradora")).replace("", "su aseguradora"),
+        "premio": premio, "asesor": asesor,
+    }
+    mensaje = _rellenar(plantilla, campos, idx)
+    celular = _texto(df, columnas.get("celular"))
+    digitos = celular.str.replace(r"\D", "", regex=True).str.lstrip("0")
+    whatsapp = ("https://wa.me/598" + digitos + "?text=" + mensaje.map(quote)).where(digitos.str.len() >= 8, "")
+    return pd.DataFrame({
+        "Ejecutivo": ejecutivo.replace("", "SIN EJECUTIVO"), "Asesor": asesor, "Asegurado": nombre,
+        "Celular": celular, "Mail": _texto(df, columnas.get("mail")), "Vencimiento": fechas.dt.date,
+        "Aseguradora": _texto(df, columnas.get("aseguradora")), "Ramo": ramo, "Mensaje": mensaje, "WhatsApp": whatsapp,
+    }, index=idx)
+
+
+def exportar_campana(mensajes, formato="zip"):
+    """Mensajes en csv/xlsx, o un zip con un CSV por ejecutivo."""
+    if formato != "zip":
+        return exportar(mensajes.sort_values(["Ejecutivo", "Vencimiento"]), formato, "Renovaciones")
+    salida = io.BytesIO()
+    with zipfile.ZipFile(salida, "w", zipfile.ZIP_DEFLATED) as zf:
+        for ejecutivo, grupo in mensajes.groupby("Ejecutivo", sort=True):
+            nombre = re.sub(r"[^0-9A-Za-z_-]+", "_", str(ejecutivo)) or "SIN_EJECUTIVO"
+            zf.writestr(f"renovaciones_{nombre}.csv", grupo.sort_values("Vencimiento").to_csv(index=False).encode("utf-8-sig"))
+    return salida.getvalue()
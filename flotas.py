@@ -0,0 +1,143 @@
+import io
+import re
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from cartera import claves_matricula, normalizar_texto
+
+COLUMNAS_FLOTA = ["Marca", "Modelo", "Ano", "Matricula", "Cobertura", "Contado", "Deducible"]
+COBERTURA_DEFECTO = "Todo Riesgo"
+# Encabezado de la planilla (normalizado: sin tildes, minusculas, solo letras y numeros) -> columna del editor
+ALIAS_COLUMNAS = {
+    "marca": "Marca", "modelo": "Modelo", "version": "Modelo",
+    "ano": "Ano", "anio": "Ano", "year": "Ano", "modeloano": "Ano",
+    "matricula": "Matricula", "patente": "Matricula", "placa": "Matricula", "chapa": "Matricula",
+    "cobertura": "Cobertura", "contado": "Contado", "premio": "Contado", "precio": "Contado", "deducible": "Deducible",
+}
+ANO_MINIMO = 1950
+
+
+def _encabezado(col):
+    return re.sub(r"[^0-9a-z]", "", normalizar_texto(col))
+
+
+def leer_planilla(archivo, nombre=None):
+    """DataFrame de texto a partir de un CSV (separador , o ;) o un XLSX subido."""
+    nombre = (nombre or getattr(archivo, "name", "")).lower()
+    if nombre.endswith((".xlsx", ".xls")):
+        return pd.read_excel(archivo, dtype=str)
+    datos = archivo.getvalue() if hasattr(archivo, "getvalue") else archivo.read()
+    try:
+        texto = datos.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        # Excel en Windows guarda los CSV en latin-1
+        texto = datos.decode("latin-1")
+    primera = texto.split("\n", 1)[0]
+    return pd.read_csv(io.StringIO(texto), sep=";" if primera.count(";") > primera.count(",") else ",", dtype=str, skipinitialspace=True)
+
+
+def _texto(df, col):
+    if col not in df.columns:
+        return pd.Series("", index=df.index, dtype=object)
+    return df[col].astype(object).where(df[col].notna(), "").astype(str).str.strip()
+
+
+def normalizar_matriculas(serie):
+    """(matricula con formato "SBA 1234", mascara de las que tienen un formato reconocible)."""
+    clave = claves_matricula(serie)
+    partes = clave.str.extract(r"^([A-Z]{1,3})(\d{3,4})$")
+    valida = partes[0].notna().to_numpy()
+    return clave.where(~valida, partes[0] + " " + partes[1]), valida
+
+
+def normalizar_anos(serie, hoy=None):
+    """(año de 4 cifras como texto, mascara de los validos). "19" -> "2019", "98" -> "1998"."""
+    tope = (hoy or date.today()).year + 1
+    ano = pd.to_numeric(serie, errors="coerce").to_numpy(dtype=float)
+    ano = np.where(ano < 100, np.where(ano <= tope % 100, 2000 + ano, 1900 + ano), ano)
+    valido = (ano >= ANO_MINIMO) & (ano <= tope) & (ano == np.floor(ano))
+    texto = pd.Series(np.where(valido, np.nan_to_num(ano).astype(int).astype(str), serie.to_numpy()), index=serie.index)
+    return texto, valido
+
+
+def normalizar_montos(serie):
+    """Montos escritos a mano ("$ 40.000", "1.234,50", "1,234.50") -> enteros; lo que no es numero vale 0."""
+    t = serie.astype(str).str.replace(r"[^0-9,.-]", "", regex=True)
+    miles_punto = t.str.fullmatch(r"-?\d{1,3}(\.\d{3})+(,\d+)?")
+    miles_coma = t.str.fullmatch(r"-?\d{1,3}(,\d{3})+(\.\d+)?")
+    t = t.mask(miles_punto, t.str.replace(".", "", regex=False)).mask(miles_coma, t.str.replace(",", "", regex=False))
+    return pd.to_numeric(t.str.replace(",", ".", regex=False), errors="coerce").fillna(0).round().astype(int)
+
+
+# ==========================================
+# IMPORTACION DE FLOTAS
+# ==========================================
+def importar_flota(df_raw, cartera=None, cobertura=COBERTURA_DEFECTO, hoy=None):
+    """Planilla cruda -> (filas para el editor de flotas, avisos por fila).
+
+    Todo se valida por columna: matriculas y años se normalizan, y se avisa de los invalidos,
+    de las matriculas repetidas en la planilla y de las que ya estan en `cartera` (la Serie
+    matricula -> asegurado de `ModeloCartera.matriculas`). Las filas con aviso igual entran al
+    editor para que el asesor las corrija ahi.
+    """
+    columnas = {}
+    for col in df_raw.columns:
+        destino = ALIAS_COLUMNAS.get(_encabezado(col))
+        if destino and destino not in columnas:
+            columnas[destino] = col
+    df = pd.DataFrame({c: _texto(df_raw, columnas[c]) if c in columnas else "" for c in COLUMNAS_FLOTA}, index=df_raw.index)
+    # Filas completamente vacias (el final de muchas planillas) no cuentan
+    df = df[(df[["Marca", "Modelo", "Ano", "Matricula"]] != "").any(axis=1)]
+    # Numero de fila en la planilla (el encabezado es la 1) para los avisos
+    fila_planilla = np.arange(len(df_raw))[df_raw.index.get_indexer(df.index)] + 2
+    df = df.reset_index(drop=True)
+
+    df["Marca"] = df["Marca"].str.upper()
+    df["Modelo"] = df["Modelo"].str.upper()
+    df["Matricula"], mat_valida = normalizar_matriculas(df["Matricula"])
+    df["Ano"], ano_valido = normalizar_anos(df["Ano"], hoy)
+    df["Cobertura"] = df["Cobertura"].mask(df["Cobertura"] == "", cobertura)
+    for c in ("Contado", "Deducible"):
+        df[c] = normalizar_montos(df[c])
+
+    clave = claves_matricula(df["Matricula"])
+    con_matricula = (clave != "").to_numpy()
+    avisos = [
+        (~con_matricula, "Sin matrícula"),
+        (con_matricula & ~mat_valida, "Matrícula con formato no reconocido"),
+        ((df["Ano"] != "").to_numpy() & ~ano_valido, "Año inválido"),
+        (con_matricula & clave.duplicated(keep="first").to_numpy(), "Matrícula repetida en la planilla"),
+    ]
+    en_cartera = pd.Series(np.nan, index=df.index, dtype=object)
+    if cartera is not None and len(cartera):
+        en_cartera = clave.map(cartera).where(con_matricula)
+        avisos.append((en_cartera.notna().to_numpy(), "Ya está en cartera"))
+    partes = []
+    for mascara, texto in avisos:
+        idx = np.flatnonzero(mascara)
+        partes.append(pd.DataFrame({"Fila": fila_planilla[idx], "Matricula": df["Matricula"].to_numpy()[idx], "Aviso": texto,
+                                    "Asegurado en cartera": en_cartera.to_numpy()[idx]}))
+    tabla_avisos = pd.concat(partes, ignore_index=True).sort_values("Fila", kind="stable").reset_index(drop=True)
+    return df, tabla_avisos
+
+
+def totales_por_cobertura(df):
+    """Vehiculos y premio contado por cobertura, con una fila de total."""
+    if df.empty:
+        return pd.DataFrame(columns=["Cobertura", "Vehiculos", "Contado"])
+    cobertura = _texto(df, "Cobertura").replace("", "Sin cobertura")
+    contado = pd.to_numeric(df["Contado"], errors="coerce").fillna(0) if "Contado" in df.columns else pd.Series(0, index=df.index)
+    tabla = pd.DataFrame({"Cobertura": cobertura, "Vehiculos": 1, "Contado": contado}).groupby("Cobertura", as_index=False, sort=True).sum()
+    total = pd.DataFrame({"Cobertura": ["TOTAL FLOTA"], "Vehiculos": [tabla["Vehiculos"].sum()], "Contado": [tabla["Contado"].sum()]})
+    return pd.concat([tabla, total], ignore_index=True)
+
+
+def resumen_vehiculos(df):
+    """Texto "Marca Modelo Matricula | ..." de los vehiculos con marca, para la fila del Sheet."""
+    if df.empty:
+        return ""
+    marca = _texto(df, "Marca")
+    texto = marca + " " + _texto(df, "Modelo") + " " + _texto(df, "Matricula")
+    return " | ".join(texto[marca != ""].tolist())
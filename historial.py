@@ -0,0 +1,134 @@
+import json
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from operator import itemgetter
+
+from propuestas import AlmacenPropuestas
+
+HOJAS_HISTORIAL = [("Cotizaciones Individuales", "Individual"), ("Cotizaciones Flotas", "Flota"), ("Cotizaciones Aeronaves", "Aeronave")]
+HOJA_POR_TIPO = {tipo: hoja for hoja, tipo in HOJAS_HISTORIAL}
+
+# tipo -> (columnas minimas que debe tener la hoja, {campo: indice de columna}, indice del link)
+COLUMNAS_HISTORIAL = {
+    "Individual": (13, {"fecha": 0, "n": 1, "doc": 2, "v": 3, "matricula": 4, "cobertura_cot": 5, "zona": 6, "e": 7}, 12),
+    "Flota": (6, {"fecha": 0, "n": 1, "e": 2, "e_nombre": 3}, 5),
+    "Aeronave": (12, {"fecha": 0, "n": 1, "aseguradora": 2, "aeronave": 3, "matricula": 4, "alcance_geo": 5, "destino": 6, "e": 7, "total": 10}, 11),
+}
+COL_JSON_AERONAVE = 12
+# Columna (1-based, como la usa gspread) donde cada hoja guarda el link: identifica la fila
+COL_LINK_POR_HOJA = {hoja: COLUMNAS_HISTORIAL[tipo][2] + 1 for hoja, tipo in HOJAS_HISTORIAL}
+
+
+def _rango(hoja, desde):
+    return f"'{hoja}'!A{desde}:Z"
+
+
+def parsear_historial(tipo, filas, ancho):
+    """Registros del historial para filas crudas (sin encabezado) de una hoja de cotizaciones."""
+    minimo, campos, col_link = COLUMNAS_HISTORIAL[tipo]
+    ancho = max(ancho, max((len(f) for f in filas), default=0))
+    if not filas or ancho < minimo:
+        return []
+    # La API de valores recorta las celdas vacias del final: se rellena al ancho de la hoja como get_all_values
+    vacia = [""] * ancho
+    filas = [f if len(f) == ancho else f + vacia[len(f):] for f in filas if f and f[0]]
+    claves, tomar = list(campos), itemgetter(*campos.values())
+    registros = [{**dict(zip(claves, tomar(f))), "tipo": tipo, "link": f[col_link]} for f in filas]
+    if tipo != "Aeronave" or ancho <= COL_JSON_AERONAVE:
+        return registros
+    # Si existe columna JSON reconstruimos el dict completo; si no parsea, quedan los campos basicos
+    for i, f in enumerate(filas):
+        if f[COL_JSON_AERONAVE]:
+            try:
+                registros[i] = {**json.loads(f[COL_JSON_AERONAVE]), "link": f[col_link]}
+            except Exception:
+                pass
+    return registros
+
+
+# ==========================================
+# HISTORIAL DE COTIZACIONES COMPARTIDO
+# ==========================================
+class CargadorHistorial:
+    """Historial de las tres hojas de cotizaciones, compartido entre sesiones.
+
+    Las tres hojas se leen en un solo `values_batch_get`; despues solo se piden las filas
+    nuevas desde la ultima lectura y se suman al `AlmacenPropuestas`. Cada `max_edad`
+    segundos (o tras `invalidar`) se relee todo y se arma un almacen nuevo, para tomar
+    ediciones y borrados hechos en el Sheet.
+    """
+
+    def __init__(self, get_spreadsheet, hojas=HOJAS_HISTORIAL, intervalo_chequeo=30, max_edad=900, medir=None):
+        self.get_spreadsheet = get_spreadsheet
+        self.medir = medir or (lambda op: nullcontext())
+        self.hojas = hojas
+        self.intervalo_chequeo = intervalo_chequeo
+        self.max_edad = max_edad
+        self._filas = {h: 1 for h, _ in hojas}  # filas leidas de cada hoja, encabezado incluido
+        self._anchos = {h: 0 for h, _ in hojas}
+        self._almacen = AlmacenPropuestas()
+        self._chequeo = 0.0
+        self._completa = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"lecturas": 0, "incrementales": 0, "filas_nuevas": 0, "ms_ultima": None, "ultima_actualizacion": None, "error": None}
+
+    def almacen(self, forzar=False):
+        """El AlmacenPropuestas vigente, al dia con el Sheet (con la demora de `intervalo_chequeo`)."""
+        with self._lock:
+            ahora = time.time()
+            if forzar or ahora - self._completa > self.max_edad:
+                self._leer(completa=True)
+            elif ahora - self._chequeo > self.intervalo_chequeo:
+                self._leer(completa=False)
+            return self._almacen
+
+    def invalidar(self):
+        with self._lock:
+            self._completa = 0.0
+
+    def _leer(self, completa):
+        t = time.perf_counter()
+        self._chequeo = time.time()
+        desde = {h: 2 if completa else self._filas[h] + 1 for h, _ in self.hojas}
+        try:
+            sh = self.get_spreadsheet()
+            with self.medir("values_batch_get"):
+                respuesta = sh.values_batch_get([_rango(h, desde[h]) for h, _ in self.hojas])
+        except Exception as e:
+            self.stats["error"] = repr(e)
+            if completa:
+                # Sin conexion no se reintenta la lectura completa en cada llamada, sino cada intervalo
+                self._completa = self._chequeo - self.max_edad + self.intervalo_chequeo
+            return
+        nuevas, registros = 0, []
+        for (hoja, tipo), rango in zip(self.hojas, respuesta.get("valueRanges", [])):
+            filas = rango.get("values", [])
+            if completa:
+                self._filas[hoja], self._anchos[hoja] = 1, 0
+            if not filas:
+                continue
+            ancho = max(self._anchos[hoja], max(len(f) for f in filas))
+            if ancho != self._anchos[hoja] and not completa and self._filas[hoja] > 1:
+                # La hoja gano columnas: se reparsea entera en la proxima lectura completa
+                self._completa = 0.0
+            registros += parsear_historial(tipo, filas, ancho)
+            self._filas[hoja] = desde[hoja] - 1 + len(filas)
+            self._anchos[hoja] = ancho
+            nuevas += len(filas)
+        if completa:
+            # Las de tipos que no van a ninguna hoja (Riesgos Varios) solo existen en memoria
+            tipos = {t for _, t in self.hojas}
+            self._almacen = AlmacenPropuestas(registros + [r for r in self._almacen if r.get("tipo") not in tipos])
+            self._completa = self._chequeo
+            self.stats["lecturas"] += 1
+        else:
+            # Las guardadas desde esta app ya estan en el almacen (mismo link, mismo id)
+            for r in registros:
+                self._almacen.agregar(r, unico=True)
+            self.stats["incrementales"] += 1
+        self.stats["filas_nuevas"] = nuevas
+        self.stats["ms_ultima"] = round((time.perf_counter() - t) * 1000, 1)
+        self.stats["ultima_actualizacion"] = datetime.now().strftime("%H:%M:%S")
+        self.stats["error"] = None
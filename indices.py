@@ -0,0 +1,165 @@
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+
+class IndicePolizas:
+    """N° de poliza ya cargados en "Respuestas de formulario 2", en un set compartido entre sesiones.
+
+    Se calienta con una lectura de la columna; despues lo que guarda la app se suma con
+    `agregar`, cada `intervalo_chequeo` segundos se piden solo las filas nuevas (las del
+    formulario de Google) y cada `max_edad` se relee entera para tomar ediciones y borrados.
+    """
+
+    def __init__(self, get_hoja, columna="H", intervalo_chequeo=60, max_edad=1800, medir=None):
+        self.get_hoja = get_hoja
+        self.columna = columna
+        self.intervalo_chequeo = intervalo_chequeo
+        self.max_edad = max_edad
+        self.medir = medir or (lambda op: nullcontext())
+        self._polizas = set()
+        self._filas = 1  # filas leidas, encabezado incluido
+        self._chequeo = 0.0
+        self._completa = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"lecturas": 0, "incrementales": 0, "polizas": 0, "ms_ultima": None, "error": None}
+
+    def __contains__(self, nro):
+        nro = str(nro).strip()
+        with self._lock:
+            self._al_dia()
+            return nro in self._polizas
+
+    def __len__(self):
+        return len(self._polizas)
+
+    def agregar(self, nros):
+        with self._lock:
+            self._polizas.update(n for n in (str(n).strip() for n in nros) if n)
+            self.stats["polizas"] = len(self._polizas)
+
+    def invalidar(self):
+        with self._lock:
+            self._completa = 0.0
+
+    def _al_dia(self):
+        ahora = time.time()
+        if ahora - self._completa > self.max_edad:
+            self._leer(completa=True)
+        elif ahora - self._chequeo > self.intervalo_chequeo:
+            self._leer(completa=False)
+
+    def _leer(self, completa):
+        t = time.perf_counter()
+        self._chequeo = time.time()
+        desde = 2 if completa else self._filas + 1
+        try:
+            with self.medir("indice_polizas.get"):
+                valores = self.get_hoja().get(f"{self.columna}{desde}:{self.columna}")
+        except Exception as e:
+            self.stats["error"] = repr(e)
+            if completa:
+                # Sin conexion no se reintenta la lectura completa en cada consulta, sino cada intervalo
+                self._completa = self._chequeo - self.max_edad + self.intervalo_chequeo
+            return
+        nros = {str(f[0]).strip() for f in valores if f and str(f[0]).strip()}
+        if completa:
+            self._polizas = nros
+            self._completa = self._chequeo
+            self.stats["lecturas"] += 1
+        else:
+            self._polizas |= nros
+            self.stats["incrementales"] += 1
+        # Las celdas vacias al final no vienen: en el peor caso se vuelven a leer esas filas
+        self._filas = desde - 1 + len(valores)
+        self.stats.update(polizas=len(self._polizas), ms_ultima=round((time.perf_counter() - t) * 1000, 1), error=None)
+
+
+class IndiceDrive:
+    """Archivos de la carpeta de polizas en Drive por md5Checksum, para reusar un PDF aunque lo hayan renombrado.
+
+    Se calienta listando la carpeta una vez (paginado); despues se suman las subidas de la app
+    con `agregar` y cada `intervalo_chequeo` se piden solo los archivos modificados desde la
+    ultima consulta: por modifiedTime y no createdTime, porque un archivo movido o copiado a la
+    carpeta conserva su fecha de creacion. Cada `max_edad` se lista todo de nuevo (para olvidar
+    los que mandaron a la papelera).
+    """
+
+    CAMPOS = "id, name, md5Checksum, webViewLink, createdTime, modifiedTime"
+
+    def __init__(self, get_drive, carpeta, intervalo_chequeo=60, max_edad=3600, medir=None):
+        self.get_drive = get_drive
+        self.carpeta = carpeta
+        self.intervalo_chequeo = intervalo_chequeo
+        self.max_edad = max_edad
+        self.medir = medir or (lambda op: nullcontext())
+        self._por_md5 = {}
+        self._desde = None  # modifiedTime (RFC 3339) de la ultima consulta
+        self._chequeo = 0.0
+        self._completa = 0.0
+        self._lock = threading.Lock()
+        self.stats = {"lecturas": 0, "incrementales": 0, "archivos": 0, "ms_ultima": None, "error": None}
+
+    def buscar(self, md5):
+        """El archivo ({id, name, webViewLink, ...}) con ese contenido, o None."""
+        with self._lock:
+            self._al_dia()
+            return self._por_md5.get(md5)
+
+    def agregar(self, archivo):
+        with self._lock:
+            if archivo.get("md5Checksum"):
+                self._por_md5.setdefault(archivo["md5Checksum"], archivo)
+            self.stats["archivos"] = len(self._por_md5)
+
+    def invalidar(self):
+        with self._lock:
+            self._completa = 0.0
+
+    def _al_dia(self):
+        ahora = time.time()
+        if ahora - self._completa > self.max_edad:
+            self._leer(completa=True)
+        elif ahora - self._chequeo > self.intervalo_chequeo:
+            self._leer(completa=False)
+
+    def _listar(self, query):
+        archivos, pagina = [], None
+        while True:
+            with self.medir("drive.files.list"):
+                respuesta = self.get_drive().files().list(
+                    q=query, fields=f"nextPageToken, files({self.CAMPOS})", pageSize=1000, pageToken=pagina,
+                    supportsAllDrives=True, includeItemsFromAllDrives=True, corpora="allDrives"
+                ).execute()
+            archivos += respuesta.get("files", [])
+            pagina = respuesta.get("nextPageToken")
+            if not pagina:
+                return archivos
+
+    def _leer(self, completa):
+        t = time.perf_counter()
+        self._chequeo = time.time()
+        # Un minuto de solapamiento por diferencias de reloj; los repetidos no cambian nada
+        desde = datetime.fromtimestamp(self._chequeo - 60, timezone.utc).strftime("%Y-%m-%dT%H:%M:%S")
+        query = f"'{self.carpeta}' in parents and trashed = false"
+        if not completa and self._desde:
+            query += f" and modifiedTime > '{self._desde}'"
+        try:
+            archivos = self._listar(query)
+        except Exception as e:
+            self.stats["error"] = repr(e)
+            if completa:
+                self._completa = self._chequeo - self.max_edad + self.intervalo_chequeo
+            return
+        if completa:
+            self._por_md5 = {}
+            self._completa = self._chequeo
+            self.stats["lecturas"] += 1
+        else:
+            self.stats["incrementales"] += 1
+        for archivo in archivos:
+            if archivo.get("md5Checksum"):
+                self._por_md5.setdefault(archivo["md5Checksum"], archivo)
+        self._desde = desde
+        self.stats.update(archivos=len(self._por_md5), ms_ultima=round((time.perf_counter() - t) * 1000, 1), error=None)
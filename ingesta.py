@@ -0,0 +1,403 @@
+import base64
+import hashlib
+import itertools
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from preproceso_pdf import preparar
+
+# Si la extraccion sobre el texto o las primeras paginas no los trae, se repite con el PDF entero
+CAMPOS_CLAVE = ("asegurado", "nro_poliza")
+CAMPOS_POLIZA = ["asegurado", "documento", "mail", "celular", "aseguradora", "ramo", "nro_poliza", "detalle",
+                 "inicio_vigencia", "fin_vigencia", "moneda", "premio_usd", "premio_uyu"]
+# Columnas de la grilla de revision; corredor, ejecutivo, agente y notas no salen del PDF, los completa el asesor
+COLUMNAS_REVISION = {
+    "asegurado": "Asegurado", "documento": "Documento", "mail": "Mail", "celular": "Celular", "aseguradora": "Aseguradora",
+    "ramo": "Ramo", "nro_poliza": "N° de Póliza", "detalle": "Detalle (Matrícula o Referencia)", "inicio_vigencia": "Inicio de Vigencia",
+    "fin_vigencia": "Fin de Vigencia", "premio_usd": "Premio USD", "premio_uyu": "Premio UYU",
+    "corredor": "Corredor", "ejecutivo": "Ejecutivo", "agente": "Agente", "notas": "Notas",
+}
+
+PROMPT_EXTRACCION = """Extraé los datos de esta póliza de seguros uruguaya y respondé estrictamente en formato JSON con estos campos exactos:
+- asegurado (nombre o razón social del titular)
+- documento (RUT, cédula u otro número de identificación)
+- mail
+- celular
+- aseguradora (BSE, SURA, SBI, MAPFRE, SANCOR, BERKLEY, PORTO, BARBUSS, etc.)
+- ramo (tipo de seguro: VEHÍCULO, HOGAR, EMPRESA, RC, TRANSPORTE, etc.)
+- nro_poliza
+- detalle (matrícula del vehículo, o referencia del bien asegurado)
+- inicio_vigencia (formato DD/MM/YYYY)
+- fin_vigencia (formato DD/MM/YYYY)
+- moneda (USD o UYU)
+- premio_usd (solo el número, sin símbolos, si el premio está en dólares)
+- premio_uyu (solo el número, sin símbolos, si el premio está en pesos)
+
+Reglas:
+- Si un dato no aparece en la póliza, poné null.
+- Para los premios: poné el valor en el campo de su moneda y null en el otro.
+- Respondé ÚNICAMENTE con el objeto JSON. Sin introducciones, sin comentarios, sin delimitadores markdown. Empezá con { y terminá con }."""
+
+
+def parsear_respuesta(texto):
+    """JSON de la respuesta del modelo, tolerando los ```json que a veces agrega."""
+    texto = texto.strip().replace("```json", "").replace("```", "").strip()
+    return json.loads(texto)
+
+
+# Columna del link al PDF en "Respuestas de formulario 2" (1 = A), la 17 de fila_poliza
+COL_LINK_PDF = 17
+
+
+def fila_poliza(datos, link_pdf="", fecha=None):
+    """Fila de "Respuestas de formulario 2" (mismo orden de columnas que el formulario)."""
+    v = lambda campo: "" if datos.get(campo) is None else str(datos.get(campo))
+    return [
+        fecha or datetime.now().strftime("%d/%m/%Y %H:%M:%S"),
+        v("mail"), v("asegurado"), v("documento"), v("celular"), v("aseguradora"), v("ramo"), v("nro_poliza"),
+        v("detalle"), v("inicio_vigencia"), v("fin_vigencia"), v("corredor"), v("ejecutivo"), v("agente"),
+        v("premio_usd"), v("premio_uyu"), link_pdf, v("notas"), "",
+    ]
+
+
+def huella_extraccion(modelo, prompt=PROMPT_EXTRACCION):
+    """Hash corto del modelo y el prompt: si cambia cualquiera de los dos, las extracciones en cache no se reusan."""
+    return hashlib.sha256(f"{modelo}\n{prompt}".encode()).hexdigest()[:16]
+
+
+def clave_extraccion(pdf, huella):
+    """SHA-256 del PDF mas la huella del extractor: el mismo archivo con el mismo modelo y prompt da la misma extraccion."""
+    return f"{hashlib.sha256(pdf).hexdigest()}:{huella}"
+
+
+def bytes_envio(envio):
+    """Tamaño de lo que viaja al modelo: el texto, o el PDF en base64."""
+    if envio.get("texto") is not None:
+        return len(envio["texto"].encode("utf-8"))
+    return 4 * ((len(envio["pdf"]) + 2) // 3) if envio.get("pdf") else 0
+
+
+def separar_repetidas(polizas, existentes):
+    """(nuevas, repetidas) segun el N° de poliza, contra las que ya estan en el Sheet y dentro del mismo lote.
+
+    `existentes` es cualquier contenedor de N° de poliza (un set, o `indices.IndicePolizas`).
+    """
+    vistas = set()
+    nuevas, repetidas = [], []
+    for d in polizas:
+        nro = str(d.get("nro_poliza") or "").strip()
+        if nro and (nro in vistas or nro in existentes):
+            repetidas.append(d)
+        else:
+            nuevas.append(d)
+            if nro: vistas.add(nro)
+    return nuevas, repetidas
+
+
+# ==========================================
+# EXTRACTORES (BACKEND DEL MODELO)
+# ==========================================
+class ExtractorAnthropic:
+    """Extraccion con la API de Anthropic: el PDF va como documento y vuelve el JSON de la poliza."""
+
+    def __init__(self, api_key, modelo="claude-sonnet-4-6", max_tokens=1024, prompt=PROMPT_EXTRACCION):
+        import anthropic
+        # Un cliente por proceso: es thread-safe y reusa las conexiones
+        self.cliente = anthropic.Anthropic(api_key=api_key)
+        self.modelo = modelo
+        self.max_tokens = max_tokens
+        self.prompt = prompt
+        self.huella = huella_extraccion(modelo, prompt)
+
+    def extraer(self, pdf, nombre="", texto=None):
+        # Con `texto` (la capa de texto de las paginas relevantes) no se manda el PDF
+        if texto is not None:
+            documento = {"type": "text", "text": f"<poliza>\n{texto}\n</poliza>"}
+        else:
+            documento = {"type": "document", "source": {"type": "base64", "media_type": "application/pdf", "data": base64.standard_b64encode(pdf).decode("utf-8")}}
+        respuesta = self.cliente.messages.create(
+            model=self.modelo,
+            max_tokens=self.max_tokens,
+            messages=[{
+                "role": "user",
+                "content": [documento, {"type": "text", "text": self.prompt}]
+            }]
+        )
+        return parsear_respuesta(respuesta.content[0].text)
+
+
+class ExtractorFalso:
+    """Backend local para pruebas: devuelve datos armados a partir del nombre del archivo.
+
+    `demora` simula la latencia del modelo (mas `demora_por_mb` por MB enviado); los nombres en
+    `fallan` levantan excepcion.
+    """
+
+    def __init__(self, demora=0.0, fallan=(), respuestas=None, demora_por_mb=0.0):
+        self.demora = demora
+        self.demora_por_mb = demora_por_mb
+        self.fallan = set(fallan)
+        self.respuestas = respuestas or {}
+        self.llamadas = 0
+        self.huella = huella_extraccion("falso")
+        self._lock = threading.Lock()
+
+    def extraer(self, pdf, nombre="", texto=None):
+        with self._lock:
+            self.llamadas += 1
+        time.sleep(self.demora + self.demora_por_mb * bytes_envio({"pdf": pdf, "texto": texto}) / 1e6)
+        if nombre in self.fallan:
+            raise RuntimeError(f"fallo simulado en {nombre}")
+        if nombre in self.respuestas:
+            return dict(self.respuestas[nombre])
+        base = nombre.rsplit(".", 1)[0]
+        return {**{c: None for c in CAMPOS_POLIZA}, "asegurado": base.upper(), "nro_poliza": str(abs(hash(base)) % 10_000_000),
+                "aseguradora": "BSE", "ramo": "VEHÍCULO", "moneda": "USD", "premio_usd": len(pdf or texto) % 2000}
+
+
+# ==========================================
+# CACHE DE EXTRACCIONES
+# ==========================================
+class CacheExtracciones:
+    """Extracciones ya hechas, en SQLite para que sobrevivan a reinicios, por `clave_extraccion`.
+
+    Acotada por cantidad y por tamaño total: al pasarse se descartan las menos usadas
+    recientemente. Solo se guardan extracciones que salieron bien.
+    """
+
+    def __init__(self, ruta=".cache/extracciones.db", max_entradas=5000, max_bytes=50_000_000):
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS extracciones (clave TEXT PRIMARY KEY, datos TEXT NOT NULL, nombre TEXT, usado REAL NOT NULL)")
+        self.stats = {"aciertos": 0, "fallos": 0, "guardadas": 0, "descartadas": 0}
+
+    def obtener(self, clave):
+        with self._lock:
+            fila = self._db.execute("SELECT datos FROM extracciones WHERE clave = ?", (clave,)).fetchone()
+            if fila is None:
+                self.stats["fallos"] += 1
+                return None
+            self._db.execute("UPDATE extracciones SET usado = ? WHERE clave = ?", (time.time(), clave))
+            self.stats["aciertos"] += 1
+        return json.loads(fila[0])
+
+    def guardar(self, clave, datos, nombre=""):
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO extracciones VALUES (?, ?, ?, ?)", (clave, json.dumps(datos, ensure_ascii=False), nombre, time.time()))
+            self.stats["guardadas"] += 1
+            self._podar()
+
+    def _podar(self):
+        n, total = self._db.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(datos)), 0) FROM extracciones").fetchone()
+        if n <= self.max_entradas and total <= self.max_bytes:
+            return
+        sobran, sobra_bytes, borrar = n - self.max_entradas, total - self.max_bytes, []
+        for clave, largo in self._db.execute("SELECT clave, LENGTH(datos) FROM extracciones ORDER BY usado"):
+            if sobran <= 0 and sobra_bytes <= 0:
+                break
+            borrar.append((clave,))
+            sobran, sobra_bytes = sobran - 1, sobra_bytes - largo
+        self._db.executemany("DELETE FROM extracciones WHERE clave = ?", borrar)
+        self.stats["descartadas"] += len(borrar)
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM extracciones").fetchone()[0]
+
+    def vaciar(self):
+        with self._lock:
+            self._db.execute("DELETE FROM extracciones")
+
+
+# ==========================================
+# PIPELINE DE INGESTA
+# ==========================================
+class LimiteTasa:
+    """Limite de pedidos por minuto compartido entre hilos (cubeta de fichas: hasta `rafaga` seguidos)."""
+
+    def __init__(self, por_minuto, rafaga=1):
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self.rafaga = max(1, rafaga)
+        self._fichas = float(self.rafaga)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._fichas = min(self.rafaga, self._fichas + (ahora - self._ultimo) / self.intervalo)
+                self._ultimo = ahora
+                if self._fichas >= 1:
+                    self._fichas -= 1
+                    return
+                falta = (1 - self._fichas) * self.intervalo
+            time.sleep(falta)
+
+
+class LoteIngesta:
+    """Los PDFs de un envio, en el orden en que se subieron, con el estado de cada extraccion."""
+
+    def __init__(self, id_lote, archivos):
+        self.id = id_lote
+        self.items = [{"nombre": nombre, "pdf": pdf, "estado": "en cola", "datos": None, "error": None, "ms": None, "cache": False,
+                       "via": None, "bytes_enviados": None} for nombre, pdf in archivos]
+        self._futuros = {}
+
+    def __len__(self):
+        return len(self.items)
+
+    def terminados(self):
+        return sum(it["estado"] in ("listo", "error") for it in self.items)
+
+    def completo(self):
+        return self.terminados() == len(self.items)
+
+    def a_medida_que_terminan(self, timeout=None):
+        """Indices de los items a medida que su extraccion termina (bien o con error)."""
+        pendientes = [f for f in self._futuros if not f.done()]
+        for futuro in as_completed(pendientes, timeout=timeout):
+            yield self._futuros[futuro]
+
+    def estado(self):
+        """Una fila por PDF para la grilla de progreso."""
+        return [{"Archivo": it["nombre"], "Estado": it["estado"], "Asegurado": (it["datos"] or {}).get("asegurado") or "",
+                 "N° de Póliza": (it["datos"] or {}).get("nro_poliza") or "", "Segundos": round(it["ms"] / 1000, 1) if it["ms"] is not None else None,
+                 "Vía": it["via"] or "", "KB enviados": round(it["bytes_enviados"] / 1024, 1) if it["bytes_enviados"] is not None else None,
+                 "Cache": it["cache"], "Error": it["error"] or ""} for it in self.items]
+
+    def desde_cache(self):
+        return sum(it["cache"] for it in self.items)
+
+    def listos(self):
+        return [i for i, it in enumerate(self.items) if it["estado"] == "listo"]
+
+    def con_error(self):
+        return [i for i, it in enumerate(self.items) if it["estado"] == "error"]
+
+    def revision(self):
+        """Filas para la grilla de revision: las extracciones que salieron bien, aprobadas por defecto.
+
+        "Item" es la posicion en `items` (columna oculta en la grilla): dos PDF pueden llamarse igual.
+        """
+        texto = lambda v: "" if v is None else str(v)
+        return [{"Guardar": True, "Item": i, "Archivo": self.items[i]["nombre"], **{c: texto(self.items[i]["datos"].get(c)) for c in COLUMNAS_REVISION}}
+                for i in self.listos()]
+
+
+class IngestaPolizas:
+    """Extraccion concurrente de muchos PDFs con un pool acotado y limite de pedidos por minuto.
+
+    `extractor` es cualquier objeto con `extraer(pdf_bytes, nombre) -> dict` (la API real o
+    `ExtractorFalso`). El pool y el limite se comparten entre todos los lotes: el limite es de
+    la API key, no de cada asesor. Los errores transitorios se reintentan con backoff; una
+    respuesta que no es JSON no (el modelo contestaria lo mismo). Con `cache`, un PDF ya
+    extraido con el mismo modelo y prompt sale listo al encolarlo, sin pasar por el pool ni el limite.
+    Con `preprocesar`, cada PDF pasa antes por `preproceso_pdf.preparar` (via rapida por regex,
+    solo texto o solo las primeras paginas) y se manda entero solo si hace falta.
+    """
+
+    def __init__(self, extractor, max_hilos=4, por_minuto=40, reintentos=2, backoff=2.0, cache=None, preprocesar=True):
+        self.extractor = extractor
+        # Extractores sin `huella` propia se distinguen por su clase
+        self.huella = getattr(extractor, "huella", None) or huella_extraccion(type(extractor).__name__)
+        self.cache = cache
+        self.preprocesar = preprocesar
+        self.limite = LimiteTasa(por_minuto, rafaga=max_hilos)
+        self.reintentos = reintentos
+        self.backoff = backoff
+        self._pool = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="ingesta-pdf")
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.stats = {"pdfs": 0, "ok": 0, "errores": 0, "reintentos": 0, "regex": 0, "respaldos": 0, "bytes_enviados": 0, "bytes_documento": 0}
+
+    def _sumar(self, **cuantos):
+        # Los hilos del pool actualizan las mismas claves: `+=` sobre el dict no es atomico
+        with self._lock:
+            for clave, n in cuantos.items():
+                self.stats[clave] += n
+
+    def procesar(self, archivos, usar_cache=True):
+        """Encola `archivos` ([(nombre, bytes)]) y vuelve enseguida con el lote.
+
+        Con `usar_cache=False` se vuelven a extraer todos (y el resultado reemplaza al de la cache).
+        """
+        lote = LoteIngesta(next(self._ids), archivos)
+        for i, item in enumerate(lote.items):
+            if self.cache is not None:
+                item["clave"] = clave_extraccion(item["pdf"], self.huella)
+                datos = self.cache.obtener(item["clave"]) if usar_cache else None
+                if datos is not None:
+                    item.update(datos=datos, estado="listo", ms=0, cache=True)
+                    continue
+            lote._futuros[self._pool.submit(self._extraer, item)] = i
+        self._sumar(pdfs=len(archivos))
+        return lote
+
+    def reintentar(self, lote, indices):
+        for i in indices:
+            lote.items[i].update(estado="en cola", error=None, bytes_enviados=None)
+            lote._futuros[self._pool.submit(self._extraer, lote.items[i])] = i
+
+    def _extraer(self, item):
+        self._extraer_modelo(item)
+        # Lo de la via rapida no se guarda: la clave es del modelo y el prompt, no de los patrones de preproceso_pdf
+        if item["estado"] == "listo" and item["via"] != "regex" and self.cache is not None:
+            self.cache.guardar(item["clave"], item["datos"], item["nombre"])
+
+    def _extraer_modelo(self, item):
+        inicio = time.perf_counter()
+        envio = preparar(item["pdf"]) if self.preprocesar else {"via": "documento", "pdf": item["pdf"]}
+        self._sumar(bytes_documento=bytes_envio({"pdf": item["pdf"]}))
+        if envio["via"] == "regex":
+            item.update(datos=envio["datos"], via="regex", bytes_enviados=0)
+            self._sumar(regex=1)
+            datos = envio["datos"]
+        else:
+            datos = self._llamar(item, envio)
+            if datos is not None and envio["via"] != "documento" and not all(datos.get(c) for c in CAMPOS_CLAVE):
+                # Con el texto o las primeras paginas no alcanzo: se manda el PDF entero
+                self._sumar(respaldos=1)
+                datos = self._llamar(item, {"via": "documento", "pdf": item["pdf"]}) or datos
+        item["ms"] = (time.perf_counter() - inicio) * 1000
+        if datos is None:
+            item["estado"] = "error"
+            self._sumar(errores=1)
+            return
+        item.update(datos=datos, estado="listo")
+        self._sumar(ok=1)
+
+    def _llamar(self, item, envio):
+        """Una llamada al modelo con limite y reintentos; None (con el motivo en item["error"]) si no salio."""
+        item["via"] = envio["via"]
+        item["bytes_enviados"] = (item["bytes_enviados"] or 0) + bytes_envio(envio)
+        self._sumar(bytes_enviados=bytes_envio(envio))
+        for intento in range(self.reintentos + 1):
+            self.limite.esperar()
+            item["estado"] = "procesando"
+            try:
+                datos = self.extractor.extraer(envio.get("pdf"), item["nombre"], texto=envio.get("texto"))
+                item["error"] = None
+                return datos
+            except ValueError as e:
+                # JSON invalido (json.JSONDecodeError es ValueError): reintentar no cambia nada
+                item["error"] = f"respuesta ilegible: {e}"
+                break
+            except Exception as e:
+                item["error"] = repr(e)
+                if intento < self.reintentos:
+                    self._sumar(reintentos=1)
+                    item["estado"] = "reintentando"
+                    time.sleep(self.backoff * 2 ** intento)
+        return None
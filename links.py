@@ -0,0 +1,187 @@
+import base64
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import nullcontext
+from datetime import datetime
+
+LIMITE_CELDA = 50_000  # caracteres por celda en Google Sheets
+PARTE_CELDA = 49_000
+MAX_COLUMNAS_LINKS = 26  # ancho de la hoja de links (A:Z): id, propuesta, fecha y hasta 23 partes mas
+
+
+def texto_canonico(propuesta):
+    """JSON estable de la propuesta: mismo contenido, mismo texto, mismo id."""
+    return json.dumps(propuesta, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def id_de(texto, largo=8):
+    return base64.urlsafe_b64encode(hashlib.sha256(texto.encode()).digest()).decode()[:largo]
+
+
+# ==========================================
+# ALMACEN DE LINKS CORTOS (?p=)
+# ==========================================
+class AlmacenLinks:
+    """Propuestas por id de contenido, con LRU de propuestas ya decodificadas.
+
+    Las subclases guardan el texto en algun lado (`_leer`, `_escribir`, `_ids`). Si dos
+    propuestas distintas chocan en el prefijo del hash, la nueva se lleva un id mas largo.
+    """
+
+    def __init__(self, max_cache=256):
+        self.max_cache = max_cache
+        self._cache = OrderedDict()
+        self._conocidos = None
+        self._lock = threading.RLock()
+        self.stats = {"hits": 0, "lecturas": 0, "guardadas": 0, "repetidas": 0}
+
+    def _recordar(self, pid, propuesta):
+        self._cache[pid] = propuesta
+        self._cache.move_to_end(pid)
+        while len(self._cache) > self.max_cache:
+            self._cache.popitem(last=False)
+
+    def guardar(self, propuesta):
+        """Id corto de la propuesta; si ya existia una identica no se vuelve a guardar."""
+        texto = texto_canonico(propuesta)
+        with self._lock:
+            if self._conocidos is None:
+                self._conocidos = set(self._ids())
+            for largo in range(8, 44, 4):
+                pid = id_de(texto, largo)
+                if pid not in self._conocidos:
+                    self._escribir(pid, texto)
+                    self._conocidos.add(pid)
+                    self.stats["guardadas"] += 1
+                    break
+                if self._leer(pid) == texto:
+                    self.stats["repetidas"] += 1
+                    break
+            self._recordar(pid, json.loads(texto))
+            return pid
+
+    def obtener(self, pid):
+        """La propuesta decodificada, o None si el id no existe."""
+        with self._lock:
+            if pid in self._cache:
+                self._cache.move_to_end(pid)
+                self.stats["hits"] += 1
+                return self._cache[pid]
+        texto = self._leer(pid)
+        if texto is None:
+            return None
+        propuesta = json.loads(texto)
+        with self._lock:
+            self.stats["lecturas"] += 1
+            self._recordar(pid, propuesta)
+        return propuesta
+
+    def _ids(self):
+        raise NotImplementedError
+
+    def _leer(self, pid):
+        raise NotImplementedError
+
+    def _escribir(self, pid, texto):
+        raise NotImplementedError
+
+
+class LinksSQLite(AlmacenLinks):
+    """Backend local (desarrollo y pruebas): una tabla id -> texto en un archivo SQLite."""
+
+    def __init__(self, ruta=".cache/links.db", max_cache=256):
+        super().__init__(max_cache)
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS links (id TEXT PRIMARY KEY, propuesta TEXT NOT NULL, creado TEXT)")
+
+    def _ids(self):
+        with self._lock:
+            return [pid for (pid,) in self._db.execute("SELECT id FROM links")]
+
+    def _leer(self, pid):
+        with self._lock:
+            fila = self._db.execute("SELECT propuesta FROM links WHERE id = ?", (pid,)).fetchone()
+        return fila[0] if fila else None
+
+    def _escribir(self, pid, texto):
+        with self._lock:
+            self._db.execute("INSERT OR IGNORE INTO links VALUES (?, ?, ?)", (pid, texto, datetime.now().isoformat(timespec="seconds")))
+
+
+class LinksSheet(AlmacenLinks):
+    """Backend en una hoja del Sheet (id | propuesta | fecha), compartido por todas las instancias.
+
+    Las altas se escriben en el momento, para que otra instancia pueda abrir el link apenas se
+    comparte. Si el append falla y hay `encolar(hoja, fila)`, la fila sale por la cola de
+    escritura: hasta que se envie, el link solo lo resuelve este proceso (desde su LRU).
+    Para leer se ubica la fila con la columna A (id -> fila) y se trae solo esa fila. La pagina
+    del cliente es publica: un id desconocido relee la columna A a lo sumo cada `intervalo_ids`
+    segundos, asi que ids inventados no multiplican las lecturas (un link recien creado en otra
+    instancia puede tardar ese intervalo en abrirse aca). Una propuesta de mas de `LIMITE_CELDA`
+    caracteres se parte en columnas despues de la fecha.
+    """
+
+    def __init__(self, get_hoja, hoja_nombre="Links Propuestas", encolar=None, medir=None, max_cache=256, intervalo_ids=10):
+        super().__init__(max_cache)
+        self.get_hoja = get_hoja
+        self.hoja_nombre = hoja_nombre
+        self.encolar = encolar
+        self.medir = medir or (lambda op: nullcontext())
+        self.intervalo_ids = intervalo_ids
+        self.stats["desconocidos"] = 0
+        self._filas = {}
+        self._leidos = None  # time.monotonic() de la ultima lectura de la columna A
+
+    def _ids(self):
+        with self.medir("links.col_values"):
+            ids = self.get_hoja().col_values(1)[1:]
+        with self._lock:
+            self._filas = {pid: n for n, pid in enumerate(ids, start=2)}
+            self._leidos = time.monotonic()
+        return ids
+
+    def _leer(self, pid):
+        if pid not in self._filas:
+            if self._leidos is not None and time.monotonic() - self._leidos < self.intervalo_ids:
+                with self._lock:
+                    self.stats["desconocidos"] += 1
+                return None
+            self._ids()
+        for _ in range(2):
+            fila = self._filas.get(pid)
+            if fila is None:
+                return None
+            with self.medir("links.row_values"):
+                valores = self.get_hoja().row_values(fila)
+            if valores and valores[0] == pid:
+                return valores[1] + "".join(valores[3:]) if len(valores) > 1 else None
+            # Borraron o movieron filas desde la ultima lectura de la columna
+            self._ids()
+        return None
+
+    def _escribir(self, pid, texto):
+        partes = [texto[i:i + PARTE_CELDA] for i in range(0, len(texto), PARTE_CELDA)]
+        if len(partes) > MAX_COLUMNAS_LINKS - 2:
+            raise ValueError(f"la propuesta ocupa {len(texto):,} caracteres y un link corto admite hasta "
+                             f"{PARTE_CELDA * (MAX_COLUMNAS_LINKS - 2):,}")
+        # El apostrofe evita que un id como "12345678" o "-3e5" (o una parte como "=...") se tome como numero o formula
+        fila = ["'" + pid, partes[0], datetime.now().strftime("%d/%m/%Y %H:%M"), *("'" + p for p in partes[1:])]
+        try:
+            with self.medir("links.append_row"):
+                respuesta = self.get_hoja().append_row(fila, value_input_option="USER_ENTERED")
+        except Exception:
+            if self.encolar is None:
+                raise
+            self.encolar(self.hoja_nombre, fila)
+            return
+        rango = re.search(r"!A(\d+)", ((respuesta or {}).get("updates") or {}).get("updatedRange", ""))
+        if rango:
+            self._filas[pid] = int(rango.group(1))
@@ -0,0 +1,59 @@
+# Textos y tablas por defecto de las propuestas (tambien los usa el codec de links)
+
+# ==========================================
+# VEHICULOS Y FLOTAS
+# ==========================================
+txt_ben_veh = "• Auxilio mecanico e ilimitado\n• Cobertura Mercosur\n• Cristales: USD 300 SANCOR, USD 200 BSE O SBI, USD 100 SURA, demas cobran deducible\n• Granizo: SANCOR incluido sin deducible, demas aplican deducible."
+txt_hog_veh = "• Incendio Edificio USD 100.000\n• Incendio Contenido 50.000\n• Hurto Contenido 5.000\n• Costo anual Casas: USD 180\n• Costo anual Aptos: USD 120"
+txt_alq_veh = "• Auto de alquiler por hasta 15 días en caso de que sufras un siniestro con tu vehículo asegurado.\n• Costo anual: UYU 3.300 por vehiculo."
+txt_bic_veh = "• Cobertura Hurto bicicleta hasta USD 1.000.\n• Costo anual: USD 120"
+txt_obs_flota = "Vigencia:\nForma de Pago: redes de cobranza o tarjeta de credito en 10 cuotas sin recargo.\nBeneficios\n  - Auxilio mecanico ilimitado.\n  - Cristales: SANCOR USD 300, BSE y SBI USD 200, SURA USD 100.\n  - Granizo: SANCOR lo cubre, demas cobran deducible."
+txt_acc_flota = "• Seguro de Vida Accidentes choferes: USD 25.000.\n• Costo anual: UYU 1.900 por chofer."
+txt_alq_flota = "• Auto de alquiler por hasta 15 días en caso de que sufras un siniestro con tu vehículo asegurado.\n• Costo anual: UYU 3.300 por vehiculo."
+txt_bic_flota = "• Bici electrica o moto hasta USD 1.000.\n• Costo anual: UYU 5.000"
+
+
+# ==========================================
+# RIESGOS VARIOS (TODO RIESGO OPERATIVO)
+# ==========================================
+COBERTURAS_RV = [
+    {"Cobertura": "Edificios", "Capital (USD)": 0},
+    {"Cobertura": "Contenido General", "Capital (USD)": 0},
+    {"Cobertura": "Mercaderías", "Capital (USD)": 0},
+    {"Cobertura": "Perdida de Beneficio (12 meses de cobertura)", "Capital (USD)": 0},
+]
+
+SUBLIMITES_RV = [
+    {"Cobertura": "Huracán, vendaval y tornado", "Capital (USD)": "Incluido", "Deducible": "General"},
+    {"Cobertura": "Terremoto o Temblor", "Capital (USD)": "Incluido", "Deducible": "General"},
+    {"Cobertura": "Granizo", "Capital (USD)": "Incluido", "Deducible": "General"},
+    {"Cobertura": "Daños Materiales e Incendio por Tumultos Populares", "Capital (USD)": "Incluido", "Deducible": "General"},
+    {"Cobertura": "Cláusula de 72 horas por Ocurrencia", "Capital (USD)": "Incluido", "Deducible": "1 deducible"},
+    {"Cobertura": "Cristales", "Capital (USD)": "5000", "Deducible": "150"},
+    {"Cobertura": "Gastos de Limpieza y Remoción De Escombros", "Capital (USD)": "900000", "Deducible": "No aplica"},
+    {"Cobertura": "Hurto y/o Rapiña: Contenido General, Mercaderías, existencias.", "Capital (USD)": "200000", "Deducible": "1000"},
+    {"Cobertura": "Daños por agua e inundación", "Capital (USD)": "150000", "Deducible": "10% stro, mín USD 2.000"},
+    {"Cobertura": "Inclusión Automática De Bienes (60 días)", "Capital (USD)": "200000", "Deducible": "No aplica"},
+    {"Cobertura": "Honorarios Profesionales", "Capital (USD)": "50000", "Deducible": "No aplica"},
+    {"Cobertura": "Gastos Extraordinarios", "Capital (USD)": "100000", "Deducible": "10% stro, max USD 35.000"},
+    {"Cobertura": "Gastos De Extinción De Incendio", "Capital (USD)": "100000", "Deducible": "No aplica"},
+    {"Cobertura": "Costo De Reconstrucción De Documentos", "Capital (USD)": "40000", "Deducible": "No aplica"},
+    {"Cobertura": "Daños Eléctricos Equipos Electrónicos", "Capital (USD)": "50000", "Deducible": "10% stro, mín USD 2.000"},
+    {"Cobertura": "Objetos Personales", "Capital (USD)": "50000", "Deducible": "1000"},
+    {"Cobertura": "Bienes bajo cuidado, custodia y control", "Capital (USD)": "100000", "Deducible": "1000"},
+    {"Cobertura": "Daños por granizo - Vehículos y Maquinaria a la Intemperie", "Capital (USD)": "0", "Deducible": "5% Stro, mínimo USD 5.000"},
+    {"Cobertura": "Infidelidad de Dependientes", "Capital (USD)": "20000", "Deducible": "1000"},
+    {"Cobertura": "Valores en Caja y/o Tránsito", "Capital (USD)": "20000", "Deducible": "1000"},
+    {"Cobertura": "Bienes en proceso de Construcción y Montaje", "Capital (USD)": "100000", "Deducible": "5% Stro, mínimo USD 1.000"},
+    {"Cobertura": "Gastos de Alquiler - Periodo máximo: 6 meses", "Capital (USD)": "100000", "Deducible": "No aplica"},
+    {"Cobertura": "Gastos Extras (fletes, horas extras, trabajos nocturnos)", "Capital (USD)": "100000", "Deducible": "No aplica"},
+    {"Cobertura": "Gastos de Flete", "Capital (USD)": "100000", "Deducible": "No aplica"},
+    {"Cobertura": "Rotura de Maquinaria", "Capital (USD)": "100000", "Deducible": "10% del Stro, mín USD 2.000"},
+    {"Cobertura": "Mercaderías propias en Depósitos", "Capital (USD)": "100000", "Deducible": "2000"},
+    {"Cobertura": "Falta de Frío", "Capital (USD)": "50000", "Deducible": "5% Stro, mínimo USD 5.000"},
+    {"Cobertura": "No Aplica Infraseguros, Siniestros menores a:", "Capital (USD)": "200000", "Deducible": "General"},
+]
+
+txt_aclaraciones_rv = "1) Se incluye cobertura de Granizo"
+txt_ubicaciones_rv = "1)\n2)\n3)"
+txt_equipos_rv = "1)\n2)\n3)"
@@ -0,0 +1,174 @@
+import re
+
+MAX_PAGINAS = 3
+MIN_TEXTO = 200  # caracteres utiles en todo el PDF por debajo de los cuales no hay capa de texto (escaneado)
+
+# Paginas donde estan los datos de la poliza: frente, condiciones particulares, resumen de premio
+PATRON_RELEVANTE = re.compile(
+    r"\b(?:p[oó]liza|asegurad[oa]|tomador|vigencia|desde|hasta|premio|prima|total a pagar|R\.?U\.?T|c[eé]dula|matr[ií]cula)\b",
+    re.IGNORECASE)
+# Mismo formato que cartera.PATRON_MATRICULA (aca sin pandas)
+PATRON_MATRICULA = r"\b[A-Z]{3}[ -]?\d{4}\b"
+FECHA = r"(\d{1,2}/\d{1,2}/\d{4})"
+MONTO = r"(U\$S|US\$|USD|\$U|\$|UYU)?\s*(\d[\d.,]*\d|\d)"
+NRO = r"([\w/-]*\d[\w/-]*)"
+
+# Via rapida: rotulos de la primera hoja de cada aseguradora. Si falta un dato clave se usa el modelo.
+ASEGURADORAS = {
+    "BSE": r"BANCO DE SEGUROS DEL ESTADO|\bBSE\b",
+    "SURA": r"\bSURA\b",
+    "MAPFRE": r"\bMAPFRE\b",
+    "SANCOR": r"\bSANCOR\b",
+}
+PATRONES_ASEGURADORA = {
+    "BSE": {
+        "nro_poliza": rf"P[oó]liza\s*N[°º.o]*\s*:?\s*{NRO}",
+        "asegurado": r"Asegurado\s*:\s*([^\n]+)",
+        "vigencia": rf"Vigencia\s*:?\s*desde\s+el\s+{FECHA}\s+hasta\s+el\s+{FECHA}",
+        "premio": rf"Premio\s+Total\s*:?\s*{MONTO}",
+    },
+    "SURA": {
+        "nro_poliza": rf"N[uú]mero\s+de\s+p[oó]liza\s*:?\s*{NRO}",
+        "asegurado": r"(?:Tomador\s*/\s*)?Asegurado\s*:\s*([^\n]+)",
+        "vigencia": rf"Vigencia\s+desde\s*:?\s*{FECHA}\s+hasta\s*:?\s*{FECHA}",
+        "premio": rf"Premio\s+total\s*:?\s*{MONTO}",
+    },
+    "MAPFRE": {
+        "nro_poliza": rf"P[OÓ]LIZA\s+(?:NRO|N[°º])\.?\s*:?\s*{NRO}",
+        "asegurado": r"ASEGURADO\s*:?\s*([^\n]+)",
+        "vigencia": rf"VIGENCIA\s+DEL\s+{FECHA}\s+AL\s+{FECHA}",
+        "premio": rf"PREMIO\s+TOTAL\s*:?\s*{MONTO}",
+    },
+    "SANCOR": {
+        "nro_poliza": rf"P[oó]liza\s*:?\s*{NRO}",
+        "asegurado": r"Asegurado\s*:\s*([^\n]+)",
+        "vigencia": rf"[Dd]esde\s+las\s+\d+\s*hs\.?\s+del\s+{FECHA}\s+hasta\s+las\s+\d+\s*hs\.?\s+del\s+{FECHA}",
+        "premio": rf"Premio\s*:?\s*{MONTO}",
+    },
+}
+PATRONES_COMUNES = {
+    "documento": r"(?:\bR\.?U\.?T\.?|\bC\.?I\.?|C[eé]dula)\s*(?:N[°º.o]*)?\s*:?\s*(\d[\d.\-]{6,14}\d)",
+    "mail": r"[\w.+-]+@[\w-]+\.[\w.]+",
+    "celular": r"\b(09\d\s?\d{3}\s?\d{3})\b",
+}
+
+
+def texto_paginas(pdf):
+    """Texto de cada pagina, o [] si no hay pypdf o el PDF no se puede leer (encriptado, roto)."""
+    if b"%PDF" not in pdf[:1024]:
+        return []
+    try:
+        from io import BytesIO
+        from pypdf import PdfReader
+        return [p.extract_text() or "" for p in PdfReader(BytesIO(pdf)).pages]
+    except Exception:
+        return []
+
+
+def _util(texto):
+    return sum(c.isalnum() for c in texto)
+
+
+def paginas_relevantes(textos, max_paginas=MAX_PAGINAS):
+    """Indices (en orden) de las paginas con mas rotulos de poliza; la primera va siempre."""
+    puntaje = [len(PATRON_RELEVANTE.findall(t)) for t in textos]
+    mejores = sorted(range(1, len(textos)), key=lambda i: -puntaje[i])[:max_paginas - 1]
+    return [0] + sorted(i for i in mejores if puntaje[i] > 0) if textos else []
+
+
+def recortar_pdf(pdf, indices):
+    from io import BytesIO
+    from pypdf import PdfReader, PdfWriter
+    lector, escritor = PdfReader(BytesIO(pdf)), PdfWriter()
+    for i in indices:
+        escritor.add_page(lector.pages[i])
+    salida = BytesIO()
+    escritor.write(salida)
+    return salida.getvalue()
+
+
+def _nombre(texto):
+    # El resto de la linea puede traer otro rotulo ("JUAN PEREZ    RUT: ...")
+    return re.split(r"\s{2,}|\s+(?:R\.?U\.?T|C\.?I\.?|Documento|Doc\.)\b", texto.strip())[0].strip()
+
+
+def leer_numero(texto):
+    """Monto con miles y decimales en cualquiera de los dos estilos ("48.250,00", "1,234.56", "412,50", "3.200").
+
+    Los decimales son 1 o 2 cifras y los miles grupos de 3, asi que cada texto se lee de una sola
+    forma; lo que no encaja en ninguno de los dos ("1.234.5", "12.345,678") da None.
+    """
+    if re.fullmatch(r"\d+", texto):
+        return float(texto)
+    if re.fullmatch(r"\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+,\d{1,2}", texto):
+        return float(texto.replace(".", "").replace(",", "."))
+    if re.fullmatch(r"\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+\.\d{1,2}", texto):
+        return float(texto.replace(",", ""))
+    return None
+
+
+def _monto(moneda, numero):
+    """(campo del premio segun la moneda, valor), o None si la moneda o el numero no se pueden leer sin adivinar."""
+    valor = leer_numero(numero)
+    if valor is None or not moneda:
+        return None
+    usd = moneda.upper() in ("U$S", "US$", "USD")
+    return ("premio_usd" if usd else "premio_uyu"), (int(valor) if valor.is_integer() else valor)
+
+
+def extraer_por_regex(texto):
+    """Datos de la poliza sin modelo, para layouts conocidos; None si no se reconoce o falta un dato clave."""
+    aseguradora = next((a for a, patron in ASEGURADORAS.items() if re.search(patron, texto)), None)
+    if aseguradora is None:
+        return None
+    patrones = PATRONES_ASEGURADORA[aseguradora]
+    nro = re.search(patrones["nro_poliza"], texto)
+    asegurado = re.search(patrones["asegurado"], texto)
+    vigencia = re.search(patrones["vigencia"], texto)
+    premio = re.search(patrones["premio"], texto)
+    if not (nro and asegurado and vigencia and premio):
+        return None
+    datos = {"asegurado": _nombre(asegurado.group(1)), "documento": None, "mail": None, "celular": None, "aseguradora": aseguradora,
+             "ramo": None, "nro_poliza": nro.group(1), "detalle": None, "inicio_vigencia": vigencia.group(1),
+             "fin_vigencia": vigencia.group(2), "moneda": None, "premio_usd": None, "premio_uyu": None}
+    monto = _monto(premio.group(1), premio.group(2))
+    if monto is None:
+        return None
+    campo, valor = monto
+    datos[campo], datos["moneda"] = valor, "USD" if campo == "premio_usd" else "UYU"
+    for campo, patron in PATRONES_COMUNES.items():
+        m = re.search(patron, texto)
+        if m:
+            datos[campo] = m.group(m.lastindex or 0)
+    matricula = re.search(PATRON_MATRICULA, texto)
+    if matricula:
+        datos["detalle"], datos["ramo"] = matricula.group(0), "VEHÍCULO"
+    return datos
+
+
+def preparar(pdf, max_paginas=MAX_PAGINAS):
+    """Lo minimo que hay que mandarle al modelo para este PDF.
+
+    Devuelve un dict con "via" y lo que corresponda:
+    - "regex": la via rapida reconocio el layout, "datos" ya esta completo y no hace falta el modelo.
+    - "texto": hay capa de texto; "texto" son solo las paginas relevantes.
+    - "paginas": escaneado; "pdf" son las primeras `max_paginas` paginas.
+    - "documento": no se pudo leer (o es chico), va el PDF entero.
+    """
+    textos = texto_paginas(pdf)
+    if not textos:
+        return {"via": "documento", "pdf": pdf, "paginas": None}
+    # La capa de texto se mide en todo el PDF: la hoja con los datos sola puede ser corta
+    if sum(map(_util, textos)) >= MIN_TEXTO:
+        relevantes = paginas_relevantes(textos, max_paginas)
+        texto = "\n\n".join(f"--- Página {i + 1} ---\n{textos[i]}" for i in relevantes)
+        datos = extraer_por_regex(texto)
+        if datos is not None:
+            return {"via": "regex", "datos": datos, "paginas": len(textos)}
+        return {"via": "texto", "texto": texto, "paginas": len(textos)}
+    if len(textos) > max_paginas:
+        try:
+            return {"via": "paginas", "pdf": recortar_pdf(pdf, range(max_paginas)), "paginas": len(textos)}
+        except Exception:
+            pass
+    return {"via": "documento", "pdf": pdf, "paginas": len(textos)}
@@ -0,0 +1,249 @@
+import hashlib
+import json
+import re
+import threading
+from bisect import bisect_left, insort
+
+from cartera import normalizar_texto
+from preproceso_pdf import leer_numero
+
+# Campos con indice secundario: nombre del indice -> clave del registro. "usuario" solo lo tienen
+# las propuestas que no van a ninguna hoja (Riesgos Varios): son del asesor que las armo
+CAMPOS_INDICE = {"asegurado": "n", "matricula": "matricula", "tipo": "tipo", "asesor": "e", "link": "link", "usuario": "_usuario"}
+# Los de texto libre se normalizan (sin tildes ni mayusculas); tipo y asesor quedan tal cual
+CAMPOS_TEXTO = {"asegurado", "matricula"}
+ORDENES_PROPUESTAS = ["fecha", "asegurado", "tipo", "total"]
+
+
+_FECHA = re.compile(r"(\d{1,2})/(\d{1,2})/(\d{4})(?:\s+(\d{1,2}):(\d{2}))?")
+
+
+def total_propuesta(registro):
+    # Aeronave guarda "total", Riesgos Varios "costo"; el resto no tiene total en el historial.
+    # Del Sheet puede venir como texto en cualquiera de los dos estilos ("2.277,50", "2,277.50")
+    for campo in ("total", "costo"):
+        valor = registro.get(campo, "")
+        if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            return float(valor)
+        texto = re.sub(r"[^\d.,]", "", str(valor))
+        numero = leer_numero(texto) if texto else None
+        if numero is not None:
+            return numero
+    return None
+
+
+def clave_fecha(fecha):
+    """'dd/mm/aaaa hh:mm' (o solo la fecha) -> 'aaaammddhhmm' para ordenar; vacio si no parsea."""
+    m = _FECHA.match(str(fecha or "").strip())
+    if not m:
+        return ""
+    d, mes, a, hh, mm = m.groups()
+    return f"{a}{mes:0>2}{d:0>2}{hh or 0:0>2}{mm or '00'}"
+
+
+class _IndiceCampo:
+    """valor normalizado -> ids, con las claves ordenadas (se reordenan solo si cambiaron)."""
+
+    def __init__(self):
+        self.ids = {}
+        self._claves = None
+
+    def agregar(self, valor, pid):
+        if valor not in self.ids:
+            self._claves = None
+        self.ids.setdefault(valor, set()).add(pid)
+
+    def quitar(self, valor, pid):
+        grupo = self.ids.get(valor)
+        if grupo is not None:
+            grupo.discard(pid)
+            if not grupo:
+                del self.ids[valor]
+                self._claves = None
+
+    def claves(self):
+        if self._claves is None:
+            self._claves = sorted(self.ids)
+        return self._claves
+
+    def igual(self, valor):
+        return self.ids.get(valor, set())
+
+    def prefijo(self, texto):
+        claves = self.claves()
+        salida = set()
+        for k in claves[bisect_left(claves, texto):]:
+            if not k.startswith(texto):
+                break
+            salida |= self.ids[k]
+        return salida
+
+    def contiene(self, texto):
+        # Se recorren los valores distintos (nombres, matriculas), no los registros
+        salida = set()
+        for k, grupo in self.ids.items():
+            if texto in k:
+                salida |= grupo
+        return salida
+
+
+# ==========================================
+# ALMACEN DE PROPUESTAS DEL HISTORIAL
+# ==========================================
+class AlmacenPropuestas:
+    """Propuestas por id estable, con indices por asegurado, matricula, tipo, asesor y fecha.
+
+    El id se calcula al agregar (a partir del link, o del contenido si no hay link) y se
+    mantiene aunque la propuesta se edite. Alta, edicion y baja son O(1) sobre el dict
+    (mas la actualizacion de los indices); las busquedas recorren valores distintos, no filas.
+    Es compartido entre sesiones, por eso todo pasa por un lock.
+    """
+
+    def __init__(self, registros=()):
+        self._registros = {}
+        self._indices = {nombre: _IndiceCampo() for nombre in CAMPOS_INDICE}
+        self._por_fecha = []  # (clave_fecha, orden de alta, id) ordenado
+        self._fechas = {}
+        self._claves_orden = {}  # id -> (asegurado normalizado, tipo, total)
+        self._orden = 0
+        self._lock = threading.RLock()
+        for r in registros:
+            self.agregar(r, ordenar=False)
+        self._por_fecha.sort()
+
+    def __len__(self):
+        return len(self._registros)
+
+    def __contains__(self, pid):
+        return pid in self._registros
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._registros.values()))
+
+    @staticmethod
+    def id_de(registro):
+        base = registro.get("link") or json.dumps(registro, sort_keys=True, default=str)
+        return hashlib.sha1(f"{registro.get('tipo', '')}|{base}".encode()).hexdigest()[:12]
+
+    def _nuevo_id(self, pid):
+        sufijo = 1
+        while f"{pid}-{sufijo}" in self._registros:
+            sufijo += 1
+        return f"{pid}-{sufijo}"
+
+    def _indexar(self, pid, registro, quitar=False):
+        valores = {}
+        for nombre, campo in CAMPOS_INDICE.items():
+            valor = str(registro.get(campo, "") or "").strip()
+            if nombre in CAMPOS_TEXTO:
+                valor = normalizar_texto(valor)
+            (self._indices[nombre].quitar if quitar else self._indices[nombre].agregar)(valor, pid)
+            valores[nombre] = valor
+        if quitar:
+            self._claves_orden.pop(pid, None)
+        else:
+            self._claves_orden[pid] = (valores["asegurado"], valores["tipo"], total_propuesta(registro))
+
+    def obtener(self, pid):
+        return self._registros.get(pid)
+
+    def id_por_link(self, link):
+        """Id actual de la propuesta con ese link, o None (los ids cambian si el almacen se rearma)."""
+        with self._lock:
+            ids = self._indices["link"].igual(str(link or "").strip()) if link else set()
+            return min(ids) if ids else None
+
+    def agregar(self, registro, ordenar=True, unico=False):
+        """Agrega y devuelve el id. Con `unico`, si ya hay una propuesta con ese id no se duplica."""
+        with self._lock:
+            pid = self.id_de(registro)
+            if pid in self._registros:
+                if unico:
+                    return pid
+                pid = self._nuevo_id(pid)
+            self._registros[pid] = registro
+            self._indexar(pid, registro)
+            self._orden += 1
+            self._fechas[pid] = (clave_fecha(registro.get("fecha")), self._orden, pid)
+            if ordenar:
+                insort(self._por_fecha, self._fechas[pid])
+            else:
+                self._por_fecha.append(self._fechas[pid])
+            return pid
+
+    def editar(self, pid, registro):
+        """Reemplaza la propuesta manteniendo su id. Devuelve el registro anterior."""
+        with self._lock:
+            anterior = self._registros[pid]
+            self._indexar(pid, anterior, quitar=True)
+            self._registros[pid] = registro
+            self._indexar(pid, registro)
+            viejo = self._fechas[pid]
+            nuevo = (clave_fecha(registro.get("fecha")), viejo[1], pid)
+            if nuevo != viejo:
+                del self._por_fecha[bisect_left(self._por_fecha, viejo)]
+                insort(self._por_fecha, nuevo)
+                self._fechas[pid] = nuevo
+            return anterior
+
+    def eliminar(self, pid):
+        """Quita la propuesta y la devuelve; None si ya no estaba (doble clic, almacen rearmado)."""
+        with self._lock:
+            registro = self._registros.pop(pid, None)
+            if registro is None:
+                return None
+            self._indexar(pid, registro, quitar=True)
+            del self._por_fecha[bisect_left(self._por_fecha, self._fechas.pop(pid))]
+            return registro
+
+    def valores(self, indice):
+        """Valores distintos de un indice secundario, ordenados."""
+        with self._lock:
+            return [v for v in self._indices[indice].claves() if v]
+
+    def buscar(self, asegurado="", matricula="", tipo=None, asesor=None, desde=None, hasta=None, modo="contiene", usuario=None):
+        """Ids que cumplen todos los filtros dados, del mas nuevo al mas viejo.
+
+        `asegurado` y `matricula` buscan por subcadena (`modo="contiene"`) o por prefijo
+        (`modo="prefijo"`); `tipo` y `asesor` son exactos; `desde`/`hasta` son fechas. Las
+        propuestas con dueño (las que solo viven en memoria) salen solo para su `usuario`.
+        """
+        with self._lock:
+            ocultas = set().union(*(ids for u, ids in self._indices["usuario"].ids.items() if u and u != usuario))
+            conjuntos = []
+            for nombre, texto in (("asegurado", asegurado), ("matricula", matricula)):
+                texto = normalizar_texto(texto).strip()
+                if texto:
+                    indice = self._indices[nombre]
+                    conjuntos.append(indice.prefijo(texto) if modo == "prefijo" else indice.contiene(texto))
+            for nombre, valor in (("tipo", tipo), ("asesor", asesor)):
+                if valor not in (None, "", "Todos"):
+                    conjuntos.append(self._indices[nombre].igual(str(valor).strip()))
+            # Rango de fechas por biseccion sobre el indice ordenado
+            d = desde.strftime("%Y%m%d") if desde else ""
+            h = hasta.strftime("%Y%m%d") + "9999" if hasta else "~"
+            lo, hi = bisect_left(self._por_fecha, (d,)), bisect_left(self._por_fecha, (h,))
+            if not conjuntos:
+                return [pid for _, _, pid in reversed(self._por_fecha[lo:hi]) if pid not in ocultas]
+            elegidos = set.intersection(*sorted(conjuntos, key=len)) - ocultas
+            if len(elegidos) * 4 < hi - lo:
+                # Pocos resultados: se ordenan ellos en vez de recorrer el rango de fechas
+                return [pid for f, _, pid in sorted((self._fechas[p] for p in elegidos), reverse=True) if d <= f < h]
+            return [pid for _, _, pid in reversed(self._por_fecha[lo:hi]) if pid in elegidos]
+
+    def ordenar(self, pids, por="fecha", descendente=True):
+        """Reordena ids que vienen de `buscar` (ya del mas nuevo al mas viejo) por otro criterio.
+
+        El sort es estable, asi que a igual asegurado/tipo/total sigue mandando la fecha;
+        las propuestas sin total quedan al final en cualquier sentido.
+        """
+        if por == "fecha":
+            return pids if descendente else pids[::-1]
+        with self._lock:
+            if por == "total":
+                con = [p for p in pids if self._claves_orden[p][2] is not None]
+                sin = [p for p in pids if self._claves_orden[p][2] is None]
+                return sorted(con, key=lambda p: self._claves_orden[p][2], reverse=descendente) + sin
+            i = ORDENES_PROPUESTAS.index(por) - 1
+            return sorted(pids, key=lambda p: self._claves_orden[p][i], reverse=descendente)
@@ -0,0 +1,157 @@
+import json
+import os
+
+import streamlit as st
+
+from cola_sheets import ColaEscritura
+from indices import IndiceDrive, IndicePolizas
+from subidas_drive import SubidasDrive
+from links import LinksSheet, LinksSQLite
+from servicios_google import RegistroGoogle
+
+# Solo modulos livianos: esto lo importa tambien la vista del cliente, que arranca sin pandas
+# ni el resto de la app. historial (y con el pandas) se importa recien cuando hace falta.
+SHEET_ID = "1xyzaQncW_4XcjV5hcrc41YGFUst5068tYglGTAQZ2AA"
+RUTA_COLA_SHEETS = ".cache/cola_sheets.db"
+RUTA_CACHE_EXTRACCIONES = ".cache/extracciones.db"
+RUTA_SUBIDAS_DRIVE = ".cache/subidas_drive.db"
+URL_APP = "https://dfseguros.streamlit.app/"
+HOJA_LINKS = "Links Propuestas"
+HOJA_POLIZAS = "Respuestas de formulario 2"
+ID_CARPETA_POLIZAS = "0ALMblQ4PWOIPUk9PVA"
+
+NOMBRES = {
+    "RDF": "Roque de Freitas", "JOE": "Joel Mokosce", "ANDRE": "Andrea Cazarian",
+    "AB": "Amelia Bentancor", "GR": "Gonzalo Robaina", "ER": "Eduardo Robaina",
+    "GS": "Grismer Sanchez", "MDF": "Matias de Freitas", "EH": "Erica Hugo",
+    "AP": "Ana Perdomo", "RS": "Romina Sierra", "LT": "Letizia Tomasi",
+    "EC": "Eugenia Cabral", "PG": "Pablo Gagliardi"
+}
+
+@st.cache_resource
+def get_registro_google():
+    # Un solo juego de credenciales, clientes y hojas abiertas para todas las sesiones
+    return RegistroGoogle(json.loads(st.secrets["connections"]["gsheets"]["service_account"]))
+
+def get_gspread_client():
+    try:
+        return get_registro_google().gspread()
+    except:
+        return None
+
+def enviar_filas_a_sheet(hoja_nombre, filas):
+    registro = get_registro_google()
+    try:
+        ws = registro.hoja(SHEET_ID, hoja_nombre)
+        with registro.medir("append_rows"):
+            ws.append_rows(filas, value_input_option="USER_ENTERED")
+    except Exception:
+        registro.invalidar(SHEET_ID, hoja_nombre)
+        raise
+
+def _celda_por_link(registro, ws, hoja_nombre, link):
+    from historial import COL_LINK_POR_HOJA
+    # Cada propuesta se identifica en su hoja por el link al cliente
+    with registro.medir("find"):
+        return ws.find(link, in_column=COL_LINK_POR_HOJA[hoja_nombre]) if link else None
+
+def actualizar_fila_en_sheet(hoja_nombre, link, fila):
+    registro = get_registro_google()
+    try:
+        ws = registro.hoja(SHEET_ID, hoja_nombre)
+        celda = _celda_por_link(registro, ws, hoja_nombre, link)
+        with registro.medir("update"):
+            if celda is None: ws.append_rows([fila], value_input_option="USER_ENTERED")
+            else: ws.update(range_name=f"A{celda.row}", values=[fila], value_input_option="USER_ENTERED")
+    except Exception:
+        registro.invalidar(SHEET_ID, hoja_nombre)
+        raise
+
+def borrar_fila_en_sheet(hoja_nombre, link):
+    registro = get_registro_google()
+    try:
+        ws = registro.hoja(SHEET_ID, hoja_nombre)
+        celda = _celda_por_link(registro, ws, hoja_nombre, link)
+        if celda is not None:
+            with registro.medir("delete_rows"):
+                ws.delete_rows(celda.row)
+    except Exception:
+        registro.invalidar(SHEET_ID, hoja_nombre)
+        raise
+    # Las filas se corrieron: la proxima lectura del historial tiene que ser completa
+    get_cargador_historial().invalidar()
+
+@st.cache_resource
+def get_indice_polizas():
+    # N° de poliza ya cargados: se lee la columna una vez y despues solo las filas nuevas
+    registro = get_registro_google()
+    return IndicePolizas(lambda: registro.hoja(SHEET_ID, HOJA_POLIZAS), medir=registro.medir)
+
+@st.cache_resource
+def get_indice_drive():
+    # PDFs de la carpeta "Pólizas" por contenido (md5Checksum), no por nombre
+    registro = get_registro_google()
+    return IndiceDrive(registro.drive, ID_CARPETA_POLIZAS, medir=registro.medir)
+
+def rellenar_link_pdf(marcador, link):
+    """Reemplaza el marcador de subida por el link del PDF en las filas que lo tengan. Devuelve cuantas cambio."""
+    from gspread import Cell
+    from ingesta import COL_LINK_PDF
+    registro = get_registro_google()
+    try:
+        ws = registro.hoja(SHEET_ID, HOJA_POLIZAS)
+        with registro.medir("findall"):
+            celdas = ws.findall(marcador, in_column=COL_LINK_PDF)
+        if celdas:
+            with registro.medir("update_cells"):
+                ws.update_cells([Cell(c.row, c.col, link) for c in celdas], value_input_option="USER_ENTERED")
+        return len(celdas)
+    except Exception:
+        registro.invalidar(SHEET_ID, HOJA_POLIZAS)
+        raise
+
+@st.cache_resource
+def get_subidas_drive():
+    # Un solo hilo de subidas para todas las sesiones; lo pendiente queda en disco y sigue tras un reinicio
+    registro = get_registro_google()
+    return SubidasDrive(registro.drive, ID_CARPETA_POLIZAS, rellenar_link_pdf, indice=get_indice_drive(), ruta=RUTA_SUBIDAS_DRIVE, medir=registro.medir).iniciar()
+
+@st.cache_resource
+def get_cola_sheets():
+    # Las filas quedan en disco al instante y un hilo las manda en lotes, con reintentos
+    return ColaEscritura(enviar_filas_a_sheet, ruta=RUTA_COLA_SHEETS, actualizar=actualizar_fila_en_sheet, borrar=borrar_fila_en_sheet).iniciar()
+
+@st.cache_resource
+def get_cargador_historial():
+    from historial import CargadorHistorial
+    # Compartido entre sesiones: una sola lectura batch de las 3 hojas y despues solo filas nuevas
+    return CargadorHistorial(lambda: get_registro_google().spreadsheet(SHEET_ID), medir=lambda op: get_registro_google().medir(op))
+
+def _hoja_links():
+    registro = get_registro_google()
+    try:
+        return registro.hoja(SHEET_ID, HOJA_LINKS)
+    except Exception:
+        # Primera vez: se crea la hoja de links con su encabezado
+        ws = registro.spreadsheet(SHEET_ID).add_worksheet(title=HOJA_LINKS, rows=1000, cols=3)
+        ws.append_row(["ID", "Propuesta", "Fecha"])
+        registro.invalidar(SHEET_ID, HOJA_LINKS)
+        return ws
+
+@st.cache_resource
+def get_almacen_links():
+    # Uno solo para la app y la vista del cliente: un link recien guardado se sirve desde su LRU
+    # aunque la fila todavia este en la cola. EDF_LINKS_LOCAL=ruta.db usa un SQLite local.
+    if os.environ.get("EDF_LINKS_LOCAL"):
+        return LinksSQLite(os.environ["EDF_LINKS_LOCAL"])
+    return LinksSheet(_hoja_links, HOJA_LINKS, encolar=lambda hoja, fila: get_cola_sheets().encolar(hoja, fila), medir=lambda op: get_registro_google().medir(op))
+
+@st.cache_resource
+def get_ingesta():
+    from ingesta import CacheExtracciones, ExtractorAnthropic, ExtractorFalso, IngestaPolizas
+    # Pool, limite de pedidos y cache de extracciones compartidos por todas las sesiones: el limite es de la API key.
+    # EDF_EXTRACTOR_FALSO=1 usa el extractor local (sin API) para probar la carga.
+    cache = CacheExtracciones(RUTA_CACHE_EXTRACCIONES)
+    if os.environ.get("EDF_EXTRACTOR_FALSO"):
+        return IngestaPolizas(ExtractorFalso(demora=float(os.environ.get("EDF_EXTRACTOR_FALSO_DEMORA", "1"))), por_minuto=0, cache=cache)
+    return IngestaPolizas(ExtractorAnthropic(st.secrets["ANTHROPIC_API_KEY"]), max_hilos=4, por_minuto=40, cache=cache)
@@ -0,0 +1,99 @@
+import threading
+import time
+from contextlib import contextmanager
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets", "https://www.googleapis.com/auth/drive"]
+
+
+# ==========================================
+# REGISTRO DE CLIENTES DE GOOGLE (UNO POR PROCESO)
+# ==========================================
+class RegistroGoogle:
+    """Credenciales, clientes de gspread/Drive y hojas abiertas, compartidos entre sesiones.
+
+    Cada llamada a la API se puede envolver en `medir(nombre)` para llevar la latencia.
+    """
+
+    def __init__(self, info_sa, scopes=SCOPES):
+        from google.oauth2.service_account import Credentials
+        self.creds = Credentials.from_service_account_info(info_sa, scopes=scopes)
+        self._gc = None
+        self._spreadsheets = {}
+        self._hojas = {}
+        self._local = threading.local()
+        self._lock = threading.RLock()
+        self.latencias = {}
+
+    @contextmanager
+    def medir(self, operacion):
+        inicio = time.perf_counter()
+        error = False
+        try:
+            yield
+        except Exception:
+            error = True
+            raise
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            with self._lock:
+                st = self.latencias.setdefault(operacion, {"llamadas": 0, "errores": 0, "total_ms": 0.0, "max_ms": 0.0, "ultima_ms": 0.0})
+                st["llamadas"] += 1
+                st["errores"] += error
+                st["total_ms"] += ms
+                st["max_ms"] = max(st["max_ms"], ms)
+                st["ultima_ms"] = ms
+
+    def resumen_latencias(self):
+        with self._lock:
+            return [{"Operación": op, "Llamadas": st["llamadas"], "Errores": st["errores"], "Promedio (ms)": round(st["total_ms"] / st["llamadas"], 1),
+                     "Máx (ms)": round(st["max_ms"], 1), "Última (ms)": round(st["ultima_ms"], 1)} for op, st in sorted(self.latencias.items())]
+
+    def _refrescar_token(self):
+        # gspread refresca solo, pero Drive (httplib2) lo hace recien al primer 401
+        if not self.creds.valid:
+            from google.auth.transport.requests import Request
+            with self.medir("auth.refresh"):
+                self.creds.refresh(Request())
+
+    def gspread(self):
+        with self._lock:
+            if self._gc is None:
+                import gspread
+                self._gc = gspread.authorize(self.creds)
+            return self._gc
+
+    def drive(self):
+        # httplib2 no es thread-safe: un servicio de Drive por hilo, mismas credenciales
+        servicio = getattr(self._local, "drive", None)
+        if servicio is None:
+            from googleapiclient.discovery import build
+            servicio = build("drive", "v3", credentials=self.creds, cache_discovery=False)
+            self._local.drive = servicio
+        with self._lock:
+            self._refrescar_token()
+        return servicio
+
+    def spreadsheet(self, sheet_id):
+        with self._lock:
+            if sheet_id not in self._spreadsheets:
+                with self.medir("open_by_key"):
+                    self._spreadsheets[sheet_id] = self.gspread().open_by_key(sheet_id)
+            return self._spreadsheets[sheet_id]
+
+    def hoja(self, sheet_id, nombre):
+        clave = (sheet_id, nombre)
+        with self._lock:
+            if clave not in self._hojas:
+                sh = self.spreadsheet(sheet_id)
+                with self.medir("worksheet"):
+                    self._hojas[clave] = sh.worksheet(nombre)
+            return self._hojas[clave]
+
+    def invalidar(self, sheet_id, nombre=None):
+        """Descarta handles cacheados (por ejemplo si se renombro o borro una hoja)."""
+        with self._lock:
+            self._hojas.pop((sheet_id, nombre), None)
+            if nombre is None:
+                self._spreadsheets.pop(sheet_id, None)
+                for clave in [k for k in self._hojas if k[0] == sheet_id]:
+                    del self._hojas[clave]
@@ -0,0 +1 @@
+"""Datos sinteticos, dobles de Google y calculos originales que comparten bench.py y tests/."""
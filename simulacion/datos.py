@@ -0,0 +1,155 @@
+"""Datos sinteticos con la forma de los reales: cartera, cotizaciones, propuestas, flotas y PDFs."""
+import io
+import json
+import random
+from datetime import date, timedelta
+
+import pandas as pd
+
+import plantillas
+from cartera import _normalizar
+from historial import HOJAS_HISTORIAL
+from tarifas_aeronave import TASAS_AERONAVE
+from simulacion.dobles import HojaFalsa
+
+ENCABEZADO_CARTERA = [
+    "Marca temporal", "Dirección de correo electrónico", "Asegurado (Nombre/Razón Social)",
+    "Documento de Identidad (Rut/Cédula/Otros)", "Celular", "Aseguradora", "Ramo", "N° de Póliza",
+    "Detalle (Matricula o Referencia)", "Inicio de Vigencia", "Fin de Vigencia", "Corredor", "Ejecutivo",
+    "Agente", "Premio USD (IVA inc)", "Premio UYU (IVA inc)", "Adjunto (póliza)", "Notas", "",
+]
+NOMBRES = ["María", "José", "Ana", "Juan", "Lucía", "Martín", "Sofía", "Diego", "Valentina", "Pablo", "Camila", "Nicolás"]
+APELLIDOS = ["González", "Rodríguez", "Fernández", "López", "Martínez", "Pérez", "García", "Sánchez", "Romero", "Silva", "Núñez", "Díaz"]
+
+
+def filas_sinteticas(n, semilla=0):
+    rnd = random.Random(semilla)
+    hoy = date.today()
+    filas = []
+    for i in range(n):
+        fin = hoy + timedelta(days=rnd.randint(-400, 400))
+        usd = rnd.random() < 0.6
+        nombre = f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)}"
+        filas.append([
+            f"{fin.strftime('%d/%m/%Y')} 10:00:00", f"cliente{i}@mail.com", nombre, str(rnd.randint(1_000_000, 6_999_999)),
+            f"09{rnd.randint(1_000_000, 9_999_999)}", rnd.choice(["BSE", "SURA", "SBI", "MAPFRE", "SANCOR", "BERKLEY", "PORTO"]),
+            rnd.choice(["VEHÍCULO", "HOGAR", "EMPRESA", "RC", "TRANSPORTE", "VIDA"]), str(100000 + i),
+            f"{rnd.choice('ABSMO')}{rnd.choice('ABCDE')}{rnd.choice('ABCDE')} {rnd.randint(1000, 9999)}",
+            (fin - timedelta(days=365)).strftime("%d/%m/%Y"), fin.strftime("%d/%m/%Y"),
+            rnd.choice(["EDF", "OTRO", ""]), rnd.choice(["RDF", "JOE", "ANDRE", "AB", "GR", "ER", "GS", "MDF"]),
+            rnd.choice(["", "AG1", "AG2"]), rnd.randint(300, 3000) if usd else "", "" if usd else rnd.randint(10000, 90000),
+            f"https://drive.google.com/file/d/{i}", "", "",
+        ])
+    return filas
+
+
+def cartera_sintetica(n, semilla=0):
+    return _normalizar(ENCABEZADO_CARTERA, filas_sinteticas(n, semilla))
+
+
+def hojas_cotizaciones(n, semilla=0, latencia=0.0):
+    rnd = random.Random(semilla)
+    hojas = {h: HojaFalsa(latencia) for h, _ in HOJAS_HISTORIAL}
+    hojas["Cotizaciones Individuales"].filas = [["Fecha"] * 13] + [
+        [f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2025 10:{i % 60:02d}", f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}", str(i), "FIAT UNO", f"SBA {i}", "Total", "MVD", "RDF", "BSE", "1000", "120", "", f"https://x/?q={i}"] for i in range(n)]
+    hojas["Cotizaciones Flotas"].filas = [["Fecha"] * 6] + [["01/01/2025", rnd.choice(APELLIDOS), "SURA", "Roque", "FIAT UNO SBA 1", f"https://x/?q=f{i}"] for i in range(n // 5)]
+    hojas["Cotizaciones Aeronaves"].filas = [["Fecha"] * 14] + [
+        ["01/01/2025", "Aeroclub", "SANCOR", "Cessna", f"CX-{i}", "Uruguay", "", "RDF", "100", "15", "115", f"https://x/?q=a{i}",
+         json.dumps({"fecha": "01/01/2025", "n": "Aeroclub", "tipo": "Aeronave", "tab": []}) if i % 2 else "", ""] for i in range(n // 20)]
+    return hojas
+
+
+def propuestas_ejemplo(i=0):
+    """Una propuesta de cada tipo tal como la arma la app, con las plantillas sin tocar."""
+    return {
+        "Individual": {
+            "fecha": "01/01/2025 10:00", "n": f"Maria Gonzalez {i}", "v": "VOLKSWAGEN GOL 1.6 2019", "matricula": f"SBA {1000 + i}",
+            "cobertura_cot": "Total", "zona": "Montevideo", "e": "RDF", "cont": "099236116", "doc": str(4_000_000 + i),
+            "tab": [{"Aseguradora": a, "Contado": 30000 + 1000 * k, "10 Cuotas": 3300 + 100 * k, "Deducible": 25000} for k, a in enumerate(["BSE", "SURA", "MAPFRE", "SANCOR"])],
+            "ben": plantillas.txt_ben_veh, "ch": plantillas.txt_hog_veh, "ca": plantillas.txt_alq_veh, "cb": plantillas.txt_bic_veh, "tipo": "Individual"},
+        "Flota": {
+            "fecha": "01/01/2025 10:00", "n": "Transportes del Este SA", "e": "SURA", "e_nombre": "Roque de Freitas", "cont": "099236116",
+            "tab": [{"Marca": "FIAT", "Modelo": "FIORINO", "Ano": str(2015 + k), "Matricula": f"SBA {2000 + k}", "Cobertura": "Todo Riesgo", "Contado": 40000 + k, "Deducible": 20000} for k in range(8)],
+            "ben": plantillas.txt_obs_flota, "ch": plantillas.txt_acc_flota, "ca": plantillas.txt_alq_flota, "cb": plantillas.txt_bic_flota, "tipo": "Flota"},
+        "Aeronave": {
+            "fecha": "01/01/2025 10:00", "n": "Aeroclub del Uruguay", "aseguradora": "SANCOR", "aeronave": "Cessna 172", "matricula": "CX-ABC",
+            "alcance_geo": "Uruguay", "destino": "", "e": "RDF", "cont": "099236116",
+            "tab": [{"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 1.5, "Asientos": 0, "Capital": 120000, "Costo": 1800.0},
+                    {"Cobertura": "Accidente Personales Pasajeros", "Tasa (%)": 0.3, "Asientos": 3, "Capital": 20000, "Costo": 180.0}],
+            "tab_principales": [{"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 1.5, "Capital (USD)": 120000}],
+            "tab_accidentes": [{"Cobertura": "Accidente Personales Pasajeros", "Tasa (%)": 0.3, "Asientos": 3, "Capital (USD)": 20000}],
+            "aptitud_aterrizaje": False, "obs_av": "", "subtotal": 1980.0, "cargos": 297.0, "total": 2277.0, "tipo": "Aeronave"},
+        "RV": {
+            "fecha": "01/01/2025 10:00", "n": "Comercial SRL", "tipo_seg": "Todo Riesgo Operativo", "act": "Comercio", "cia": "BSE", "vig": "12 meses",
+            "e": "RDF", "cont": "099236116", "tab_cob": plantillas.COBERTURAS_RV, "cap_total": 0.0, "ded": "USD 1.000", "tab_sub": plantillas.SUBLIMITES_RV,
+            "ubi": plantillas.txt_ubicaciones_rv, "equ": plantillas.txt_equipos_rv, "acl": plantillas.txt_aclaraciones_rv, "tasa": 0.12, "costo": 0.0,
+            "fin": "10 cuotas", "tab_comp": [{"Aseguradora": "", "Premio (USD)": 0}], "tipo": "RV"},
+    }
+
+
+def aeronaves_sinteticas(n, semilla=0):
+    rnd = random.Random(semilla)
+    salida = []
+    for i in range(n):
+        tasas = TASAS_AERONAVE[rnd.choice(list(TASAS_AERONAVE))]
+        princ = pd.DataFrame([{**c, "Tasa (%)": round(c["Tasa (%)"] * rnd.uniform(0.5, 2), 2), "Capital (USD)": rnd.choice([0, rnd.randint(10_000, 3_000_000)])} for c in tasas["principales"]])
+        acc = pd.DataFrame([{**c, "Asientos": rnd.randint(1, 6), "Capital (USD)": rnd.randint(0, 200_000)} for c in tasas["accidentes"]])
+        salida.append((f"CX-{i:05d}", princ, acc))
+    return salida
+
+
+def planilla_flota(n, matriculas_cartera=(), semilla=0):
+    """CSV como los que mandan los clientes: ; de separador, matriculas y años escritos de cualquier forma."""
+    rnd = random.Random(semilla)
+    marcas = [("Fiat", "Fiorino"), ("Volkswagen", "Saveiro"), ("Renault", "Kangoo"), ("Toyota", "Hilux"), ("Chevrolet", "Onix")]
+    filas = ["Marca;Modelo;Año;Matrícula;Cobertura;Contado"]
+    for i in range(n):
+        marca, modelo = rnd.choice(marcas)
+        letras = "".join(rnd.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(3))
+        mat = rnd.choice([f"{letras} {1000 + i % 9000}", f"{letras.lower()}-{1000 + i % 9000}", f"{letras}{1000 + i % 9000}"])
+        if matriculas_cartera and rnd.random() < 0.02:
+            mat = rnd.choice(matriculas_cartera)
+        ano = rnd.choice([str(rnd.randint(2005, 2025)), str(rnd.randint(5, 25)).zfill(2), "20x9"])
+        filas.append(f"{marca};{modelo};{ano};{mat};{rnd.choice(['', 'Todo Riesgo', 'Terceros'])};{rnd.randint(20, 90)}.{rnd.randint(0, 999):03d}")
+    return "\n".join(filas).encode()
+
+
+def pdf_sintetico(paginas, imagen_kb=0, semilla=0):
+    """PDF minimo: una pagina por texto de `paginas` ("" = pagina escaneada) y, si `imagen_kb`, una
+    imagen de ese tamaño por pagina (el peso de un escaneo o de los logos)."""
+    rnd = random.Random(semilla)
+    objetos = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    hijos = []
+    for texto in paginas:
+        lineas = "".join(f"({l.replace('(', '[').replace(')', ']')}) Tj T* " for l in texto.split("\n"))
+        flujo = f"BT /F1 10 Tf 12 TL 40 800 Td {lineas}ET".encode("latin-1") if texto else b""
+        recursos = "/Font << /F1 3 0 R >>"
+        if imagen_kb:
+            datos = rnd.randbytes(imagen_kb * 1024)
+            objetos.append(b"<< /Type /XObject /Subtype /Image /Width 1 /Height 1 /ColorSpace /DeviceGray /BitsPerComponent 8 /Length %d >>\nstream\n" % len(datos) + datos + b"\nendstream")
+            recursos += f" /XObject << /Im0 {len(objetos)} 0 R >>"
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+        objetos.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << {recursos} >> /Contents {len(objetos)} 0 R >>".encode())
+        hijos.append(len(objetos))
+    objetos[1] = f"<< /Type /Pages /Kids [{' '.join(f'{h} 0 R' for h in hijos)}] /Count {len(hijos)} >>".encode()
+    salida, offsets = io.BytesIO(b"%PDF-1.4\n"), []
+    salida.seek(0, 2)
+    for i, obj in enumerate(objetos, 1):
+        offsets.append(salida.tell())
+        salida.write(b"%d 0 obj\n" % i + obj + b"\nendobj\n")
+    xref = salida.tell()
+    salida.write(f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode() + b"".join(b"%010d 00000 n \n" % o for o in offsets))
+    salida.write(f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode())
+    return salida.getvalue()
+
+
+CONDICIONES = "\n".join(f"Articulo {i}. Las partes acuerdan que el asegurador no respondera por los danos" for i in range(40))
+POLIZAS_EJEMPLO = {
+    "BSE auto (6 pag.)": ["BANCO DE SEGUROS DEL ESTADO\nPoliza N: 4512873/1\nAsegurado: JUAN PEREZ    RUT: 211234560019\n"
+                          "Vehiculo: FIAT CRONOS matricula SBA 1234\nVigencia desde el 01/03/2026 hasta el 01/03/2027\nPremio Total: $ 48.250,00"] + [CONDICIONES] * 5,
+    "MAPFRE hogar (12 pag.)": ["MAPFRE URUGUAY SEGUROS\nPOLIZA NRO. 88-0012345\nASEGURADO: MARIA GONZALEZ\nVIGENCIA DEL 15/05/2026 AL 15/05/2027\n"
+                               "Hogar en Av. Italia 1234\nPREMIO TOTAL U$S 412,50"] + [CONDICIONES] * 11,
+    "PORTO empresa (30 pag.)": [CONDICIONES] * 2 + ["PORTO SEGUROS - CONDICIONES PARTICULARES\nPoliza 700123\nTomador: ACME SA\nVigencia 01/01/2026 - 01/01/2027\n"
+                                "Premio total a pagar USD 3.200"] + [CONDICIONES] * 27,
+    "Escaneada (20 pag.)": [""] * 20,
+}
@@ -0,0 +1,220 @@
+"""Dobles en memoria de las APIs de Google (Sheets y Drive), para bench.py y los tests.
+
+Todos aceptan `latencia` (segundos por llamada, 0 en los tests) y cuentan las llamadas.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+
+class HojaFalsa:
+    """Worksheet en memoria con latencia por llamada y fallos a pedido."""
+
+    def __init__(self, latencia=0.0, fallos=0, filas=None):
+        self.latencia = latencia
+        self.fallos = fallos
+        self.filas = [list(f) for f in filas or []]
+        self.llamadas = 0
+
+    def _llamada(self):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+
+    def append_row(self, fila, value_input_option=None):
+        return self.append_rows([fila], value_input_option)
+
+    def append_rows(self, filas, value_input_option=None):
+        self._llamada()
+        if self.fallos:
+            self.fallos -= 1
+            raise ConnectionError("503 simulado")
+        # Como USER_ENTERED: el apostrofe inicial fuerza texto y no se guarda
+        desde = len(self.filas) + 1
+        self.filas.extend([v[1:] if isinstance(v, str) and v.startswith("'") else v for v in f] for f in filas)
+        return {"updates": {"updatedRange": f"Hoja!A{desde}:Z{len(self.filas)}", "updatedRows": len(filas)}}
+
+    def col_values(self, col):
+        self._llamada()
+        valores = [str(f[col - 1]) if len(f) >= col else "" for f in self.filas]
+        while valores and not valores[-1]:
+            valores.pop()
+        return valores
+
+    def row_values(self, fila):
+        self._llamada()
+        return [str(v) for v in self.filas[fila - 1]] if fila <= len(self.filas) else []
+
+    def get_all_values(self):
+        self._llamada()
+        ancho = max((len(f) for f in self.filas), default=0)
+        return [list(f) + [""] * (ancho - len(f)) for f in self.filas]
+
+
+class LibroFalso:
+    """Spreadsheet en memoria: una latencia por request, sea de una hoja o batch."""
+
+    def __init__(self, hojas, latencia=0.0):
+        self.hojas = hojas
+        self.latencia = latencia
+        self.llamadas = 0
+
+    def values_batch_get(self, rangos):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        salida = []
+        for rango in rangos:
+            nombre, celdas = rango.rsplit("!", 1)
+            desde = int(celdas.split(":")[0][1:])
+            filas = [list(f) for f in self.hojas[nombre.strip("'")].filas[desde - 1:]]
+            while filas and not any(filas[-1]):
+                filas.pop()
+            for f in filas:
+                while f and f[-1] == "":
+                    f.pop()
+            salida.append({"range": rango, "values": filas} if filas else {"range": rango})
+        return {"valueRanges": salida}
+
+
+class ColumnaFalsa:
+    """Columna H de "Respuestas de formulario 2": latencia por llamada y una fila de payload por poliza."""
+
+    def __init__(self, n, latencia=0.0):
+        self.valores = [[str(1_000_000 + i)] for i in range(n)]
+        self.latencia = latencia
+        self.llamadas = 0
+
+    def col_values(self, col):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        return ["N° de Póliza"] + [f[0] for f in self.valores]
+
+    def get(self, rango):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        desde = int(rango.split(":")[0][1:])
+        return [list(f) for f in self.valores[desde - 2:]]
+
+
+class FuenteFalsa:
+    """Hoja de cartera en memoria con la interfaz de cartera.FuenteSheet; cada cambio sube la revision."""
+
+    def __init__(self, filas, latencia=0.0):
+        self.filas = [list(f) for f in filas]
+        self.latencia = latencia
+        self.llamadas = 0
+        self.filas_leidas = 0
+        self._revision = 0
+
+    def cambiar(self, fn):
+        fn(self.filas)
+        self._revision += 1
+
+    def revision(self):
+        return self._revision
+
+    def cantidad_filas(self):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        return len(self.filas)
+
+    def leer(self, desde=1):
+        self.llamadas += 1
+        time.sleep(self.latencia)
+        filas = [list(f) for f in self.filas[desde - 1:]]
+        self.filas_leidas += len(filas)
+        return filas
+
+
+class MediaFalsa:
+    """Lo que usa una subida reanudable de MediaIoBaseUpload: tamaño, partes y bytes."""
+
+    def __init__(self, pdf, chunk=256 * 1024):
+        self.pdf, self._chunk = pdf, chunk
+
+    def size(self):
+        return len(self.pdf)
+
+    def chunksize(self):
+        return self._chunk
+
+    def getbytes(self, inicio, largo):
+        return self.pdf[inicio:inicio + largo]
+
+
+class PedidoFalso:
+    """files().create(...) de Drive: execute() de una vez, o next_chunk() por partes con sesion reanudable."""
+
+    def __init__(self, drive, resultado=None, body=None, media=None):
+        self.drive, self.resultado, self.body, self.media = drive, resultado, body, media
+        self.resumable_uri, self.resumable_progress = None, 0
+
+    def execute(self):
+        self.drive.llamadas += 1
+        time.sleep(self.drive.latencia)
+        if self.media is not None:
+            self.resultado = self.drive._archivo(self.body["name"], self.media.getbytes(0, self.media.size()))
+        return self.resultado
+
+    def next_chunk(self):
+        drive = self.drive
+        drive.llamadas += 1
+        time.sleep(drive.latencia)
+        if drive.fallar_cada and drive.llamadas % drive.fallar_cada == 0:
+            raise ConnectionError("corte de red simulado")
+        if self.resumable_uri is None:
+            self.resumable_uri = f"sesion-{len(drive.sesiones)}"
+            drive.sesiones[self.resumable_uri] = b""
+        # Como el 308 con Range de la API: se sigue desde lo que el servidor confirmo
+        recibido = drive.sesiones[self.resumable_uri]
+        parte = self.media.getbytes(len(recibido), self.media.chunksize())
+        drive.sesiones[self.resumable_uri] = recibido + parte
+        drive.bytes_recibidos += len(parte)
+        self.resumable_progress = len(drive.sesiones[self.resumable_uri])
+        if self.resumable_progress < self.media.size():
+            return self.resumable_progress / self.media.size(), None
+        return None, drive._archivo(self.body["name"], drive.sesiones[self.resumable_uri])
+
+
+class DriveFalso:
+    """files().list/create de Drive en memoria: paginado de a 1000, md5Checksum, filtro por modifiedTime y subidas reanudables."""
+
+    def __init__(self, archivos=(), latencia=0.0, fallar_cada=0):
+        self.archivos = list(archivos)
+        self.latencia = latencia
+        self.fallar_cada = fallar_cada
+        self.llamadas = 0
+        self.sesiones = {}
+        self.bytes_recibidos = 0
+
+    def files(self):
+        return self
+
+    def list(self, q="", pageToken=None, pageSize=1000, **kw):
+        nombre = q.split("name = '")[1].split("'")[0] if "name = '" in q else None
+        desde = q.split("modifiedTime > '")[1].split("'")[0] if "modifiedTime > '" in q else ""
+        todos = [a for a in self.archivos if (nombre is None or a["name"] == nombre) and a.get("modifiedTime", a["createdTime"]) > desde]
+        inicio = int(pageToken or 0)
+        return PedidoFalso(self, {"files": todos[inicio:inicio + pageSize], **({"nextPageToken": str(inicio + pageSize)} if inicio + pageSize < len(todos) else {})})
+
+    def create(self, body=None, media_body=None, **kw):
+        return PedidoFalso(self, body=body, media=media_body)
+
+    def _archivo(self, nombre, contenido):
+        ahora = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+        archivo = {"id": f"id{len(self.archivos)}", "name": nombre, "md5Checksum": hashlib.md5(contenido).hexdigest(),
+                   "webViewLink": f"https://drive/{len(self.archivos)}", "createdTime": ahora, "modifiedTime": ahora}
+        self.archivos.append(archivo)
+        return archivo
+
+
+class LinksPolizasFalsos:
+    """Columna de links de "Respuestas de formulario 2": rellenar(marcador, link) como el de recursos."""
+
+    def __init__(self):
+        self.celdas = []
+
+    def rellenar(self, marcador, link):
+        cambiadas = [i for i, v in enumerate(self.celdas) if v == marcador]
+        for i in cambiadas:
+            self.celdas[i] = link
+        return len(cambiadas)
@@ -0,0 +1,129 @@
+"""Los calculos como estaban antes de optimizarlos: los tests comparan contra estos y bench.py los cronometra."""
+import json
+from datetime import date
+
+import pandas as pd
+
+from historial import HOJAS_HISTORIAL
+
+
+def historial_antes(hojas):
+    # Lo que hacia cada sesion al entrar: tres get_all_values seguidos y parseo fila a fila
+    hist = []
+    for hoja, tipo in HOJAS_HISTORIAL:
+        for row in hojas[hoja].get_all_values()[1:]:
+            if row and row[0]:
+                if tipo == "Individual" and len(row) >= 13:
+                    hist.append({"fecha": row[0], "n": row[1], "doc": row[2], "v": row[3], "matricula": row[4], "cobertura_cot": row[5], "zona": row[6], "e": row[7], "tipo": "Individual", "link": row[12] if len(row) > 12 else ""})
+                elif tipo == "Flota" and len(row) >= 6:
+                    hist.append({"fecha": row[0], "n": row[1], "e": row[2], "e_nombre": row[3], "tipo": "Flota", "link": row[5] if len(row) > 5 else ""})
+                elif tipo == "Aeronave" and len(row) >= 12:
+                    if len(row) > 12 and row[12]:
+                        try:
+                            datos = json.loads(row[12])
+                            datos["link"] = row[11]
+                            hist.append(datos)
+                            continue
+                        except:
+                            pass
+                    hist.append({"fecha": row[0], "n": row[1], "aseguradora": row[2], "aeronave": row[3], "matricula": row[4], "alcance_geo": row[5], "destino": row[6], "e": row[7], "total": row[10], "tipo": "Aeronave", "link": row[11]})
+    return hist
+
+
+def tabla_antes(propuesta):
+    # Tabla de cotizaciones de Individual/Flota como la armaba app.py antes (DataFrame + iterrows)
+    df_cli = pd.DataFrame(propuesta.get("tab", []))
+    cols_num = ["Contado", "Deducible"] if propuesta.get("tipo") == "Flota" else ["Contado", "10 Cuotas", "Deducible"]
+    for col in cols_num:
+        if col in df_cli.columns:
+            df_cli[col] = pd.to_numeric(df_cli[col], errors='coerce').fillna(0).astype(int)
+    cols_mostrar = [c for c in df_cli.columns if c in ["Aseguradora","Marca","Modelo","Ano","Matricula","Cobertura","Contado","10 Cuotas","Deducible"]]
+    html_tabla = '<table style="width:100%;border-collapse:collapse;font-size:12px;margin-top:10px;">'
+    html_tabla += '<tr style="background:#1E3A8A;color:white;">'
+    for col in cols_mostrar:
+        html_tabla += f'<th style="padding:8px 12px;text-align:left;">{col.upper()}</th>'
+    html_tabla += '</tr>'
+    for i, row in df_cli.iterrows():
+        bg = "#f8f9fa" if i % 2 == 0 else "white"
+        html_tabla += f'<tr style="background:{bg};">'
+        for col in cols_mostrar:
+            val = row.get(col, "")
+            if col in ["Contado", "10 Cuotas", "Deducible"]:
+                try: val = f"$ {int(float(val)):,}".replace(",", ".")
+                except: pass
+            html_tabla += f'<td style="padding:7px 12px;border-bottom:1px solid #e5e7eb;">{val}</td>'
+        html_tabla += '</tr>'
+    return html_tabla + '</table>'
+
+
+def cotizar_aeronave_antes(t_princ, t_acc):
+    # El calculo de tab_aeronave antes del motor vectorizado (iterrows + float por fila)
+    filas_calc, subtotal = [], 0.0
+    for _, row in t_princ.iterrows():
+        tasa = float(row.get("Tasa (%)", 0) or 0)
+        capital = float(row.get("Capital (USD)", 0) or 0)
+        costo = round(capital * tasa / 100, 2)
+        subtotal += costo
+        filas_calc.append({"Cobertura": str(row.get("Cobertura", "")), "Tasa (%)": tasa, "Asientos": 0, "Capital": capital, "Costo": costo})
+    for _, row in t_acc.iterrows():
+        tasa = float(row.get("Tasa (%)", 0) or 0)
+        capital = float(row.get("Capital (USD)", 0) or 0)
+        costo = round(capital * tasa / 100, 2)
+        subtotal += costo
+        filas_calc.append({"Cobertura": str(row.get("Cobertura", "")), "Tasa (%)": tasa, "Asientos": int(row.get("Asientos", 0) or 0), "Capital": capital, "Costo": costo})
+    cargos = round(subtotal * 0.15, 2)
+    return {"filas": filas_calc, "subtotal": subtotal, "cargos": cargos, "total": round(subtotal + cargos, 2)}
+
+
+def f_num_antes(val):
+    try: return f"{int(float(str(val).replace('$','').replace('USD','').replace('.','').replace(',','').strip())):,}".replace(",",".")
+    except: return str(val)
+
+
+def premio_antes(uyu, usd):
+    # El texto del premio del mensaje de renovacion, celda por celda
+    def limpiar(val):
+        v = str(val).strip()
+        return '' if v in ['nan', 'None', 'N/D', 'none'] else v
+    uyu, usd = limpiar(uyu), limpiar(usd)
+    if uyu and uyu not in ['0']:
+        return f"UYU {f_num_antes(uyu)}"
+    if usd and usd not in ['0']:
+        return f"USD {f_num_antes(usd)}"
+    return "a coordinar"
+
+
+def filtrar_antes(df, seleccion, estado="Todas", hoy=None):
+    # Los filtros del sidebar: copia de la cartera y una mascara por filtro en cada rerun
+    hoy = pd.Timestamp(hoy or date.today())
+    df_f = df.copy()
+    for col, val in seleccion.items():
+        if val != "Todos" and col in df_f.columns: df_f = df_f[df_f[col] == val]
+    if estado == "Vigentes":
+        df_f = df_f[df_f["Fin de Vigencia"] >= hoy]
+    elif estado == "No vigentes":
+        df_f = df_f[df_f["Fin de Vigencia"] < hoy]
+    return df_f
+
+
+def opciones_antes(df, col):
+    return ["Todos"] + sorted(df[col].dropna().unique().tolist())
+
+
+def buscar_antes(df, busq):
+    # La busqueda de la pestana Cartera: str.contains sobre todas las columnas pasadas a texto
+    return df[df.astype(str).apply(lambda x: x.str.contains(busq, case=False)).any(axis=1)]
+
+
+def historial_poliza_antes(df_raw, fila):
+    # El historial del panel de detalle: una mascara sobre toda la cartera por cada poliza abierta
+    col_aseg_raw, col_mat_raw, col_ramo_raw = 'Asegurado (Nombre/Razón Social)', 'Detalle (Matricula o Referencia)', 'Ramo'
+    nombre_cliente, ramo_cliente, matricula_cliente = fila.get(col_aseg_raw, ''), fila.get(col_ramo_raw, ''), fila.get(col_mat_raw, '')
+    if not (nombre_cliente and col_aseg_raw in df_raw.columns):
+        return df_raw.iloc[:0]
+    mask = (df_raw[col_aseg_raw] == nombre_cliente)
+    if ramo_cliente and col_ramo_raw in df_raw.columns:
+        mask = mask & (df_raw[col_ramo_raw] == ramo_cliente)
+    if matricula_cliente and col_mat_raw in df_raw.columns:
+        mask = mask & (df_raw[col_mat_raw] == matricula_cliente)
+    return df_raw[mask].sort_values('Fin de Vigencia', ascending=False, kind="stable")
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+
+from indices import IndiceDrive
+
+CHUNK = 1024 * 1024  # multiplo de 256 KB, como pide la API de subidas reanudables
+MAX_INTENTOS_FILA = 5
+
+
+def marcador_subida(pdf):
+    """Texto que ocupa la celda del link mientras el PDF sube; el mismo PDF da el mismo marcador."""
+    return f"⏳ subiendo PDF ({hashlib.md5(pdf).hexdigest()[:12]})"
+
+
+def media_drive(pdf, chunk=CHUNK):
+    from io import BytesIO
+    from googleapiclient.http import MediaIoBaseUpload
+    return MediaIoBaseUpload(BytesIO(pdf), mimetype="application/pdf", chunksize=chunk, resumable=True)
+
+
+# ==========================================
+# SUBIDAS A DRIVE EN SEGUNDO PLANO
+# ==========================================
+class SubidasDrive:
+    """PDFs de polizas que suben a Drive en un hilo de fondo, con la fila del Sheet ya guardada.
+
+    La fila se escribe con `marcador_subida(pdf)` en lugar del link; cuando el PDF termina de
+    subir, `rellenar(marcador, link)` reemplaza el marcador por el link y devuelve cuantas celdas
+    cambio. Las tareas (con el PDF) quedan en SQLite hasta completarse: la subida es por partes
+    de `chunk` bytes y la URI de la sesion reanudable se guarda despues de cada parte, asi que
+    un error de red o un reinicio retoman desde la ultima parte confirmada. Los errores se
+    reintentan con backoff exponencial hasta `max_intentos`; despues la tarea queda fallida
+    hasta `reintentar` o hasta que se vuelva a encolar el mismo PDF. `get_drive()` devuelve el servicio de Drive (o uno falso en pruebas) y
+    `media(pdf, chunk)` arma el media_body. Con `indice` (indices.IndiceDrive) un PDF que ya
+    esta en la carpeta no se vuelve a subir.
+    """
+
+    def __init__(self, get_drive, carpeta, rellenar, indice=None, ruta=".cache/subidas_drive.db", chunk=CHUNK, media=media_drive,
+                 max_intentos=8, backoff_base=5.0, backoff_max=300.0, espera=5.0, medir=None):
+        self.get_drive = get_drive
+        self.carpeta = carpeta
+        self.rellenar = rellenar
+        self.indice = indice
+        self.chunk = chunk
+        self.media = media
+        self.max_intentos = max_intentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.espera = espera
+        self.medir = medir or (lambda op: nullcontext())
+        self.stats = {"encoladas": 0, "subidas": 0, "reusadas": 0, "fallos": 0, "bytes": 0, "ultimo_error": None}
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._detener = threading.Event()
+        self._hilo = None
+        if os.path.dirname(ruta):
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        self._db = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""CREATE TABLE IF NOT EXISTS subidas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, nombre TEXT NOT NULL, marcador TEXT NOT NULL, pdf BLOB, tamano INTEGER NOT NULL,
+            estado TEXT NOT NULL DEFAULT 'pendiente', subido INTEGER NOT NULL DEFAULT 0, uri TEXT, link TEXT,
+            intentos INTEGER NOT NULL DEFAULT 0, proximo REAL NOT NULL DEFAULT 0, error TEXT, creado REAL NOT NULL)""")
+        # Una subida que quedo a medias en la corrida anterior se retoma desde su URI
+        self._db.execute("UPDATE subidas SET estado = 'pendiente' WHERE estado = 'subiendo'")
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._detener.clear()
+                self._hilo = threading.Thread(target=self._bucle, daemon=True, name="subidas-drive")
+                self._hilo.start()
+        self._hay_trabajo.set()
+        return self
+
+    def detener(self, timeout=5.0):
+        self._detener.set()
+        self._hay_trabajo.set()
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+    def link_existente(self, pdf):
+        """Link del PDF si ya esta en la carpeta (por contenido), para no pasar por la cola."""
+        archivo = self.indice.buscar(hashlib.md5(pdf).hexdigest()) if self.indice is not None else None
+        return archivo.get("webViewLink", "") if archivo else None
+
+    def encolar(self, nombre, pdf, marcador=None):
+        """Guarda el PDF en disco y vuelve enseguida con el marcador; la subida la hace el hilo de fondo."""
+        marcador = marcador or marcador_subida(pdf)
+        with self._lock:
+            previa = self._db.execute("SELECT id, estado, link FROM subidas WHERE marcador = ? AND estado != 'lista' ORDER BY id DESC",
+                                      (marcador,)).fetchone()
+            if previa is None:
+                self._db.execute("INSERT INTO subidas (nombre, marcador, pdf, tamano, creado) VALUES (?, ?, ?, ?, ?)",
+                                 (nombre, marcador, pdf, len(pdf), time.time()))
+                self.stats["encoladas"] += 1
+            elif previa[1] == "fallida":
+                # El mismo PDF de una subida que fallo: se reactiva esa tarea (de cero, su sesion puede haber vencido)
+                id_tarea, _, link = previa
+                self._db.execute("UPDATE subidas SET estado = ?, nombre = ?, pdf = ?, uri = NULL, subido = 0, intentos = 0, proximo = 0, error = NULL, "
+                                 "creado = ? WHERE id = ?", ("rellenando" if link else "pendiente", nombre, None if link else pdf, time.time(), id_tarea))
+                self.stats["encoladas"] += 1
+            # Si no, ya hay una subida en curso del mismo PDF (dos veces en un lote): esa rellena todas sus celdas
+        self._hay_trabajo.set()
+        return marcador
+
+    def reintentar(self):
+        """Vuelve a poner en cola las fallidas y adelanta las que esperaban su backoff."""
+        with self._lock:
+            # Las que ya tenian link (fallo el relleno de la celda) vuelven a rellenar, no a subir
+            self._db.execute("UPDATE subidas SET estado = CASE WHEN link IS NOT NULL THEN 'rellenando' ELSE 'pendiente' END, "
+                             "intentos = 0, proximo = 0 WHERE estado = 'fallida'")
+            self._db.execute("UPDATE subidas SET proximo = 0 WHERE estado != 'lista'")
+        self._hay_trabajo.set()
+
+    def estado(self, desde=None):
+        """Una fila por subida (las de las ultimas 24 h, o desde `desde`), para la grilla de la UI."""
+        desde = time.time() - 86400 if desde is None else desde
+        with self._lock:
+            filas = self._db.execute("SELECT nombre, estado, subido, tamano, intentos, error, link, creado FROM subidas WHERE creado >= ? ORDER BY id",
+                                     (desde,)).fetchall()
+        return [{"Archivo": n, "Estado": e, "Progreso": min(round(100 * s / t), 100) if t else 100, "Intentos": i, "Error": err or "", "Link": link or "",
+                 "Encolado": datetime.fromtimestamp(c).strftime("%d/%m %H:%M")} for n, e, s, t, i, err, link, c in filas]
+
+    def pendientes(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM subidas WHERE estado NOT IN ('lista', 'fallida')").fetchone()[0]
+
+    def vaciar(self, ahora=None):
+        """Procesa las tareas listas para salir. Devuelve cuantas terminaron."""
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            ids = [i for (i,) in self._db.execute(
+                "SELECT id FROM subidas WHERE estado IN ('pendiente', 'rellenando') AND proximo <= ? ORDER BY id", (ahora,))]
+        return sum(self._procesar(i) for i in ids)
+
+    def _sumar(self, **cuantos):
+        with self._lock:
+            for clave, n in cuantos.items():
+                self.stats[clave] += n
+
+    def _error(self, texto):
+        with self._lock:
+            self.stats["ultimo_error"] = f"{datetime.now():%H:%M:%S} {texto}"
+
+    def _actualizar(self, id_tarea, **campos):
+        with self._lock:
+            self._db.execute(f"UPDATE subidas SET {', '.join(f'{c} = ?' for c in campos)} WHERE id = ?", (*campos.values(), id_tarea))
+
+    def _procesar(self, id_tarea):
+        with self._lock:
+            nombre, marcador, pdf, estado, uri, subido, link, intentos = self._db.execute(
+                "SELECT nombre, marcador, pdf, estado, uri, subido, link, intentos FROM subidas WHERE id = ?", (id_tarea,)).fetchone()
+        try:
+            if estado == "pendiente":
+                self._actualizar(id_tarea, estado="subiendo")
+                link = self.link_existente(pdf)
+                if link is not None:
+                    self._sumar(reusadas=1)
+                else:
+                    link = self._subir(id_tarea, nombre, pdf, uri, subido)
+                # El PDF ya esta en Drive: no hace falta seguir guardandolo
+                self._actualizar(id_tarea, estado="rellenando", link=link, pdf=None, subido=len(pdf), intentos=0, error=None)
+            with self.medir("rellenar_link_pdf"):
+                celdas = self.rellenar(marcador, link)
+            if not celdas:
+                raise LookupError(f"no se encontro la fila con {marcador!r}")
+        except Exception as e:
+            intentos += 1
+            tope = MAX_INTENTOS_FILA if isinstance(e, LookupError) else self.max_intentos
+            self._actualizar(id_tarea, estado="fallida" if intentos >= tope else ("rellenando" if link else "pendiente"),
+                             intentos=intentos, error=repr(e), proximo=time.time() + min(self.backoff_base * 2 ** (intentos - 1), self.backoff_max))
+            self._sumar(fallos=1)
+            self._error(f"{nombre}: {e!r}")
+            return 0
+        self._actualizar(id_tarea, estado="lista", error=None)
+        return 1
+
+    def _subir(self, id_tarea, nombre, pdf, uri, subido):
+        pedido = self.get_drive().files().create(
+            body={"name": nombre, "parents": [self.carpeta]}, media_body=self.media(pdf, self.chunk),
+            fields=IndiceDrive.CAMPOS, supportsAllDrives=True)
+        if uri:
+            # Sesion de una corrida o un intento anterior: el servidor confirma desde donde seguir
+            pedido.resumable_uri, pedido.resumable_progress = uri, subido
+        respuesta = None
+        while respuesta is None:
+            with self.medir("drive.next_chunk"):
+                progreso, respuesta = pedido.next_chunk()
+            # Se guarda la sesion en cada parte para poder retomarla si algo se corta
+            self._actualizar(id_tarea, uri=pedido.resumable_uri, subido=pedido.resumable_progress if respuesta is None else len(pdf))
+        self._sumar(subidas=1, bytes=len(pdf))
+        if self.indice is not None:
+            self.indice.agregar(respuesta)
+        return respuesta.get("webViewLink", "")
+
+    def _bucle(self):
+        while not self._detener.is_set():
+            self._hay_trabajo.wait(self.espera)
+            self._hay_trabajo.clear()
+            try:
+                while self.vaciar():
+                    pass
+            except Exception as e:
+                self._error(repr(e))
+
@@ -0,0 +1,149 @@
+import numpy as np
+import pandas as pd
+
+CARGOS_EMISION = 0.15
+APTITUD_ATERRIZAJE = "Aptitud de aterrizaje en pistas no autorizadas"
+FACTORES_BARRIDO = (0.8, 0.9, 1.0, 1.1, 1.2)
+
+TASAS_AERONAVE = {
+    "Privado / Otro": {
+        "principales": [
+            {"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 1.50, "Capital (USD)": 0},
+            {"Cobertura": "RC hacia Terceros (Excepto pasajeros)", "Tasa (%)": 0.50, "Capital (USD)": 0},
+            {"Cobertura": "Responsabilidad Civil Legal de Carga", "Tasa (%)": 0.50, "Capital (USD)": 0},
+        ],
+        "accidentes": [
+            {"Cobertura": "Accidente Personales Tripulantes", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
+            {"Cobertura": "Accidente Personales Pasajeros", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
+        ],
+    },
+    "Agrícola": {
+        "principales": [
+            {"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 3.00, "Capital (USD)": 0},
+            {"Cobertura": "RC hacia Terceros (Excepto pasajeros)", "Tasa (%)": 0.50, "Capital (USD)": 0},
+            {"Cobertura": "Responsabilidad Civil Danos Quimicos", "Tasa (%)": 3.00, "Capital (USD)": 0},
+        ],
+        "accidentes": [
+            {"Cobertura": "Accidente Personales Tripulantes", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
+            {"Cobertura": "Accidente Personales Pasajeros", "Tasa (%)": 0.30, "Asientos": 1, "Capital (USD)": 0},
+        ],
+    },
+    "Escuela e Instrucción": {
+        "principales": [
+            {"Cobertura": "Perdida o Dano de la Aeronave", "Tasa (%)": 2.50, "Capital (USD)": 0},
+            {"Cobertura": "RC hacia Terceros (Excepto pasajeros)", "Tasa (%)": 0.50, "Capital (USD)": 0},
+        ],
+        "accidentes": [],
+    },
+}
+
+
+def redondear(x):
+    """round(x, 2) de Python elemento a elemento.
+
+    np.round multiplica por 100 y redondea, y cerca de un ,xx5 puede caer del otro lado que
+    round(); esos casos (raros) se resuelven con round() para que los montos den identicos.
+    """
+    x = np.asarray(x, dtype=float)
+    r = np.round(x, 2)
+    dudosos = np.abs(np.abs(x * 100) % 1 - 0.5) < 1e-6
+    if dudosos.any():
+        r[dudosos] = [round(v, 2) for v in x[dudosos].tolist()]
+    return r
+
+
+def _numeros(valores):
+    # Celdas vacias valen 0. None ya valia 0 por el `or 0` del calculo original; NaN (una celda
+    # numerica borrada en el data_editor) antes daba un total "nan", o un error en Asientos, y ahora tambien vale 0
+    v = np.array(valores, dtype=float)
+    v[np.isnan(v)] = 0.0
+    return v
+
+
+def lineas_aeronave(principales, accidentes=None):
+    """Coberturas principales y de accidentes en columnas numpy, en el orden de cotizacion.
+
+    Acepta DataFrames (lo que devuelve el data_editor) o listas de dicts (TASAS_AERONAVE, propuestas guardadas).
+    Tasa, asientos o capital vacios (None o NaN) cuentan como 0.
+    """
+    coberturas, tasas, asientos, capitales = [], [], [], []
+    for tabla, con_asientos in ((principales, False), (accidentes, True)):
+        if tabla is None or len(tabla) == 0:
+            continue
+        n = len(tabla)
+        if isinstance(tabla, pd.DataFrame):
+            # Tablas chicas: un solo to_numpy sale mas barato que pedirle cada columna a pandas
+            valores = tabla.to_numpy()
+            cols = {c: valores[:, i] for i, c in enumerate(tabla.columns)}
+        else:
+            cols = {c: [f.get(c) for f in tabla] for c in ("Cobertura", "Tasa (%)", "Asientos", "Capital (USD)")}
+        vacia = np.zeros(n)
+        coberturas += [str(c) for c in cols.get("Cobertura", [""] * n)]
+        tasas.append(_numeros(cols.get("Tasa (%)", vacia)))
+        asientos.append(_numeros(cols.get("Asientos", vacia)).astype(int) if con_asientos else np.zeros(n, dtype=int))
+        capitales.append(_numeros(cols.get("Capital (USD)", vacia)))
+    unir = lambda partes, tipo: np.concatenate(partes) if partes else np.zeros(0, dtype=tipo)
+    return {"Cobertura": coberturas, "Tasa (%)": unir(tasas, float), "Asientos": unir(asientos, int), "Capital": unir(capitales, float)}
+
+
+def costos_lineas(capital, tasa):
+    return redondear(np.asarray(capital, dtype=float) * np.asarray(tasa, dtype=float) / 100)
+
+
+def totales(costos):
+    """Subtotal, cargos de emision y total por fila de una matriz de costos (una cotizacion por fila).
+
+    El subtotal se acumula de izquierda a derecha (cumsum, no la suma por pares de np.sum) para
+    que coincida al centavo con el `subtotal += costo` de siempre; el relleno con ceros al final
+    no cambia la suma.
+    """
+    costos = np.atleast_2d(np.asarray(costos, dtype=float))
+    subtotal = np.cumsum(costos, axis=1)[:, -1] if costos.shape[1] else np.zeros(costos.shape[0])
+    cargos = redondear(subtotal * CARGOS_EMISION)
+    return subtotal, cargos, redondear(subtotal + cargos)
+
+
+# ==========================================
+# COTIZACION
+# ==========================================
+def cotizar(principales, accidentes=None, aptitud=True):
+    """Cotizacion de una aeronave: filas para la propuesta, subtotal, cargos (15%) y total."""
+    lineas = lineas_aeronave(principales, accidentes)
+    costos = costos_lineas(lineas["Capital"], lineas["Tasa (%)"])
+    subtotal, cargos, total = (float(v[0]) for v in totales(costos))
+    filas = [{"Cobertura": c, "Tasa (%)": t, "Asientos": a, "Capital": k, "Costo": x} for c, t, a, k, x in zip(
+        lineas["Cobertura"], lineas["Tasa (%)"].tolist(), lineas["Asientos"].tolist(), lineas["Capital"].tolist(), costos.tolist())]
+    if aptitud:
+        filas.append({"Cobertura": APTITUD_ATERRIZAJE, "Tasa (%)": 0, "Asientos": 0, "Capital": 0, "Costo": 0})
+    return {"filas": filas, "subtotal": subtotal, "cargos": cargos, "total": total}
+
+
+def cotizar_lote(lineas, por="Aeronave"):
+    """Muchas aeronaves de una vez. `lineas` trae una fila por cobertura, con la columna `por`
+    identificando la aeronave y "Tasa (%)" / "Capital (USD)" (el orden de las filas es el de
+    cotizacion). Devuelve (costo de cada linea, DataFrame por aeronave con Subtotal, Cargos y Total).
+    """
+    lineas = lineas if isinstance(lineas, pd.DataFrame) else pd.DataFrame(lineas)
+    n = len(lineas)
+    costos = costos_lineas(*(_numeros(pd.to_numeric(lineas[c])) if c in lineas.columns else np.zeros(n) for c in ("Capital (USD)", "Tasa (%)")))
+    codigos, aeronaves = pd.factorize(lineas[por].to_numpy(), sort=False)
+    # Posicion de cada linea dentro de su aeronave, para armar una matriz aeronaves x lineas
+    orden = np.argsort(codigos, kind="stable")
+    inicios = np.searchsorted(codigos[orden], codigos[orden])
+    posicion = np.empty(n, dtype=int)
+    posicion[orden] = np.arange(n) - inicios
+    matriz = np.zeros((len(aeronaves), posicion.max() + 1 if n else 0))
+    matriz[codigos, posicion] = costos
+    subtotal, cargos, total = totales(matriz)
+    return pd.Series(costos, index=lineas.index, name="Costo"), pd.DataFrame(
+        {"Subtotal": subtotal, "Cargos": cargos, "Total": total}, index=pd.Index(aeronaves, name=por))
+
+
+def barrido_tasas(principales, accidentes=None, factores=FACTORES_BARRIDO, coberturas=None):
+    """Que pasa con el precio si las tasas se multiplican por cada factor (todas, o solo `coberturas`)."""
+    lineas = lineas_aeronave(principales, accidentes)
+    factores = np.asarray(factores, dtype=float)
+    aplica = np.array([c in coberturas for c in lineas["Cobertura"]], dtype=bool) if coberturas else True
+    tasas = np.where(aplica, lineas["Tasa (%)"] * factores[:, None], lineas["Tasa (%)"])
+    subtotal, cargos, total = totales(costos_lineas(lineas["Capital"], tasas))
+    return pd.DataFrame({"Factor": factores, "Subtotal": subtotal, "Cargos": cargos, "Total": total})
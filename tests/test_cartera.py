@@ -0,0 +1,295 @@
+import json
+import threading
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cartera import COL_ASEGURADO, FILAS_VERIFICADAS, CargadorCartera, IndiceBusqueda, IndiceVencimientos, ModeloCartera
+from simulacion.datos import ENCABEZADO_CARTERA, cartera_sintetica, filas_sinteticas
+from simulacion.dobles import FuenteFalsa
+from simulacion.referencia import buscar_antes, filtrar_antes, historial_poliza_antes, opciones_antes
+
+
+def test_calendario_no_junta_la_misma_semana_de_otro_anio():
+    # 06/01/2020 y 06/01/2025 son lunes: con el rotulo "%d/%m" eran la misma semana
+    fin = pd.Series(pd.to_datetime(["2020-01-06 00:00:00", "2020-01-08 00:00:00", "2025-01-06 00:00:00", "2025-01-10 15:00:00"]))
+    indice = IndiceVencimientos(fin, pd.Series([100.0, 200.0, 300.0, 400.0]))
+    tabla = indice.calendario(indice.rango("2019-01-01", "2026-01-01"))
+    assert tabla["Semana"].tolist() == ["06/01/20", "06/01/20", "06/01/25", "06/01/25"]
+    assert tabla["Inicio"].is_monotonic_increasing
+    assert tabla.groupby("Semana")["Pólizas"].sum().to_dict() == {"06/01/20": 2, "06/01/25": 2}
+    assert tabla.loc[tabla["Día"] == "Vie", "Premio USD"].tolist() == [400.0]
+
+
+def test_por_periodo_semanal_agrupa_por_lunes():
+    fin = pd.Series(pd.to_datetime(["2025-01-06 00:00:00", "2025-01-12 23:00:00", "2025-01-13 00:00:00"]))
+    indice = IndiceVencimientos(fin, pd.Series([1.0, 2.0, 4.0]))
+    tabla = indice.por_periodo(np.arange(3), "W")
+    assert tabla["Periodo"].tolist() == [pd.Timestamp("2025-01-06"), pd.Timestamp("2025-01-13")]
+    assert tabla["Premio USD"].tolist() == [3.0, 4.0]
+
+
+def test_rango_incluye_el_ultimo_dia_con_hora():
+    fin = pd.Series(pd.to_datetime(["2025-03-01 00:00:00", "2025-03-10 09:30:00", "2025-03-10 23:59:00", "2025-03-11 00:00:00"]))
+    indice = IndiceVencimientos(fin, pd.Series([1.0, 2.0, 4.0, 8.0]))
+    assert indice.rango("2025-03-01", "2025-03-10").tolist() == [0, 1, 2]
+    assert indice.rango("2025-03-10 12:00", "2025-03-10").tolist() == [1, 2]
+    assert indice.proximos(9, hoy=date(2025, 3, 1)) == (3, 7.0)
+
+
+def _cargador(n=50):
+    fuente = FuenteFalsa([ENCABEZADO_CARTERA] + filas_sinteticas(n))
+    cargador = CargadorCartera(fuente, intervalo_chequeo=0)
+    cargador.obtener()
+    return fuente, cargador
+
+
+def _polizas(df):
+    return df["N° de Póliza"].tolist()
+
+
+def test_solo_filas_nuevas_se_agregan_sin_recargar():
+    fuente, cargador = _cargador()
+    leidas = fuente.filas_leidas
+    fuente.cambiar(lambda filas: filas.extend(filas_sinteticas(3, semilla=1)))
+    df = cargador.obtener()
+    assert cargador.stats["completas"] == 1 and cargador.stats["incrementales"] == 1
+    assert fuente.filas_leidas - leidas == FILAS_VERIFICADAS + 3
+    assert _polizas(df) == [str(f[7]) for f in fuente.filas[1:]]
+
+
+@pytest.mark.parametrize("cambio", [
+    lambda filas: filas.__setitem__(slice(-1, None), [filas[-1][:6] + ["EDITADO"] + filas[-1][7:]]),
+    lambda filas: filas.pop(30),
+    lambda filas: filas.pop(),
+], ids=["edicion", "borrado", "borrado_ultima"])
+def test_edicion_o_borrado_con_filas_nuevas_recarga(cambio):
+    fuente, cargador = _cargador()
+    def editar_y_agregar(filas):
+        cambio(filas)
+        filas.extend(filas_sinteticas(3, semilla=1))
+    fuente.cambiar(editar_y_agregar)
+    df = cargador.obtener()
+    assert cargador.stats["completas"] == 2 and cargador.stats["verificaciones_fallidas"] == 1
+    assert _polizas(df) == [str(f[7]) for f in fuente.filas[1:]]
+    assert df["Ramo"].tolist() == [f[6] for f in fuente.filas[1:]]
+
+
+def test_pocas_filas_verifica_con_el_encabezado():
+    fuente, cargador = _cargador(2)
+    for semilla in (1, 2):
+        fuente.cambiar(lambda filas: filas.extend(filas_sinteticas(2, semilla=semilla)))
+        cargador.obtener()
+    assert cargador.stats["completas"] == 1 and cargador.stats["incrementales"] == 2
+    assert len(cargador.df) == 6
+
+
+def test_snapshot_sin_huella_recarga(tmp_path):
+    pytest.importorskip("pyarrow")
+    ruta = str(tmp_path / "cartera.parquet")
+    fuente = FuenteFalsa([ENCABEZADO_CARTERA] + filas_sinteticas(20))
+    CargadorCartera(fuente, ruta_snapshot=ruta).obtener()
+    with open(ruta + ".json", encoding="utf-8") as fh:
+        meta = json.load(fh)
+    meta.pop("ultimas")
+    with open(ruta + ".json", "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    fuente.cambiar(lambda filas: filas.extend(filas_sinteticas(2, semilla=1)))
+    cargador = CargadorCartera(fuente, ruta_snapshot=ruta)
+    cargador.precargar()
+    cargador._hilo.join()
+    assert len(cargador.df) == 22
+    assert cargador.stats["desde_disco"] == 1 and cargador.stats["completas"] == 1
+
+
+def _modelo_con_repetidos():
+    # Renovaciones: el mismo asegurado con varias polizas, algunas sin ramo o sin detalle
+    df_raw = cartera_sintetica(300)
+    for i in range(0, 300, 3):
+        df_raw.iloc[i, 2] = df_raw.iloc[0, 2]
+        if i % 9 == 0:
+            df_raw.iloc[i, 6] = ""
+        if i % 15 == 0:
+            df_raw.iloc[i, 8] = ""
+    return ModeloCartera(df_raw)
+
+
+@pytest.mark.parametrize("posicion", [0, 3, 6, 9, 15, 30, 45, 1, 2])
+def test_historial_poliza_igual_que_la_mascara(posicion):
+    modelo = _modelo_con_repetidos()
+    fila = modelo.df.iloc[posicion]
+    esperado = historial_poliza_antes(modelo.df, fila)
+    assert modelo.historial.poliza(fila).index.tolist() == esperado.index.tolist()
+
+
+def test_historial_poliza_con_ramo_y_detalle_vacios_trae_todo_el_asegurado():
+    modelo = _modelo_con_repetidos()
+    fila = modelo.df.iloc[0].copy()
+    fila["Ramo"] = fila["Detalle (Matricula o Referencia)"] = ""
+    assert len(modelo.historial.poliza(fila)) == 100
+    fila["Asegurado (Nombre/Razón Social)"] = ""
+    assert modelo.historial.poliza(fila).empty
+
+
+@pytest.mark.parametrize("seleccion", [
+    {},
+    {"Ejecutivo": "RDF"},
+    {"Ejecutivo": "RDF", "Aseguradora": "BSE"},
+    {"Aseguradora": "SURA", "Ramo": "HOGAR", "Corredor": ""},
+    {"Agente": "AG1", "Ramo": "NO EXISTE"},
+    {"Ejecutivo": "Todos", "Ramo": "VIDA"},
+])
+@pytest.mark.parametrize("estado", ["Todas", "Vigentes", "No vigentes"])
+def test_filtros_iguales_que_las_mascaras(seleccion, estado):
+    modelo = ModeloCartera(cartera_sintetica(500))
+    esperado = filtrar_antes(modelo.df, seleccion, estado)
+    assert modelo.vista(seleccion, estado).index.tolist() == esperado.index.tolist()
+
+
+def test_opciones_de_filtro_iguales_que_antes():
+    df_raw = cartera_sintetica(200)
+    modelo = ModeloCartera(df_raw)
+    assert all(modelo.filtros.opciones[c] == opciones_antes(df_raw, c) for c in modelo.dimensiones)
+
+
+@pytest.fixture(scope="module")
+def modelo_busqueda():
+    return ModeloCartera(cartera_sintetica(600))
+
+
+def _filas(df):
+    return set(df.index)
+
+
+@pytest.mark.parametrize("busq, como_antes", [
+    ("González", "gonzález"),
+    ("lucía", "lucía"),
+    ("gonz", "gonz"),
+    ("rodr", "rodr"),
+    ("gonzalez", "gonzález"),
+    ("LUCIA", "lucía"),
+    ("gonzales", "gonzález"),
+    ("rodriges", "rodríguez"),
+])
+def test_busqueda_igual_que_contains(modelo_busqueda, busq, como_antes):
+    # Exacto, prefijo, sin tildes y con una o dos letras cambiadas: las mismas filas que el contains con la palabra bien escrita
+    esperado = _filas(buscar_antes(modelo_busqueda.df, como_antes))
+    assert esperado and _filas(modelo_busqueda.buscar(busq)) == esperado
+
+
+def test_busqueda_todos_los_terminos_y_exactos_primero(modelo_busqueda):
+    df = modelo_busqueda.df
+    assert _filas(modelo_busqueda.buscar("maria rodriguez")) == _filas(buscar_antes(df, "maría")) & _filas(buscar_antes(df, "rodríguez"))
+    # "martin" es exacto para Martín, prefijo para Martínez y parecido (2 letras) para María
+    filas = modelo_busqueda.buscar("martin")
+    assert _filas(filas) == _filas(buscar_antes(df, "martín")) | _filas(buscar_antes(df, "maría"))
+    nombres = filas[COL_ASEGURADO]
+    puntaje = np.where(nombres.str.contains(r"Martín\b"), 3, np.where(nombres.str.contains("Martínez"), 2, 1))
+    assert set(puntaje) == {1, 2, 3} and (np.diff(puntaje) <= 0).all()
+
+
+def test_busqueda_extendida_igual_que_armada_de_cero():
+    df_raw = cartera_sintetica(300)
+    modelo = ModeloCartera(df_raw.iloc[:100])
+    indice = modelo.busqueda
+    for fin in range(120, 301, 20):
+        modelo = ModeloCartera(df_raw.iloc[:fin], anterior=modelo)
+        assert modelo.busqueda is not indice
+    assert indice.n == 100 and len(modelo.busqueda.bloques) <= IndiceBusqueda.MAX_DELTAS
+    nuevo = ModeloCartera(df_raw)
+    for busq in ["gonzalez", "rod", "sofia garcia", "cliente250", "nunes", "100299"]:
+        assert modelo.buscar(busq).index.tolist() == nuevo.buscar(busq).index.tolist()
+
+
+def _con_snapshot(tmp_path, n=50, **kw):
+    pytest.importorskip("pyarrow")
+    ruta = str(tmp_path / "cartera.parquet")
+    fuente = FuenteFalsa([ENCABEZADO_CARTERA] + filas_sinteticas(n))
+    CargadorCartera(fuente, ruta_snapshot=ruta).obtener()
+    return fuente, ruta
+
+
+def test_snapshot_se_guarda_solo_en_recargas_completas(tmp_path):
+    fuente, ruta = _con_snapshot(tmp_path)
+    cargador = CargadorCartera(fuente, intervalo_chequeo=0, ruta_snapshot=ruta)
+    cargador.obtener(forzar=True)
+    fuente.cambiar(lambda filas: filas.extend(filas_sinteticas(3, semilla=1)))
+    assert len(cargador.obtener()) == 53 and cargador.stats["incrementales"] == 1
+    assert len(pd.read_parquet(ruta)) == 50
+    # Al reiniciar, las filas que faltan en el disco entran con la sincronizacion incremental
+    cargador = CargadorCartera(fuente, ruta_snapshot=ruta)
+    cargador.precargar()
+    cargador._hilo.join()
+    assert len(cargador.df) == 53 and cargador.stats["completas"] == 0 and cargador.stats["incrementales"] == 1
+
+
+@pytest.mark.parametrize("edad, completas", [(0, 0), (2000, 1)])
+def test_edad_de_la_recarga_completa_sobrevive_al_reinicio(tmp_path, edad, completas):
+    fuente, ruta = _con_snapshot(tmp_path)
+    with open(ruta + ".json", encoding="utf-8") as fh:
+        meta = json.load(fh)
+    meta["completa"] -= edad
+    with open(ruta + ".json", "w", encoding="utf-8") as fh:
+        json.dump(meta, fh)
+    fuente.cambiar(lambda filas: filas.extend(filas_sinteticas(2, semilla=1)))
+    cargador = CargadorCartera(fuente, intervalo_chequeo=0, max_edad=900, ruta_snapshot=ruta)
+    cargador.precargar()
+    cargador._hilo.join()
+    assert cargador.stats["completas"] == 0
+    # La reconciliacion incremental no cuenta como recarga completa
+    cargador.obtener()
+    assert cargador.stats["completas"] == completas
+
+
+def test_hits_durante_la_reconciliacion_no_esperan_ni_se_pierden(tmp_path):
+    fuente, ruta = _con_snapshot(tmp_path)
+    fuente.latencia = 0.5
+    fuente.cambiar(lambda filas: filas.extend(filas_sinteticas(2, semilla=1)))
+    cargador = CargadorCartera(fuente, ruta_snapshot=ruta)
+    cargador.precargar()
+    hilos = [threading.Thread(target=lambda: [cargador.obtener() for _ in range(50)]) for _ in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    assert cargador._hilo.is_alive() and cargador.stats["hits"] == 400
+    cargador._hilo.join()
+
+
+def _sin_conexion():
+    raise ConnectionError("sin red")
+
+
+@pytest.mark.parametrize("conexion", [True, False], ids=["reconcilia", "sin_conexion"])
+def test_modelo_desde_snapshot_igual_que_carga_nueva(tmp_path, conexion):
+    fuente, ruta = _con_snapshot(tmp_path, 200)
+    if conexion:
+        fuente.cambiar(lambda filas: filas.extend(filas_sinteticas(5, semilla=1)))
+    else:
+        fuente.revision = _sin_conexion
+    cargador = CargadorCartera(fuente, ruta_snapshot=ruta)
+    cargador.precargar()
+    cargador._hilo.join()
+    assert cargador.stats["desde_disco"] == 1 and (cargador.stats["error"] is None) == conexion
+    fresco = FuenteFalsa(fuente.filas)
+    esperado = ModeloCartera(CargadorCartera(fresco).obtener()).df
+    pd.testing.assert_frame_equal(cargador.modelo().df, esperado)
+
+
+def test_modelo_tipado_y_compacto():
+    df_raw = cartera_sintetica(2000)
+    crudo = df_raw.copy()
+    modelo = ModeloCartera(df_raw)
+    df = modelo.df
+    assert all(isinstance(df[c].dtype, pd.CategoricalDtype) for c in ["Ejecutivo", "Aseguradora", "Ramo", "Corredor", "Agente"])
+    assert modelo.dimensiones == ["Ejecutivo", "Aseguradora", "Ramo", "Corredor", "Agente"]
+    for c in ["Premio USD (IVA inc)", "Premio UYU (IVA inc)", "Premio_Total_USD"]:
+        assert df[c].dtype == np.float64
+    for c in ["Inicio de Vigencia", "Fin de Vigencia"]:
+        assert pd.api.types.is_datetime64_dtype(df[c]) and df[c].notna().all()
+    pd.testing.assert_frame_equal(df_raw, crudo)
+    reporte = modelo.reporte_memoria()
+    assert reporte["antes"] == df_raw.memory_usage(deep=True).sum() and reporte["despues"] == df.memory_usage(deep=True).sum()
+    assert 0 < reporte["reduccion"] < 1
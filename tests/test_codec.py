@@ -0,0 +1,20 @@
+import base64
+import json
+
+import pytest
+
+from codec import codificar, decodificar
+from simulacion.datos import propuestas_ejemplo
+
+
+@pytest.mark.parametrize("tipo", ["Individual", "Flota", "Aeronave", "RV"])
+def test_ida_y_vuelta(tipo):
+    propuesta = propuestas_ejemplo()[tipo]
+    nuevo = codificar(propuesta)
+    assert decodificar(nuevo) == propuesta
+    assert len(nuevo) < len(base64.b64encode(json.dumps(propuesta).encode()))
+
+
+def test_links_viejos_siguen_abriendo():
+    propuesta = propuestas_ejemplo()["Individual"]
+    assert decodificar(base64.b64encode(json.dumps(propuesta).encode()).decode()) == propuesta
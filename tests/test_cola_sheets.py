@@ -0,0 +1,92 @@
+import pytest
+
+from cola_sheets import ColaEscritura
+from simulacion.dobles import HojaFalsa
+
+
+def _cola(tmp_path, hojas, **kw):
+    return ColaEscritura(lambda h, filas: hojas[h].append_rows(filas), ruta=str(tmp_path / "cola.db"), backoff_base=0, **kw)
+
+
+def _vaciar(cola, veces=20):
+    for _ in range(veces):
+        cola.vaciar()
+
+
+def test_orden_por_hoja_con_fallos_reintentados(tmp_path):
+    hojas = {"Individuales": HojaFalsa(fallos=2), "Flotas": HojaFalsa()}
+    cola = _cola(tmp_path, hojas)
+    for i in range(20):
+        cola.encolar("Individuales" if i % 2 else "Flotas", [i, f"cotizacion {i}"])
+    _vaciar(cola)
+    assert cola.pendientes() == {}
+    assert [f[0] for f in hojas["Individuales"].filas] == list(range(1, 20, 2))
+    assert [f[0] for f in hojas["Flotas"].filas] == list(range(0, 20, 2))
+    # Un lote por hoja, mas los dos intentos fallidos
+    assert hojas["Flotas"].llamadas == 1 and hojas["Individuales"].llamadas == 3
+
+
+def test_ediciones_y_borrados_respetan_el_orden(tmp_path):
+    hoja, ops = HojaFalsa(), []
+    cola = ColaEscritura(lambda h, filas: ops.append(("append", [f[0] for f in filas])), ruta=str(tmp_path / "cola.db"),
+                         actualizar=lambda h, clave, fila: ops.append(("update", clave)), borrar=lambda h, clave: ops.append(("delete", clave)))
+    cola.encolar("H", [1])
+    cola.encolar("H", [2])
+    cola.encolar_edicion("H", "link1", [1, "editada"])
+    cola.encolar("H", [3])
+    cola.encolar_borrado("H", "link2")
+    _vaciar(cola)
+    assert ops == [("append", [1, 2]), ("update", "link1"), ("append", [3]), ("delete", "link2")]
+
+
+def test_lote_que_agota_intentos_pausa_su_hoja(tmp_path):
+    hojas = {"A": HojaFalsa(fallos=3), "B": HojaFalsa()}
+    cola = _cola(tmp_path, hojas, max_intentos=3, max_lote=2)
+    for i in range(4):
+        cola.encolar("A", [i])
+        cola.encolar("B", [i])
+    _vaciar(cola)
+    estado = cola.estado()
+    # El primer lote de A (2 filas) quedo fallido y lo que venia detras espera; B no se frena
+    assert estado["fallidas"] == {"A": 2} and estado["retenidas"] == {"A": 2} and estado["pendientes"] == {"A": 2}
+    assert hojas["A"].filas == [] and len(hojas["B"].filas) == 4 and hojas["A"].llamadas == 3
+    assert [f["Fila"] for f in cola.fallidas()] == ["[0]", "[1]"]
+    cola.reintentar_fallidas()
+    _vaciar(cola)
+    assert cola.estado()["fallidas"] == {} and [f[0] for f in hojas["A"].filas] == [0, 1, 2, 3]
+
+
+def test_edicion_no_pasa_al_append_fallido(tmp_path):
+    # Si la edicion saliera antes, no encontraria la fila y la agregaria: al reintentar quedaba duplicada
+    hoja, ops = HojaFalsa(fallos=2), []
+    def editar(h, clave, fila):
+        ops.append(("update", clave, [f[1] for f in hoja.filas].count(clave)))
+    cola = ColaEscritura(lambda h, filas: hoja.append_rows(filas), ruta=str(tmp_path / "cola.db"), backoff_base=0, max_intentos=2,
+                         actualizar=editar)
+    cola.encolar("H", [1, "link1"])
+    cola.encolar_edicion("H", "link1", [1, "link1", "editada"])
+    _vaciar(cola)
+    assert ops == [] and cola.estado()["retenidas"] == {"H": 1}
+    cola.reintentar_fallidas()
+    _vaciar(cola)
+    assert ops == [("update", "link1", 1)] and cola.pendientes() == {}
+
+
+def test_descartar_fallidas(tmp_path):
+    cola = _cola(tmp_path, {"A": HojaFalsa(fallos=10)}, max_intentos=2)
+    cola.encolar("A", [1])
+    _vaciar(cola)
+    assert cola.descartar_fallidas() == 1
+    assert cola.fallidas() == [] and cola.pendientes() == {}
+
+
+def test_operacion_sin_backend(tmp_path):
+    cola = _cola(tmp_path, {})
+    with pytest.raises(ValueError):
+        cola.encolar_edicion("H", "link", [1])
+    with pytest.raises(ValueError):
+        cola.encolar_borrado("H", "link")
+    # Lo que dejo otra corrida con backend de borrado no se puede abrir sin el
+    ColaEscritura(lambda h, f: None, ruta=str(tmp_path / "otra.db"), borrar=lambda h, c: None).encolar_borrado("H", "link")
+    with pytest.raises(ValueError):
+        ColaEscritura(lambda h, f: None, ruta=str(tmp_path / "otra.db"))
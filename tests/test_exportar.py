@@ -0,0 +1,93 @@
+import io
+import time
+import zipfile
+
+import pandas as pd
+import pytest
+
+from cartera import ModeloCartera
+from exportar import CacheExportaciones, exportar, exportar_campana, mensajes_renovacion
+from simulacion.datos import cartera_sintetica
+from simulacion.referencia import premio_antes
+
+
+def _columnas(modelo):
+    return {"asegurado": modelo.c_asegurado, "aseguradora": modelo.c_aseguradora, "ramo": modelo.c_ramo, "premio_usd": modelo.c_p_usd,
+            "premio_uyu": modelo.c_p_uyu, "celular": "Celular", "ejecutivo": "Ejecutivo"}
+
+
+def _premio(mensajes):
+    return mensajes["Mensaje"].str.extract(r"\*[^*]*: (.*)\*\.", expand=False)
+
+
+def _un_premio(uyu, usd):
+    df = pd.DataFrame({"Fin de Vigencia": [pd.Timestamp("2026-03-01")], "UYU": [uyu], "USD": [usd]}, dtype=object)
+    return _premio(mensajes_renovacion(df, {"premio_uyu": "UYU", "premio_usd": "USD"})).iloc[0]
+
+
+@pytest.mark.parametrize("uyu, usd", [
+    (1500, ""), ("1500", ""), ("", "USD 1.500"), ("$ 2.000", ""), ("", 750), (0, 300), ("0", "0"), ("", ""),
+    (None, None), (float("nan"), 1234567), ("12.500", 800), ("N/D", "2,500"),
+])
+def test_premio_igual_a_f_num(uyu, usd):
+    assert _un_premio(uyu, usd) == premio_antes(uyu, usd)
+
+
+@pytest.mark.parametrize("uyu, usd, ahora, antes", [
+    # f_num leia "1500.0" sin el punto: diez veces el premio
+    (1500.0, "", "UYU 1.500", "UYU 15.000"),
+    ("", 1234.6, "USD 1.235", "USD 12.346"),
+    (0.0, 300, "USD 300", "UYU 0"),
+    ("a confirmar", "", "a coordinar", "UYU a confirmar"),
+])
+def test_premio_diferencias_documentadas(uyu, usd, ahora, antes):
+    assert premio_antes(uyu, usd) == antes
+    assert _un_premio(uyu, usd) == ahora
+
+
+def test_mensajes_de_la_cartera_tipada():
+    modelo = ModeloCartera(cartera_sintetica(300))
+    df = modelo.df
+    mensajes = mensajes_renovacion(df, _columnas(modelo), "Asesor")
+    # Los premios de la cartera son enteros: se comparan contra f_num con su valor entero
+    enteros = lambda s: s.map(lambda v: "" if pd.isna(v) else int(v))
+    esperado = [premio_antes(u, d) for u, d in zip(enteros(df[modelo.c_p_uyu]), enteros(df[modelo.c_p_usd]))]
+    assert _premio(mensajes).tolist() == esperado
+    assert mensajes["Mensaje"].str.endswith("Asesor").all()
+    assert (mensajes["WhatsApp"].str.startswith("https://wa.me/5989")).all()
+
+
+def test_campana_zip_por_ejecutivo():
+    modelo = ModeloCartera(cartera_sintetica(200))
+    mensajes = mensajes_renovacion(modelo.df, _columnas(modelo), "Asesor")
+    with zipfile.ZipFile(io.BytesIO(exportar_campana(mensajes))) as zf:
+        nombres = zf.namelist()
+    assert sorted(nombres) == sorted(f"renovaciones_{e}.csv" for e in mensajes["Ejecutivo"].unique())
+
+
+def test_cache_genera_una_sola_vez():
+    df = ModeloCartera(cartera_sintetica(100)).df
+    cache = CacheExportaciones()
+    primero = cache.generar(("filtros", 1), df, "csv")
+    assert cache.generar(("filtros", 1), df, "csv") is primero
+    assert cache.stats == {"hits": 1, "generados": 1}
+
+
+# Los pedidos: miles de mensajes en alrededor de un segundo, y la exportacion del rango sin trabar
+# la app. El tope es holgado para maquinas de CI lentas; bench.py muestra los tiempos reales.
+def _segundos(fn):
+    t = time.perf_counter()
+    fn()
+    return time.perf_counter() - t
+
+
+def test_miles_de_mensajes_en_un_segundo():
+    modelo = ModeloCartera(cartera_sintetica(5000))
+    assert _segundos(lambda: mensajes_renovacion(modelo.df, _columnas(modelo), "Asesor")) < 2.0
+
+
+@pytest.mark.parametrize("formato", ["csv", "xlsx"])
+def test_exportar_rango_grande(formato):
+    pytest.importorskip("xlsxwriter") if formato == "xlsx" else None
+    df = ModeloCartera(cartera_sintetica(5000)).df
+    assert _segundos(lambda: exportar(df, formato)) < 5.0
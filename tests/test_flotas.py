@@ -0,0 +1,34 @@
+import io
+
+import pandas as pd
+
+from cartera import ModeloCartera
+from flotas import importar_flota, leer_planilla, resumen_vehiculos, totales_por_cobertura
+from simulacion.datos import cartera_sintetica, planilla_flota
+
+
+class Subida(io.BytesIO):
+    name = "flota.csv"
+
+
+def test_importar_marca_las_que_ya_estan_en_cartera():
+    cartera = ModeloCartera(cartera_sintetica(2000)).matriculas
+    df, avisos = importar_flota(leer_planilla(Subida(planilla_flota(500, cartera.index[:100].tolist()))), cartera)
+    assert len(df) == 500
+    en_cartera = avisos[avisos["Aviso"] == "Ya está en cartera"]
+    assert len(en_cartera) > 0
+
+
+def test_resumen_igual_al_original():
+    df, _ = importar_flota(leer_planilla(Subida(planilla_flota(300))))
+    antes = " | ".join([f"{r.get('Marca','')} {r.get('Modelo','')} {r.get('Matricula','')}" for _, r in df.iterrows() if r.get('Marca','')])
+    assert resumen_vehiculos(df) == antes
+
+
+def test_totales_por_cobertura():
+    df = pd.DataFrame([{"Marca": "Fiat", "Cobertura": "Total", "Contado": 100}, {"Marca": "VW", "Cobertura": "", "Contado": "50"},
+                       {"Marca": "VW", "Cobertura": "Total", "Contado": "x"}])
+    tabla = totales_por_cobertura(df)
+    assert tabla.to_dict("records") == [{"Cobertura": "Sin cobertura", "Vehiculos": 1, "Contado": 50.0},
+                                        {"Cobertura": "Total", "Vehiculos": 2, "Contado": 100.0},
+                                        {"Cobertura": "TOTAL FLOTA", "Vehiculos": 3, "Contado": 150.0}]
@@ -0,0 +1,23 @@
+from historial import CargadorHistorial
+from simulacion.datos import hojas_cotizaciones
+from simulacion.dobles import LibroFalso
+from simulacion.referencia import historial_antes
+
+
+def test_mismos_registros_que_la_lectura_original():
+    hojas = hojas_cotizaciones(500)
+    libro = LibroFalso(hojas)
+    almacen = CargadorHistorial(lambda: libro, intervalo_chequeo=0).almacen()
+    assert sorted(map(str, historial_antes(hojas))) == sorted(map(str, almacen))
+    assert libro.llamadas == 1
+
+
+def test_incremental_solo_agrega_lo_nuevo():
+    hojas = hojas_cotizaciones(500)
+    libro = LibroFalso(hojas)
+    cargador = CargadorHistorial(lambda: libro, intervalo_chequeo=0)
+    antes = len(cargador.almacen())
+    hojas["Cotizaciones Individuales"].filas.append(["02/01/2025", "Nuevo", "1", "", "", "", "", "RDF", "", "", "", "", "https://x/?q=n"])
+    almacen = cargador.almacen()
+    assert len(almacen) == antes + 1
+    assert any(almacen.obtener(pid)["n"] == "Nuevo" for pid in almacen.buscar(asegurado="nuevo"))
@@ -0,0 +1,57 @@
+import hashlib
+
+from indices import IndiceDrive, IndicePolizas
+from simulacion.dobles import ColumnaFalsa, DriveFalso, MediaFalsa
+
+
+def test_indice_polizas_lee_una_vez():
+    columna = ColumnaFalsa(1000)
+    indice = IndicePolizas(lambda: columna)
+    assert "1000007" in indice and "999" not in indice
+    indice.agregar(["9000000"])
+    assert "9000000" in indice and columna.llamadas == 1
+
+
+def test_indice_polizas_incremental_toma_filas_nuevas():
+    columna = ColumnaFalsa(1000)
+    indice = IndicePolizas(lambda: columna, intervalo_chequeo=0)
+    assert "1000999" in indice
+    columna.valores.append(["7777777"])
+    assert "7777777" in indice
+    assert indice.stats["lecturas"] == 1 and indice.stats["incrementales"] >= 1
+
+
+def _archivos(pdfs):
+    return [{"id": f"id{i}", "name": f"poliza_{i}.pdf", "md5Checksum": hashlib.md5(p).hexdigest(),
+             "webViewLink": f"https://drive/{i}", "createdTime": "2025-01-01T00:00:00.000Z"} for i, p in enumerate(pdfs)]
+
+
+def test_indice_drive_por_contenido_y_paginado():
+    pdfs = [bytes([i % 256, i // 256]) * 100 for i in range(2500)]
+    drive = DriveFalso(_archivos(pdfs))
+    indice = IndiceDrive(lambda: drive, "carpeta")
+    assert all(indice.buscar(hashlib.md5(p).hexdigest())["id"] == f"id{i}" for i, p in enumerate(pdfs[:20]))
+    assert drive.llamadas == 3
+    assert indice.buscar(hashlib.md5(b"otro").hexdigest()) is None
+
+
+def test_indice_drive_incremental_ve_lo_subido_por_fuera():
+    drive = DriveFalso(_archivos([b"a", b"b"]))
+    indice = IndiceDrive(lambda: drive, "carpeta")
+    assert indice.buscar(hashlib.md5(b"a").hexdigest()) is not None
+    drive.create({"name": "otro.pdf"}, MediaFalsa(b"nuevo por fuera de la app")).execute()
+    indice._chequeo = 0
+    assert indice.buscar(hashlib.md5(b"nuevo por fuera de la app").hexdigest())["name"] == "otro.pdf"
+    assert indice.stats["incrementales"] == 1
+
+
+def test_indice_drive_incremental_ve_lo_movido_o_copiado_a_la_carpeta():
+    # Conserva su createdTime viejo: solo modifiedTime dice que llego a la carpeta despues del ultimo chequeo
+    drive = DriveFalso(_archivos([b"a"]))
+    indice = IndiceDrive(lambda: drive, "carpeta")
+    assert indice.buscar(hashlib.md5(b"movido").hexdigest()) is None
+    drive.archivos.append({"id": "viejo", "name": "movido.pdf", "md5Checksum": hashlib.md5(b"movido").hexdigest(), "webViewLink": "https://drive/viejo",
+                           "createdTime": "2019-05-01T00:00:00.000Z", "modifiedTime": "2999-01-01T00:00:00.000Z"})
+    indice._chequeo = 0
+    assert indice.buscar(hashlib.md5(b"movido").hexdigest())["id"] == "viejo"
+    assert indice.stats["lecturas"] == 1
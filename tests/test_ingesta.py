@@ -0,0 +1,95 @@
+import random
+
+from ingesta import PROMPT_EXTRACCION, CacheExtracciones, ExtractorFalso, IngestaPolizas, fila_poliza, huella_extraccion, separar_repetidas
+
+
+def _pdfs(n, tamano=2000):
+    return [(f"poliza_{i:03d}.pdf", random.Random(i).randbytes(tamano)) for i in range(n)]
+
+
+def _terminar(lote):
+    for _ in lote.a_medida_que_terminan(timeout=10):
+        pass
+    return lote
+
+
+def test_lote_con_un_error():
+    ingesta = IngestaPolizas(ExtractorFalso(fallan={"poliza_005.pdf"}), max_hilos=4, por_minuto=0, reintentos=1, backoff=0)
+    lote = _terminar(ingesta.procesar(_pdfs(12)))
+    assert lote.completo()
+    assert lote.con_error() == [5] and len(lote.listos()) == 11
+    assert ingesta.stats["reintentos"] == 1 and ingesta.stats["ok"] == 11 and ingesta.stats["errores"] == 1
+    assert [f["Archivo"] for f in lote.revision()] == [n for n, _ in _pdfs(12) if n != "poliza_005.pdf"]
+
+
+def test_cache_sobrevive_reinicios(tmp_path):
+    ruta, pdfs = str(tmp_path / "extracciones.db"), _pdfs(8)
+    primero = ExtractorFalso()
+    _terminar(IngestaPolizas(primero, por_minuto=0, cache=CacheExtracciones(ruta)).procesar(pdfs))
+    segundo = ExtractorFalso()
+    lote = _terminar(IngestaPolizas(segundo, por_minuto=0, cache=CacheExtracciones(ruta)).procesar(pdfs))
+    assert primero.llamadas == 8 and segundo.llamadas == 0
+    assert lote.desde_cache() == 8
+
+
+def test_cache_no_se_reusa_con_otro_modelo_o_prompt(tmp_path):
+    cache, pdfs = CacheExtracciones(str(tmp_path / "extracciones.db")), _pdfs(3)
+    huellas = [huella_extraccion("modelo-a"), huella_extraccion("modelo-b"), huella_extraccion("modelo-a", PROMPT_EXTRACCION + "\n- otra regla")]
+    assert len(set(huellas)) == 3
+    llamadas = []
+    for huella in huellas + huellas[:1]:
+        extractor = ExtractorFalso()
+        extractor.huella = huella
+        _terminar(IngestaPolizas(extractor, por_minuto=0, cache=cache).procesar(pdfs))
+        llamadas.append(extractor.llamadas)
+    assert llamadas == [3, 3, 3, 0] and len(cache) == 9
+
+
+def test_cache_descarta_las_menos_usadas(tmp_path):
+    cache = CacheExtracciones(str(tmp_path / "chica.db"), max_entradas=10)
+    for i in range(25):
+        cache.guardar(f"clave{i}", {"nro_poliza": i})
+        if i >= 3:
+            cache.obtener("clave0")
+    assert len(cache) == 10 and cache.stats["descartadas"] == 15
+    assert cache.obtener("clave0") == {"nro_poliza": 0}
+
+
+def test_separar_repetidas():
+    polizas = [{"nro_poliza": "1"}, {"nro_poliza": "2"}, {"nro_poliza": " 2 "}, {"nro_poliza": None}, {"nro_poliza": None}]
+    nuevas, repetidas = separar_repetidas(polizas, {"1"})
+    assert nuevas == [polizas[1], polizas[3], polizas[4]]
+    assert repetidas == [polizas[0], polizas[2]]
+
+
+def test_fila_poliza_en_orden_del_formulario():
+    fila = fila_poliza({"asegurado": "ANA", "nro_poliza": 123, "premio_usd": 400, "premio_uyu": None}, "https://drive/1", fecha="01/01/2026")
+    assert len(fila) == 19
+    assert (fila[0], fila[2], fila[7], fila[14], fila[15], fila[16]) == ("01/01/2026", "ANA", "123", "400", "", "https://drive/1")
+
+
+def test_stats_consistentes_con_muchos_hilos():
+    pdfs = _pdfs(200, tamano=300)
+    ingesta = IngestaPolizas(ExtractorFalso(fallan={"poliza_007.pdf"}), max_hilos=16, por_minuto=0, reintentos=1, backoff=0, preprocesar=False)
+    for _ in range(3):
+        _terminar(ingesta.procesar(pdfs))
+    stats = ingesta.stats
+    assert stats["pdfs"] == 600 and stats["ok"] == 597 and stats["errores"] == 3 and stats["reintentos"] == 3
+    assert stats["bytes_documento"] == 600 * 400 and stats["bytes_enviados"] == 600 * 400
+
+
+def test_via_rapida_no_queda_en_cache(tmp_path, monkeypatch):
+    # Un cambio en los patrones de preproceso_pdf no cambia la clave: esas extracciones se rehacen siempre
+    import ingesta
+    monkeypatch.setattr(ingesta, "preparar", lambda pdf: {"via": "regex", "datos": {"asegurado": "ANA", "nro_poliza": "1"}})
+    cache = CacheExtracciones(str(tmp_path / "extracciones.db"))
+    lote = _terminar(IngestaPolizas(ExtractorFalso(), por_minuto=0, cache=cache).procesar(_pdfs(3)))
+    assert len(lote.listos()) == 3 and len(cache) == 0
+
+
+def test_revision_ubica_cada_pdf_aunque_se_llamen_igual():
+    pdfs = [("poliza.pdf", b"%PDF de BSE" + bytes(500)), ("poliza.pdf", b"%PDF de SURA" + bytes(900)), ("otra.pdf", b"x" * 100)]
+    lote = _terminar(IngestaPolizas(ExtractorFalso(), por_minuto=0, preprocesar=False).procesar(pdfs))
+    filas = lote.revision()
+    assert [f["Item"] for f in filas] == [0, 1, 2]
+    assert [lote.items[f["Item"]]["pdf"] for f in filas] == [pdf for _, pdf in pdfs]
@@ -0,0 +1,88 @@
+import pytest
+
+from links import LIMITE_CELDA, LinksSheet, LinksSQLite
+from simulacion.datos import propuestas_ejemplo
+from simulacion.dobles import HojaFalsa
+
+
+def _hoja_links():
+    return HojaFalsa(filas=[["id", "propuesta", "fecha"]])
+
+
+def test_misma_propuesta_mismo_id(tmp_path):
+    links = LinksSQLite(str(tmp_path / "links.db"))
+    propuesta = propuestas_ejemplo()["Individual"]
+    pid = links.guardar(propuesta)
+    assert links.guardar(dict(propuesta)) == pid and links.stats["repetidas"] == 1
+    assert links.guardar({**propuesta, "n": "Otro"}) != pid
+    assert LinksSQLite(str(tmp_path / "links.db")).obtener(pid) == propuesta
+
+
+def test_sheet_visible_para_otra_instancia_apenas_se_guarda():
+    hoja = _hoja_links()
+    propuesta = propuestas_ejemplo()["Flota"]
+    pid = LinksSheet(lambda: hoja).guardar(propuesta)
+    otra = LinksSheet(lambda: hoja)
+    hoja.llamadas = 0
+    assert otra.obtener(pid) == propuesta
+    # Columna A para ubicar la fila y despues solo esa fila, nunca la hoja entera
+    assert hoja.llamadas == 2
+
+
+def test_sheet_con_filas_movidas():
+    hoja = _hoja_links()
+    propuestas = [propuestas_ejemplo(i)["Individual"] for i in range(3)]
+    pids = [LinksSheet(lambda: hoja).guardar(p) for p in propuestas]
+    lector = LinksSheet(lambda: hoja)
+    assert lector.obtener(pids[0]) == propuestas[0]
+    del hoja.filas[1]
+    assert lector.obtener(pids[2]) == propuestas[2]
+    assert lector.obtener("noexiste") is None
+
+
+def test_sheet_sin_conexion_va_por_la_cola():
+    # El hueco documentado: hasta que la cola envie la fila, solo este proceso resuelve el link
+    hoja, encoladas = _hoja_links(), []
+    hoja.fallos = 1
+    links = LinksSheet(lambda: hoja, encolar=lambda nombre, fila: encoladas.append(fila))
+    propuesta = propuestas_ejemplo()["RV"]
+    pid = links.guardar(propuesta)
+    assert [f[0] for f in encoladas] == ["'" + pid]
+    assert links.obtener(pid) == propuesta
+    assert LinksSheet(lambda: hoja).obtener(pid) is None
+    hoja.append_rows(encoladas)
+    assert LinksSheet(lambda: hoja).obtener(pid) == propuesta
+
+
+def test_ids_desconocidos_no_releen_la_columna():
+    hoja = _hoja_links()
+    pid = LinksSheet(lambda: hoja).guardar(propuestas_ejemplo()["Individual"])
+    lector = LinksSheet(lambda: hoja, intervalo_ids=60)
+    assert lector.obtener("inventado") is None
+    hoja.llamadas = 0
+    assert all(lector.obtener(f"inventado{i}") is None for i in range(100))
+    assert hoja.llamadas == 0 and lector.stats["desconocidos"] == 100
+    # Los que estaban en la columna se siguen leyendo por fila
+    assert lector.obtener(pid)["n"] == "Maria Gonzalez 0" and hoja.llamadas == 1
+    lector.intervalo_ids = 0
+    assert lector.obtener("inventado") is None and hoja.llamadas == 2
+
+
+def test_propuesta_grande_en_varias_celdas():
+    hoja = _hoja_links()
+    flota = {**propuestas_ejemplo()["Flota"]}
+    flota["tab"] = flota["tab"] * 1000
+    pid = LinksSheet(lambda: hoja).guardar(flota)
+    fila = hoja.filas[-1]
+    assert len(fila) > 4 and max(len(str(v)) for v in fila) <= LIMITE_CELDA
+    assert LinksSheet(lambda: hoja).obtener(pid) == flota
+
+
+def test_propuesta_demasiado_grande_no_va_a_la_cola():
+    hoja, encoladas = _hoja_links(), []
+    links = LinksSheet(lambda: hoja, encolar=lambda nombre, fila: encoladas.append(fila))
+    flota = {**propuestas_ejemplo()["Flota"]}
+    flota["tab"] = flota["tab"] * 20_000
+    with pytest.raises(ValueError, match="link corto"):
+        links.guardar(flota)
+    assert encoladas == [] and len(hoja.filas) == 1
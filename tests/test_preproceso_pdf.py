@@ -0,0 +1,72 @@
+import pytest
+
+from preproceso_pdf import _monto, extraer_por_regex, paginas_relevantes, preparar
+from simulacion.datos import POLIZAS_EJEMPLO, pdf_sintetico
+
+pytest.importorskip("pypdf")
+
+
+def test_via_rapida_bse():
+    envio = preparar(pdf_sintetico(POLIZAS_EJEMPLO["BSE auto (6 pag.)"]))
+    assert envio["via"] == "regex"
+    datos = envio["datos"]
+    assert (datos["aseguradora"], datos["nro_poliza"], datos["asegurado"]) == ("BSE", "4512873/1", "JUAN PEREZ")
+    assert (datos["inicio_vigencia"], datos["fin_vigencia"]) == ("01/03/2026", "01/03/2027")
+    assert (datos["moneda"], datos["premio_uyu"], datos["premio_usd"]) == ("UYU", 48250, None)
+    assert (datos["documento"], datos["detalle"], datos["ramo"]) == ("211234560019", "SBA 1234", "VEHÍCULO")
+
+
+def test_texto_solo_de_las_paginas_relevantes():
+    envio = preparar(pdf_sintetico(POLIZAS_EJEMPLO["PORTO empresa (30 pag.)"]))
+    assert envio["via"] == "texto" and envio["paginas"] == 30
+    assert "Poliza 700123" in envio["texto"] and envio["texto"].count("--- Página") <= 3
+
+
+def test_escaneado_manda_las_primeras_paginas():
+    pdf = pdf_sintetico(POLIZAS_EJEMPLO["Escaneada (20 pag.)"], imagen_kb=20)
+    envio = preparar(pdf)
+    assert envio["via"] == "paginas" and len(envio["pdf"]) < len(pdf)
+
+
+def test_no_pdf_va_entero():
+    assert preparar(b"no es un pdf")["via"] == "documento"
+
+
+def test_regex_sin_un_dato_clave_no_adivina():
+    assert extraer_por_regex("BANCO DE SEGUROS DEL ESTADO\nAsegurado: ANA\nPremio Total: $ 100") is None
+
+
+def test_paginas_relevantes():
+    assert paginas_relevantes(["portada", "nada", "Poliza y vigencia", "premio"], 3) == [0, 2, 3]
+    assert paginas_relevantes([]) == []
+
+
+@pytest.mark.parametrize("moneda, numero, esperado", [
+    ("$", "48.250,00", ("premio_uyu", 48250)), ("U$S", "412,50", ("premio_usd", 412.5)), ("USD", "3.200", ("premio_usd", 3200)),
+    ("USD", "1234.56", ("premio_usd", 1234.56)), ("USD", "1,234.56", ("premio_usd", 1234.56)), ("$", "1.234.567", ("premio_uyu", 1234567)),
+    ("$", "1,234", ("premio_uyu", 1234)), ("$U", "950", ("premio_uyu", 950)), ("US$", "7,5", ("premio_usd", 7.5)),
+])
+def test_monto_en_los_dos_estilos(moneda, numero, esperado):
+    assert _monto(moneda, numero) == esperado
+
+
+@pytest.mark.parametrize("numero", ["1.234.5", "12.345,678", "1234.567", "1,23,456", "1.234,567"])
+def test_monto_que_no_se_puede_leer(numero):
+    assert _monto("$", numero) is None
+
+
+@pytest.mark.parametrize("moneda", [None, ""])
+def test_monto_sin_moneda_no_se_adivina(moneda):
+    assert _monto(moneda, "950") is None
+
+
+def test_regex_con_monto_ilegible_pasa_al_modelo():
+    texto = "BANCO DE SEGUROS DEL ESTADO\nPoliza N: 1\nAsegurado: ANA\nVigencia desde el 01/01/2026 hasta el 01/01/2027\nPremio Total: $ 1.234.5"
+    assert extraer_por_regex(texto) is None
+    assert extraer_por_regex(texto.replace("1.234.5", "1,234.50"))["premio_uyu"] == 1234.5
+
+
+def test_regex_sin_moneda_pasa_al_modelo():
+    texto = "BANCO DE SEGUROS DEL ESTADO\nPoliza N: 1\nAsegurado: ANA\nVigencia desde el 01/01/2026 hasta el 01/01/2027\nPremio Total: 48.250,00"
+    assert extraer_por_regex(texto) is None
+    assert extraer_por_regex(texto.replace("Total: ", "Total: $ "))["moneda"] == "UYU"
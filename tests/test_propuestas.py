@@ -0,0 +1,50 @@
+from historial import CargadorHistorial
+from propuestas import AlmacenPropuestas, total_propuesta
+from simulacion.datos import hojas_cotizaciones, propuestas_ejemplo
+from simulacion.dobles import LibroFalso
+
+
+def test_eliminar_dos_veces_no_falla():
+    almacen = AlmacenPropuestas()
+    pid = almacen.agregar({**propuestas_ejemplo()["Individual"], "link": "https://x/?p=1"})
+    assert almacen.eliminar(pid)["n"] == "Maria Gonzalez 0"
+    assert almacen.eliminar(pid) is None and len(almacen) == 0
+
+
+def test_id_por_link_tras_editar_y_releer():
+    hojas = hojas_cotizaciones(50)
+    cargador = CargadorHistorial(lambda: LibroFalso(hojas), intervalo_chequeo=0)
+    almacen = cargador.almacen()
+    pid = almacen.buscar(tipo="Individual")[0]
+    link = almacen.obtener(pid)["link"]
+    assert almacen.id_por_link(link) == pid
+    # Editada: cambia el link pero no el id, y una relectura completa le da un id nuevo
+    almacen.editar(pid, {**almacen.obtener(pid), "link": "https://x/?p=editada"})
+    assert almacen.id_por_link(link) is None and almacen.id_por_link("https://x/?p=editada") == pid
+    fila = next(f for f in hojas["Cotizaciones Individuales"].filas if f[12] == link)
+    fila[12] = "https://x/?p=editada"
+    releido = cargador.almacen(forzar=True)
+    nuevo = releido.id_por_link("https://x/?p=editada")
+    assert nuevo is not None and nuevo != pid and releido.obtener(nuevo)["n"] == fila[1]
+    assert releido.id_por_link("") is None and releido.id_por_link(None) is None
+
+
+def test_propuestas_en_memoria_solo_para_su_usuario():
+    almacen = AlmacenPropuestas()
+    rv = propuestas_ejemplo()["RV"]
+    almacen.agregar({**rv, "link": "https://x/?q=rv1", "_usuario": "RDF"})
+    almacen.agregar({**rv, "link": "https://x/?q=rv2", "_usuario": "JOE"})
+    comun = almacen.agregar({**propuestas_ejemplo()["Individual"], "link": "https://x/?p=1"})
+    for usuario, link in (("RDF", "https://x/?q=rv1"), ("JOE", "https://x/?q=rv2")):
+        visibles = almacen.buscar(usuario=usuario)
+        assert sorted(almacen.obtener(p)["link"] for p in visibles) == sorted([link, "https://x/?p=1"])
+        assert [almacen.obtener(p)["link"] for p in almacen.buscar(tipo="RV", usuario=usuario)] == [link]
+    assert almacen.buscar() == [comun]
+
+
+def test_total_en_los_dos_estilos():
+    for valor, total in ((2277.5, 2277.5), ("2277.5", 2277.5), ("2.277,50", 2277.5), ("2,277.50", 2277.5), ("USD 1.234", 1234.0),
+                         ("1234", 1234.0), (0, 0.0), ("", None), ("a confirmar", None), ("1.234.5", None)):
+        assert total_propuesta({"total": valor}) == total, valor
+    assert total_propuesta({"costo": "412,50"}) == 412.5
+    assert total_propuesta({"n": "sin total"}) is None
@@ -0,0 +1,120 @@
+import hashlib
+import random
+
+import pytest
+
+from subidas_drive import SubidasDrive, marcador_subida
+from simulacion.dobles import DriveFalso, LinksPolizasFalsos, MediaFalsa
+
+CHUNK = 64 * 1024
+
+
+def _subidas(tmp_path, drive, hoja, nombre="subidas.db", **kw):
+    return SubidasDrive(lambda: drive, "carpeta", hoja.rellenar, ruta=str(tmp_path / nombre), chunk=CHUNK, media=MediaFalsa, **kw)
+
+
+def _vaciar(subidas, veces=50):
+    for _ in range(veces):
+        subidas.vaciar(ahora=float("inf"))
+
+
+def _pdfs(n, tamano=300_000):
+    return [(f"poliza_{i}.pdf", random.Random(i).randbytes(tamano)) for i in range(n)]
+
+
+@pytest.mark.parametrize("fallar_cada", [0, 4])
+def test_rellena_los_links(tmp_path, fallar_cada):
+    drive, hoja = DriveFalso(fallar_cada=fallar_cada), LinksPolizasFalsos()
+    subidas = _subidas(tmp_path, drive, hoja, backoff_base=0)
+    for nombre, pdf in _pdfs(4):
+        hoja.celdas.append(subidas.encolar(nombre, pdf))
+    _vaciar(subidas)
+    assert subidas.pendientes() == 0
+    assert all(c.startswith("https://drive/") for c in hoja.celdas)
+    assert {a["md5Checksum"] for a in drive.archivos} == {hashlib.md5(p).hexdigest() for _, p in _pdfs(4)}
+    # Un corte no vuelve a mandar lo que el servidor ya confirmo
+    assert drive.bytes_recibidos == 4 * 300_000
+
+
+def test_mismo_pdf_dos_veces_una_sola_subida(tmp_path):
+    drive, hoja = DriveFalso(), LinksPolizasFalsos()
+    subidas = _subidas(tmp_path, drive, hoja)
+    nombre, pdf = _pdfs(1)[0]
+    hoja.celdas += [subidas.encolar(nombre, pdf), subidas.encolar("copia.pdf", pdf)]
+    _vaciar(subidas)
+    assert len(drive.archivos) == 1 and hoja.celdas[0] == hoja.celdas[1] == drive.archivos[0]["webViewLink"]
+
+
+def test_reinicio_a_mitad_retoma_la_sesion(tmp_path):
+    drive, hoja = DriveFalso(fallar_cada=3), LinksPolizasFalsos()
+    nombre, pdf = _pdfs(1, tamano=1_000_000)[0]
+    hoja.celdas.append(marcador_subida(pdf))
+    _subidas(tmp_path, drive, hoja, "reinicio.db", backoff_base=60).encolar(nombre, pdf)
+    _subidas(tmp_path, drive, hoja, "reinicio.db", backoff_base=60).vaciar()
+    antes = drive.bytes_recibidos
+    assert 0 < antes < len(pdf)
+    drive.fallar_cada = 0
+    otra = _subidas(tmp_path, drive, hoja, "reinicio.db")
+    otra.reintentar()
+    otra.vaciar()
+    assert drive.bytes_recibidos == len(pdf)
+    assert hoja.celdas[0].startswith("https://drive/") and drive.archivos[-1]["md5Checksum"] == hashlib.md5(pdf).hexdigest()
+
+
+def test_sin_fila_para_el_marcador_queda_fallida(tmp_path):
+    drive, hoja = DriveFalso(), LinksPolizasFalsos()
+    subidas = _subidas(tmp_path, drive, hoja, backoff_base=0)
+    nombre, pdf = _pdfs(1)[0]
+    subidas.encolar(nombre, pdf)
+    _vaciar(subidas)
+    assert [f["Estado"] for f in subidas.estado()] == ["fallida"] and len(drive.archivos) == 1
+
+
+def test_reintentar_rellena_sin_volver_a_subir(tmp_path):
+    drive, hoja = DriveFalso(), LinksPolizasFalsos()
+    subidas = _subidas(tmp_path, drive, hoja, backoff_base=0)
+    nombre, pdf = _pdfs(1)[0]
+    marcador = subidas.encolar(nombre, pdf)
+    _vaciar(subidas)
+    fallos = subidas.stats["fallos"]
+    # Aparece la fila (la cola al Sheet la termino de escribir) y se reintenta a mano
+    hoja.celdas.append(marcador)
+    subidas.reintentar()
+    assert subidas.vaciar(ahora=float("inf")) == 1
+    assert subidas.stats["fallos"] == fallos and hoja.celdas == [drive.archivos[0]["webViewLink"]] and len(drive.archivos) == 1
+
+
+def test_encolar_de_nuevo_reactiva_la_fallida(tmp_path):
+    drive, hoja = DriveFalso(), LinksPolizasFalsos()
+    subidas = _subidas(tmp_path, drive, hoja, backoff_base=0)
+    nombre, pdf = _pdfs(1)[0]
+    subidas.encolar(nombre, pdf)
+    _vaciar(subidas)
+    assert subidas.pendientes() == 0
+    # Se guarda otra vez la poliza (ahora con su fila): la misma tarea vuelve a la cola y rellena sin subir de nuevo
+    hoja.celdas.append(subidas.encolar(nombre, pdf))
+    assert subidas.pendientes() == 1
+    _vaciar(subidas)
+    assert hoja.celdas[0] == drive.archivos[0]["webViewLink"] and len(drive.archivos) == 1
+    assert [f["Estado"] for f in subidas.estado()] == ["lista"]
+
+
+def test_stats_consistentes_con_varias_sesiones(tmp_path):
+    # Varias sesiones encolan mientras el hilo de fondo sube
+    import threading
+    import time
+    drive, hoja = DriveFalso(), LinksPolizasFalsos()
+    subidas = _subidas(tmp_path, drive, hoja, backoff_base=0, espera=0.01).iniciar()
+    pdfs = _pdfs(40, tamano=1000)
+    hoja.celdas += [marcador_subida(pdf) for _, pdf in pdfs]
+    sesiones = [threading.Thread(target=lambda parte: [subidas.encolar(n, p) for n, p in parte], args=(pdfs[i::4],)) for i in range(4)]
+    for s in sesiones:
+        s.start()
+    for s in sesiones:
+        s.join()
+    tope = time.time() + 10
+    while subidas.pendientes() and time.time() < tope:
+        time.sleep(0.01)
+    subidas.detener()
+    assert subidas.stats["encoladas"] == 40 and subidas.stats["subidas"] == 40 and subidas.stats["bytes"] == 40_000
+    assert all(c.startswith("https://drive/") for c in hoja.celdas)
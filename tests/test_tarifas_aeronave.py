@@ -0,0 +1,78 @@
+import math
+import time
+
+import pandas as pd
+import pytest
+
+from tarifas_aeronave import APTITUD_ATERRIZAJE, TASAS_AERONAVE, barrido_tasas, cotizar, cotizar_lote
+from simulacion.datos import aeronaves_sinteticas
+from simulacion.referencia import cotizar_aeronave_antes
+
+AERONAVES = aeronaves_sinteticas(500)
+
+
+def test_una_por_una_igual_al_calculo_original():
+    for _, princ, acc in AERONAVES:
+        assert cotizar(princ, acc, aptitud=False) == cotizar_aeronave_antes(princ, acc)
+
+
+def test_en_lote_igual_al_calculo_original():
+    lineas = pd.concat([pd.concat([p, a]).assign(Aeronave=m) for m, p, a in AERONAVES], ignore_index=True)
+    costos, resumen = cotizar_lote(lineas)
+    for m, princ, acc in AERONAVES:
+        antes = cotizar_aeronave_antes(princ, acc)
+        assert (resumen.loc[m, "Subtotal"], resumen.loc[m, "Cargos"], resumen.loc[m, "Total"]) == (antes["subtotal"], antes["cargos"], antes["total"])
+        assert costos[lineas["Aeronave"] == m].tolist() == [f["Costo"] for f in antes["filas"]]
+
+
+def test_barrido_con_factor_1_igual_a_cotizar():
+    for _, princ, acc in AERONAVES[:50]:
+        fila = barrido_tasas(princ, acc, factores=[1.0]).iloc[0]
+        antes = cotizar_aeronave_antes(princ, acc)
+        assert (fila["Subtotal"], fila["Cargos"], fila["Total"]) == (antes["subtotal"], antes["cargos"], antes["total"])
+
+
+def test_barrido_solo_de_algunas_coberturas():
+    princ = pd.DataFrame(TASAS_AERONAVE["Privado / Otro"]["principales"]).assign(**{"Capital (USD)": 100_000})
+    barrido = barrido_tasas(princ, factores=[1.0, 2.0], coberturas=["Perdida o Dano de la Aeronave"])
+    assert barrido["Subtotal"].tolist() == [2500.0, 4000.0]
+
+
+def test_aptitud_suma_una_fila_sin_costo():
+    _, princ, acc = AERONAVES[0]
+    cotizacion = cotizar(princ, acc)
+    assert cotizacion["filas"][-1] == {"Cobertura": APTITUD_ATERRIZAJE, "Tasa (%)": 0, "Asientos": 0, "Capital": 0, "Costo": 0}
+    assert cotizacion["total"] == cotizar(princ, acc, aptitud=False)["total"]
+
+
+def test_celdas_none_valen_cero_como_antes():
+    princ = pd.DataFrame([{"Cobertura": "A", "Tasa (%)": None, "Capital (USD)": 1000}, {"Cobertura": "B", "Tasa (%)": 1.0, "Capital (USD)": None}],
+                         dtype=object)
+    acc = pd.DataFrame([{"Cobertura": "C", "Tasa (%)": 0.3, "Asientos": None, "Capital (USD)": 5000}], dtype=object)
+    assert cotizar(princ, acc, aptitud=False) == cotizar_aeronave_antes(princ, acc)
+
+
+def test_celdas_nan_valen_cero():
+    # Cambio documentado en tarifas_aeronave._numeros: antes NaN daba total "nan" (o error en Asientos)
+    princ = pd.DataFrame([{"Cobertura": "A", "Tasa (%)": float("nan"), "Capital (USD)": 1000.0}, {"Cobertura": "B", "Tasa (%)": 1.0, "Capital (USD)": 500.0}])
+    assert math.isnan(cotizar_aeronave_antes(princ, pd.DataFrame())["total"])
+    assert cotizar(princ, aptitud=False)["total"] == 5.75
+    acc = pd.DataFrame([{"Cobertura": "C", "Tasa (%)": 0.3, "Asientos": float("nan"), "Capital (USD)": 1000.0}])
+    with pytest.raises(ValueError):
+        cotizar_aeronave_antes(pd.DataFrame(), acc)
+    assert cotizar(None, acc, aptitud=False)["filas"][0]["Asientos"] == 0
+
+
+def test_lote_escala_lineal():
+    # El pedido: el costo por linea no crece con el tamaño del lote. Con 10 veces mas lineas,
+    # un calculo cuadratico tardaria 10 veces mas por linea; el tope deja margen para CI ruidoso.
+    lineas = pd.concat([pd.concat([p, a]).assign(Aeronave=m) for m, p, a in AERONAVES], ignore_index=True)
+    def por_linea(veces):
+        grande = pd.concat([lineas.assign(Aeronave=lineas["Aeronave"] + f"-{k}") for k in range(veces)], ignore_index=True)
+        mejor = float("inf")
+        for _ in range(3):
+            t = time.perf_counter()
+            cotizar_lote(grande)
+            mejor = min(mejor, time.perf_counter() - t)
+        return mejor / len(grande)
+    assert por_linea(20) < 3 * por_linea(2)
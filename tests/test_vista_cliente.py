@@ -0,0 +1,20 @@
+import pytest
+
+from simulacion.datos import propuestas_ejemplo
+from simulacion.referencia import tabla_antes
+from vista_cliente import CacheVistas, renderizar
+
+
+@pytest.mark.parametrize("tipo", ["Individual", "Flota"])
+def test_tabla_igual_a_la_original(tipo):
+    propuesta = propuestas_ejemplo()[tipo]
+    assert ("md", tabla_antes(propuesta)) in [tuple(b[:2]) for b in renderizar(propuesta)]
+
+
+def test_cache_devuelve_la_misma_vista():
+    cache = CacheVistas()
+    for propuesta in propuestas_ejemplo().values():
+        vista = cache.vista(propuesta)
+        # Algunos bloques traen DataFrames: se comparan por su texto
+        assert list(map(str, vista)) == list(map(str, renderizar(propuesta)))
+        assert cache.vista(dict(propuesta)) is vista
@@ -0,0 +1,241 @@
+import threading
+from collections import OrderedDict
+
+from links import id_de, texto_canonico
+
+# ==========================================
+# PLANTILLAS DE LA VISTA DEL CLIENTE
+# ==========================================
+# Se arman una sola vez al importar; cada vista solo llama a .format con los datos
+_ENCABEZADO = """
+            <div style="font-family: sans-serif; padding-left: 5px; margin-bottom: 20px; margin-top: 20px;">
+                <h2 style="margin: 0 0 12px 0; font-size: 24px; color: #111; font-weight: bold;">Asegurado: {nombre}</h2>
+                {info}
+            </div>
+            """.format
+_ENCABEZADO_RV = """
+            <div style="font-family: sans-serif; padding-left: 5px; margin: 20px 0 15px 0;">
+                <h2 style="margin: 0 0 6px 0; font-size: 22px; color: #111;">{tipo_seg} — {nombre}</h2>
+                <p style="margin: 0; font-size: 16px; color: #555;"><b>Actividad:</b> {act} | <b>Aseguradora:</b> {cia} | <b>Vigencia:</b> {vig}</p>
+            </div>
+            """.format
+_INFO = '<p style="margin:2px 0; font-size:15px; color:#333;"><b>{}:</b> {}</p>'.format
+_PIE = "<div style='display:flex; justify-content:space-between; color:gray;'><div><b>Asesor:</b> {asesor} | <b>Contacto:</b> {cont}</div><div><b>Fecha:</b> {fecha}</div></div>".format
+_FILA_BEN = '<div class="ben-fila">{}</div>'.format
+
+_TABLA = '<table style="width:100%;border-collapse:collapse;font-size:{tam}px;margin-top:{margen}px;"><tr style="background:#1E3A8A;color:white;">{cabecera}</tr>{filas}</table>'.format
+_TH = '<th style="padding:8px 12px;text-align:left;">{}</th>'.format
+_TR = '<tr style="background:{}">{}</tr>'.format
+_TD = '<td style="padding:7px 12px;border-bottom:1px solid #e5e7eb;">{}</td>'.format
+_FONDOS = ("#f8f9fa;", "white;")
+
+_OBS_AV = """
+                <div style="margin-top:15px; padding:12px 16px; background:#f8f9fa; border-radius:8px; border-left:4px solid #1E3A8A; font-size:14px; color:#333;">
+                    {}
+                </div>
+                """.format
+_TOTALES_AV = """
+            <div style="margin-top:20px; padding:15px; background:#EFF6FF; border-radius:10px; border-left:5px solid #1E3A8A;">
+                <p style="margin:4px 0;">Subtotal: <b>USD {:,.0f}</b></p>
+                <p style="margin:4px 0;">Cargos de Emision (15%): <b>USD {:,.0f}</b></p>
+                <p style="margin:4px 0; font-size:17px; color:#1E3A8A;">Costo Anual Total: <b>USD {:,.0f}</b></p>
+            </div>
+            """.format
+
+_CAJA = '<div class="caja-azul"><span style="font-weight:bold; color:#1E3A8A;">{} {}</span><br>{}</div>'.format
+_LINEA_CAJA = '<span style="display:block; margin-top:3px;">{}</span>'.format
+_COSTO_CAJA = '<span style="display:block; margin-top:8px; padding:6px 10px; background:#EFF6FF; border-radius:6px; font-weight:bold; color:#1E3A8A;">💰 {}<span style="color:#111;">{}</span></span>'.format
+
+MONTOS = ("Contado", "10 Cuotas", "Deducible")
+COLUMNAS_COTIZACION = ["Aseguradora", "Marca", "Modelo", "Ano", "Matricula", "Cobertura", "Contado", "10 Cuotas", "Deducible"]
+# Complementarias: campo -> (titulo, icono) para Individual y para Flota
+CAJAS = {
+    "Individual": [("ch", "Hogar", "🏠"), ("ca", "Alquiler / Auto Sust.", "🚗"), ("cb", "Bici", "🚲")],
+    "Flota": [("ch", "Accidentes Personales", "🧑‍⚕️"), ("ca", "Auto Sustituto / Alquiler", "🚗"), ("cb", "Bici Electrica o Moto", "🛵")],
+}
+
+
+def _entero(valor):
+    # Igual que pd.to_numeric(errors="coerce").fillna(0).astype(int), celda por celda
+    try:
+        return int(float(valor))
+    except (TypeError, ValueError, OverflowError):
+        return 0
+
+
+def _miles(n, prefijo):
+    return f"{prefijo}{n:,}".replace(",", ".")
+
+
+def _monto(valor):
+    try:
+        return _miles(int(float(valor)), "$ ")
+    except (TypeError, ValueError, OverflowError):
+        return valor
+
+
+def _tabla(columnas, filas, tam, margen, cabecera=None):
+    return _TABLA(tam=tam, margen=margen, cabecera="".join(_TH(c) for c in cabecera or columnas),
+                  filas="".join(_TR(_FONDOS[i % 2], "".join(_TD(v) for v in fila)) for i, fila in enumerate(filas)))
+
+
+def _lineas(texto, excluir=()):
+    return [l.strip() for l in texto.split("\n") if l.strip() and l.strip() not in excluir]
+
+
+def _caja(titulo, icono, texto):
+    if not texto:
+        return ""
+    partes = []
+    for l in _lineas(texto):
+        if l.lower().startswith(("costo", "- costo", "* costo")):
+            partes_costo = l.lstrip("*- ").split(":", 1)
+            if len(partes_costo) == 2:
+                partes.append(_COSTO_CAJA(f"{partes_costo[0].strip()}: ", partes_costo[1].strip()))
+            else:
+                partes.append(_COSTO_CAJA("", l.lstrip("*- ")))
+        else:
+            partes.append(_LINEA_CAJA(l))
+    return _CAJA(icono, titulo, "".join(partes))
+
+
+# ==========================================
+# VISTAS POR TIPO
+# ==========================================
+# Cada vista devuelve bloques que la app dibuja en orden:
+#   ("md", html)                    -> st.markdown
+#   ("columnas", [html, ...])       -> una st.columns con un markdown por columna
+#   ("metricas", [(titulo, valor)]) -> una st.columns con un st.metric por columna
+#   ("tabla", df, {col: (titulo, formato)}) -> st.dataframe con NumberColumn en esas columnas
+#   ("espacio",)                    -> st.write("")
+def _vista_rv(p, nombres):
+    # pandas solo para las tablas de RV (st.dataframe); las demas vistas arrancan sin el
+    import pandas as pd
+    bloques = [("md", _ENCABEZADO_RV(tipo_seg=p.get("tipo_seg", "Riesgos Varios"), nombre=p.get("n", "Cliente"),
+                                     act=p.get("act", ""), cia=p.get("cia", ""), vig=p.get("vig", ""))),
+               ("md", "### 📦 Coberturas Principales")]
+    df_cob = pd.DataFrame(p.get("tab_cob", []))
+    if not df_cob.empty:
+        df_cob["Capital (USD)"] = pd.to_numeric(df_cob["Capital (USD)"], errors="coerce").fillna(0)
+        bloques.append(("tabla", df_cob, {"Capital (USD)": ("CAPITAL (USD)", "$ %,d")}))
+    bloques.append(("metricas", [("Capital Asegurado Total", f"USD {p.get('cap_total', 0):,.0f}"), ("Deducible General", f"USD {p.get('ded', '')}")]))
+    bloques.append(("md", "### 📑 Sublímites de Cobertura"))
+    df_sub = pd.DataFrame(p.get("tab_sub", []))
+    if not df_sub.empty:
+        bloques.append(("tabla", df_sub, {}))
+    for campo, titulo, excluir in (("ubi", "### 📍 Ubicaciones de riesgo", ("1)", "2)", "3)", "4)")),
+                                   ("equ", "### 🚜 Equipos a la intemperie", ("1)", "2)", "3)", "4)")),
+                                   ("acl", "### 📌 Aclaraciones en condiciones particulares", ())):
+        if p.get(campo, "").strip():
+            bloques.append(("md", titulo))
+            bloques += [("md", _FILA_BEN(l)) for l in _lineas(p.get(campo, ""), excluir)]
+    bloques += [("md", "---"), ("columnas", [f"### 💰 Costo Anual (sin IVA): USD {p.get('costo', 0):,.2f}", f"### 💳 Financiamiento: {p.get('fin', '')}"])]
+    df_comp = pd.DataFrame(p.get("tab_comp", []))
+    if not df_comp.empty:
+        df_comp = df_comp[df_comp.get("Aseguradora", pd.Series(dtype=str)).astype(str).str.strip() != ""]
+    if not df_comp.empty:
+        df_comp["Premio (USD)"] = pd.to_numeric(df_comp["Premio (USD)"], errors="coerce").fillna(0)
+        bloques += [("md", "### ⚖️ Comparativos"), ("tabla", df_comp, {"Premio (USD)": ("PREMIO (USD)", "USD %,d")})]
+    bloques += [("md", "---"), ("md", _PIE(asesor=p.get("e", "EDF"), cont=p.get("cont", ""), fecha=p.get("fecha", "")))]
+    return bloques
+
+
+def _capital_av(fila):
+    capital = fila.get("Capital", 0)
+    if str(capital) in ("0", "0.0", "") and "aptitud" in str(fila.get("Cobertura", "")).lower():
+        return "Incluido"
+    try:
+        return _miles(int(float(capital)), "USD ")
+    except (TypeError, ValueError, OverflowError):
+        return str(capital)
+
+
+def _vista_aeronave(p, nombres):
+    info = "".join(_INFO(etiqueta, p.get(campo)) for campo, etiqueta in (
+        ("aseguradora", "Aseguradora"), ("aeronave", "Aeronave"), ("matricula", "Matricula"), ("alcance_geo", "Alcance Geografico"), ("destino", "Destino"))
+        if p.get(campo, ""))
+    bloques = [("md", _ENCABEZADO(nombre=p.get("n", "Cliente"), info=info))]
+    tab = p.get("tab", [])
+    if tab:
+        filas = []
+        for fila in tab:
+            asientos = fila.get("Asientos", 0)
+            asientos = str(int(float(str(asientos)))) if asientos and str(asientos) not in ("0", "0.0", "") else "—"
+            filas.append((fila.get("Cobertura", ""), asientos, _capital_av(fila)))
+        bloques.append(("md", _tabla(["Cobertura", "Asientos", "Capital (USD)"], filas, 13, 15)))
+    if p.get("obs_av", ""):
+        bloques.append(("md", _OBS_AV(p["obs_av"].replace("\n", "<br>"))))
+    bloques.append(("md", _TOTALES_AV(p.get("subtotal", 0), p.get("cargos", 0), p.get("total", 0))))
+    asesor = p.get("e", "EDF")
+    bloques += [("md", "---"), ("md", _PIE(asesor=nombres.get(asesor, asesor), cont=p.get("cont", ""), fecha=p.get("fecha", "")))]
+    return bloques
+
+
+def _vista_autos(p, nombres):
+    es_flota = p.get("tipo") == "Flota"
+    if es_flota:
+        info = _INFO("Aseguradora", p.get("e", "")) if p.get("e") else ""
+    else:
+        info = "".join(_INFO(etiqueta, p.get(campo, "")) for campo, etiqueta in (
+            ("v", "Vehiculo"), ("matricula", "Matricula"), ("cobertura_cot", "Cobertura cotizada"), ("zona", "Zona de Circulacion principal"))
+            if p.get(campo))
+    bloques = [("md", _ENCABEZADO(nombre=p.get("n", "Cliente"), info=info))]
+    tab = p.get("tab", [])
+    if tab:
+        # Columnas en el orden en que aparecen, como las armaba el DataFrame
+        presentes = dict.fromkeys(c for fila in tab for c in fila)
+        columnas = [c for c in presentes if c in COLUMNAS_COTIZACION]
+        numericas = {"Contado", "Deducible"} if es_flota else {"Contado", "10 Cuotas", "Deducible"}
+        filas = [[_miles(_entero(fila.get(c)), "$ ") if c in numericas else _monto(fila.get(c, "")) if c in MONTOS else fila.get(c, "")
+                  for c in columnas] for fila in tab]
+        bloques.append(("md", _tabla(columnas, filas, 12, 10, [c.upper() for c in columnas])))
+    if p.get("ben"):
+        bloques += [("espacio",), ("md", f"### {'Observaciones y Comentarios' if es_flota else 'Beneficios Incluidos'}")]
+        bloques += [("md", _FILA_BEN(l)) for l in _lineas(p.get("ben", ""))]
+    bloques += [("espacio",), ("md", "### Coberturas Complementarias"),
+                ("columnas", [_caja(titulo, icono, p.get(campo, "")) for campo, titulo, icono in CAJAS["Flota" if es_flota else "Individual"]]),
+                ("md", "---")]
+    asesor = p.get("e_nombre") if es_flota else p.get("e", "EDF")
+    bloques.append(("md", _PIE(asesor=asesor, cont=p.get("cont", ""), fecha=p.get("fecha", ""))))
+    return bloques
+
+
+VISTAS = {"RV": _vista_rv, "Aeronave": _vista_aeronave, "Flota": _vista_autos}
+
+
+def renderizar(propuesta, nombres=None):
+    """Bloques de la vista del cliente para la propuesta (Individual si el tipo no tiene vista propia)."""
+    return VISTAS.get(propuesta.get("tipo"), _vista_autos)(propuesta, nombres or {})
+
+
+# ==========================================
+# CACHE DE VISTAS RENDERIZADAS
+# ==========================================
+class CacheVistas:
+    """LRU de vistas ya renderizadas por hash de contenido de la propuesta.
+
+    El mismo link abierto de nuevo (o dos links con la misma propuesta) solo cuesta el hash
+    y una busqueda en el dict. Los DataFrames de RV quedan compartidos: nadie los modifica.
+    """
+
+    def __init__(self, nombres=None, max_vistas=256):
+        self.nombres = nombres or {}
+        self.max_vistas = max_vistas
+        self._vistas = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "renderizadas": 0}
+
+    def vista(self, propuesta):
+        clave = id_de(texto_canonico(propuesta), 16)
+        with self._lock:
+            if clave in self._vistas:
+                self._vistas.move_to_end(clave)
+                self.stats["hits"] += 1
+                return self._vistas[clave]
+        bloques = renderizar(propuesta, self.nombres)
+        with self._lock:
+            self._vistas[clave] = bloques
+            self.stats["renderizadas"] += 1
+            while len(self._vistas) > self.max_vistas:
+                self._vistas.popitem(last=False)
+        return bloques